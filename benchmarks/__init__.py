@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for TraceView API Library
+
+"""
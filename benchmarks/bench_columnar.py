@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark memory use and aggregation time of the columnar formatter against
+tuplify, on a week of 30 second points for 40 apps.
+
+Usage::
+
+  $ python -m benchmarks.bench_columnar
+
+"""
+
+import random
+import timeit
+import tracemalloc
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from traceview.formatters import columnar, tuplify
+
+
+APPS = 40
+POINTS = 7 * 24 * 120
+
+
+def series():
+    return {
+        'fields': 'timestamp,volume,avg_latency',
+        'items': [[1399089120.0 + 30 * i, random.randint(0, 50),
+                   random.random() * 1e6 if i % 10 else None] for i in range(POINTS)],
+    }
+
+
+def weighted_mean(points):
+    total = sum(point.volume for point in points if point.avg_latency is not None)
+    return sum(point.volume * point.avg_latency for point in points
+               if point.avg_latency is not None) / total
+
+
+def main():
+    results = [series() for _ in range(APPS)]
+    for name, formatter in (('tuplify', tuplify), ('columnar', columnar)):
+        tracemalloc.start()
+        formatted = [formatter(result) for result in results]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        if formatter is columnar:
+            aggregate = lambda: [c.mean('avg_latency', weights='volume') for c in formatted]
+        else:
+            aggregate = lambda: [weighted_mean(points) for points in formatted]
+        elapsed = timeit.timeit(aggregate, number=3) / 3
+        print('{0:<14} {1:8.1f} MB {2:8.1f} ms/aggregate'.format(
+            name, size / 1e6, elapsed * 1000))
+
+    if numpy is not None:
+        def aggregate():
+            for columns in formatted:
+                latency = columns.to_numpy('avg_latency', masked=True)
+                numpy.ma.average(latency, weights=columns.to_numpy('volume'))
+        elapsed = timeit.timeit(aggregate, number=3) / 3
+        print('{0:<14} {1:>11} {2:8.1f} ms/aggregate'.format(
+            'columnar+numpy', '', elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the JSON decoder backends installed on the response bodies of a
+week of 30 second points, a day of latency by layer for 12 layers and 5000
+hosts.
+
+Usage::
+
+  $ python -m benchmarks.bench_decoders
+
+"""
+
+import timeit
+
+from traceview.decoders import available, get_decoder
+
+from .suite import payloads
+
+
+def main():
+    backends = available()
+    for payload_name, body in sorted(payloads().items()):
+        baseline = None
+        for backend in reversed(backends):
+            loads = get_decoder(backend)
+            elapsed = min(timeit.repeat(lambda: loads(body), number=5, repeat=3)) / 5
+            baseline = baseline or elapsed
+            print('{0:<10} {1:<10} {2:8.2f} ms {3:8.1f} MB/s {4:6.2f}x'.format(
+                payload_name, backend, elapsed * 1000, len(body) / elapsed / 1e6, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the time to import traceview and create a TraceView object, as a
+short-lived script does.
+
+Usage::
+
+  $ python -m benchmarks.bench_import
+
+"""
+
+import subprocess
+import sys
+import timeit
+
+
+RUNS = 20
+
+
+def main():
+    for name, code in (('python', 'pass'),
+                       ('import', 'import traceview'),
+                       ('construct', 'import traceview; traceview.TraceView("KEY")')):
+        command = [sys.executable, '-c', code]
+        elapsed = timeit.timeit(lambda: subprocess.check_call(command), number=RUNS)
+        print('{0:<10} {1:8.1f} ms/process'.format(name, elapsed / RUNS * 1000))
+
+    output = subprocess.check_output([sys.executable, '-X', 'importtime', '-c', 'import traceview'],
+                                     stderr=subprocess.STDOUT).decode('utf-8')
+    print(output.splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark rolling up a week of 30 second latency points into 5 minute
+buckets: a plain Python loop over tuplified points against
+:mod:`traceview.rollup`, with and without NumPy, and on columnar results.
+
+Usage::
+
+  $ python -m benchmarks.bench_rollup
+
+"""
+
+import random
+import timeit
+
+from traceview import rollup as rollup_module
+from traceview.formatters import columnar, tuplify
+from traceview.rollup import rollup
+
+
+POINTS = 7 * 24 * 120
+INTERVAL = 300
+
+
+def series():
+    return {
+        'fields': 'timestamp,volume,avg_latency',
+        'items': [[1399089120.0 + 30 * i, random.randint(0, 50),
+                   random.random() * 1e6 if i % 10 else None] for i in range(POINTS)],
+    }
+
+
+def loop(results):
+    buckets = {}
+    for point in tuplify(results):
+        bucket = buckets.setdefault(point.timestamp // INTERVAL * INTERVAL, [0, 0.0, 0])
+        bucket[0] += point.volume
+        if point.avg_latency is not None:
+            bucket[1] += point.volume * point.avg_latency
+            bucket[2] += point.volume
+    return [[timestamp, volume, total / weight if weight else None]
+            for timestamp, (volume, total, weight) in sorted(buckets.items())]
+
+
+def main():
+    results = series()
+    numpy = rollup_module._numpy()
+    print('{0:<16} {1:8.1f} ms'.format('python loop', timeit.timeit(lambda: loop(results), number=3) / 3 * 1000))
+    for name, backend in (('rollup (python)', None), ('rollup (numpy)', numpy)):
+        if name.endswith('(numpy)') and numpy is None:
+            continue
+        rollup_module._numpy = lambda: backend
+        elapsed = timeit.timeit(lambda: rollup(results, INTERVAL), number=3) / 3
+        print('{0:<16} {1:8.1f} ms'.format(name, elapsed * 1000))
+
+    # Results already in columns, e.g. from the columnar formatter or a store.
+    columns = columnar(results)
+    elapsed = timeit.timeit(lambda: rollup(columns, INTERVAL), number=3) / 3
+    print('{0:<16} {1:8.1f} ms'.format('rollup (columns)', elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark per-call latency of a pooled :class:`traceview.api.Api` against
+one-off ``requests`` calls, which open a new connection for every request.
+
+Usage::
+
+  $ python -m benchmarks.bench_session
+
+"""
+
+import timeit
+
+import requests
+
+from traceview.api import Api
+
+from .stub_server import StubServer
+
+
+CALLS = 500
+
+
+def main():
+    series = {
+        'fields': 'timestamp,volume,avg_latency',
+        'items': [[1399089120.0 + 30 * i, 27.0, 226074.07] for i in range(120)],
+    }
+    with StubServer(series) as server:
+        api = Api('KEY', authority=server.authority)
+        url = api._url('latency/Default/server/series')
+
+        def unpooled():
+            requests.get(url, params={'key': 'KEY'}, allow_redirects=False).json()
+
+        def pooled():
+            api.get('latency/Default/server/series')
+
+        for name, func in (('unpooled', unpooled), ('pooled', pooled)):
+            func()  # warm up
+            elapsed = timeit.timeit(func, number=CALLS)
+            print('{0:<10} {1:8.3f} ms/call'.format(name, elapsed / CALLS * 1000))
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark the per response cost of tuplify, creating a namedtuple type
+for every response versus reusing record types from the registry.
+
+Usage::
+
+  $ python -m benchmarks.bench_tuplify
+
+"""
+
+from collections import namedtuple
+import timeit
+
+from traceview.formatters import tuplify
+
+
+RUNS = 2000
+
+
+def tuplify_uncached(results, class_name='Result'):
+    # tuplify as it was before record types were reused.
+    if 'fields' in results and 'items' in results:
+        nt = namedtuple(class_name + 'Tuple', results['fields'])
+        return [nt(*item) for item in results['items']]
+    nt = namedtuple(class_name + 'Tuple', results.keys())
+    return nt(**results)
+
+
+def main():
+    responses = {
+        'summary': {'reqs_per_time_period': u'19.53/sec', 'total_requests': 70293.0},
+        'series (120 points)': {
+            'fields': 'timestamp,volume,avg_latency',
+            'items': [[1399089120.0 + 30 * i, 27.0, 226074.07] for i in range(120)],
+        },
+    }
+    for name, results in sorted(responses.items()):
+        for label, func in (('uncached', tuplify_uncached), ('registry', tuplify)):
+            elapsed = timeit.timeit(lambda: func(results), number=RUNS)
+            print('{0:<20} {1:<10} {2:8.1f} us/response'.format(
+                name, label, elapsed / RUNS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
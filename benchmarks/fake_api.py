@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.fake_api
+
+A local stand-in for every TraceView API path called by the client, serving
+seeded synthetic data, so that load tests and benchmarks run offline at a
+realistic scale. Unlike :class:`StubServer <benchmarks.stub_server.StubServer>`,
+responses depend on the path and query, e.g. series honour ``time_window``
+and ``time_end``, and hosts, apps and annotations can be changed through the
+API.
+
+Usage::
+
+  $ python -m benchmarks.fake_api --apps 2000 --hosts 10000 --port 8080
+  $ python -c "import traceview; print(traceview.TraceView('KEY', authority='http://127.0.0.1:8080').apps()[:3])"
+
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+
+try:
+    from urllib.parse import parse_qsl, unquote, urlsplit
+except ImportError:  # Python 2
+    from urllib import unquote
+    from urlparse import parse_qsl, urlsplit
+
+from .stub_server import _Handler, _ThreadingHTTPServer
+
+
+#: Number of points of every series, whatever the time window.
+POINTS = 120
+
+#: Supported time windows, in seconds.
+WINDOWS = {'hour': 60 * 60, 'day': 24 * 60 * 60, 'week': 7 * 24 * 60 * 60}
+
+LAYERS = ('nginx', 'PHP', 'Python', 'wsgi', 'django', 'mysql', 'postgresql', 'memcache',
+          'redis', 'cURL', 'mongodb', 'cassandra', 'elasticsearch', 'rabbitmq')
+
+
+class SyntheticData(object):
+    """ Seeded synthetic TraceView data.
+
+    Apps, hosts and their assignments are drawn once from ``seed``. Series
+    are computed on demand from the app, the timestamp and ``seed``, so any
+    time range within ``days`` costs nothing to hold, and overlapping
+    requests of a time window agree on the points they share.
+
+    :param int apps: (optional) Number of apps.
+    :param int hosts: (optional) Number of hosts.
+    :param int days: (optional) Days of history before ``now``; earlier points are left out.
+    :param int seed: (optional) Seed of the generator.
+    :param float now: (optional) The current time, in seconds since the epoch. Defaults to the time of each request.
+
+    """
+
+    def __init__(self, apps=20, hosts=200, days=90, seed=0, now=None):
+        self.seed = seed
+        self.days = days
+        self._now = now
+        self._lock = threading.Lock()
+
+        rng = random.Random(seed)
+        created = self.now() - days * 86400
+        self.apps = {}
+        for index in range(apps):
+            self.apps['app-%d' % index if index else 'Default'] = self._profile(rng)
+
+        names = sorted(self.apps)
+        self.hosts = {}
+        self.host_apps = {}
+        self._app_hosts = dict((app, set()) for app in names)
+        for index in range(hosts):
+            host_id = 10000 + index
+            first = created + rng.uniform(0, days * 86400 / 2.0)
+            heartbeat = None if rng.random() < 0.02 else int(self.now() - rng.expovariate(1 / 600.0))
+            self.hosts[host_id] = {
+                'id': host_id,
+                'name': 'ip-10-%d-%d-%d' % (index // 65536 % 256, index // 256 % 256, index % 256),
+                'first_heartbeat': int(first),
+                'last_heartbeat': heartbeat,
+                'last_trace': None if heartbeat is None or rng.random() < 0.1 else heartbeat - rng.randint(0, 300),
+            }
+            self.host_apps[host_id] = set(rng.sample(names, min(len(names), 1 + (rng.random() < 0.2))))
+            for app in self.host_apps[host_id]:
+                self._app_hosts[app].add(host_id)
+
+        self.annotations = []
+        self.users = [{'admin': index == 0, 'name': 'User %d' % index, 'email': 'user%d@example.com' % index}
+                      for index in range(5)]
+
+    def now(self):
+        return time.time() if self._now is None else self._now
+
+    def series(self, app, kind, window, end):
+        """ Returns the ``{'fields': ..., 'items': ...}`` series of an app.
+
+        :param str app: The app name.
+        :param str kind: ``'server'``, ``'client'``, ``'total_requests'``, ``'errors'`` or a layer name.
+        :param str window: The time window name.
+        :param float end: The end of the time window.
+
+        """
+        profile = self.apps[app]
+        resolution = WINDOWS[window] // POINTS
+        last = int(end) // resolution * resolution
+        first = max(last - (POINTS - 1) * resolution, self.now() - self.days * 86400)
+        timestamps = range(last - (POINTS - 1) * resolution, last + 1, resolution)
+        timestamps = [timestamp for timestamp in timestamps if timestamp >= first]
+
+        if kind == 'total_requests':
+            return {'fields': 'timestamp,total_requests',
+                    'items': [[float(t), float(self._volume(profile, t, resolution, 0))] for t in timestamps]}
+        if kind == 'errors':
+            return {'fields': 'timestamp,error_rate',
+                    'items': [[float(t), round(profile['error_rate'] * 2 * _noise(profile['key'] + 1, t), 4)]
+                              for t in timestamps]}
+
+        if kind == 'server':
+            salt, scale, share = 0, 1.0, 1.0
+        elif kind == 'client':
+            salt, scale, share = 2, 0.05, 8.0
+        else:
+            salt, scale, share = 3 + LAYERS.index(kind), profile['layers'][kind][1], profile['layers'][kind][0]
+        items = []
+        for t in timestamps:
+            volume = self._volume(profile, t, resolution, salt) * scale
+            volume = float(int(volume))
+            latency = profile['latency'] * share * (0.5 + _noise(profile['key'] + salt + 7, t)) if volume else None
+            items.append([float(t), volume, latency])
+        return {'fields': 'timestamp,volume,avg_latency', 'items': items}
+
+    def add_app(self, app):
+        """ Adds an app, drawn from the seed and its name, if it doesn't exist. """
+        with self._lock:
+            if app not in self.apps:
+                self.apps[app] = self._profile(random.Random('%d:%s' % (self.seed, app)))
+                self._app_hosts[app] = set()
+
+    def delete_app(self, app):
+        with self._lock:
+            del self.apps[app]
+            for host_id in self._app_hosts.pop(app):
+                self.host_apps[host_id].discard(app)
+
+    def assign(self, host_id, app):
+        self.add_app(app)
+        with self._lock:
+            self.host_apps[host_id].add(app)
+            self._app_hosts[app].add(host_id)
+
+    def delete_host(self, host_id):
+        with self._lock:
+            del self.hosts[host_id]
+            for app in self.host_apps.pop(host_id):
+                self._app_hosts[app].discard(host_id)
+
+    def host_list(self):
+        with self._lock:
+            return sorted(self.hosts.values(), key=lambda host: host['id'])
+
+    def app_hosts(self, app):
+        with self._lock:
+            return [self.hosts[host_id] for host_id in sorted(self._app_hosts[app])]
+
+    def add_annotation(self, message, app=None, host=None, username=None, layer=None, when=None):
+        with self._lock:
+            annotation = {'id': len(self.annotations) + 1, 'message': message, 'app': app, 'host': host,
+                          'username': username, 'layer': layer, 'time': int(when or self.now())}
+            self.annotations.append(annotation)
+            return annotation
+
+    def _volume(self, profile, timestamp, resolution, salt):
+        daily = 1 + 0.6 * math.sin(2 * math.pi * (timestamp % 86400) / 86400.0 + profile['phase'])
+        return int(profile['rate'] * resolution * daily * (0.5 + _noise(profile['key'] + salt, timestamp)))
+
+    def _profile(self, rng):
+        # Each app goes through a few layers, each taking a share of the
+        # latency and called some number of times per request.
+        layers = rng.sample(LAYERS, rng.randint(2, 6))
+        weights = [rng.random() for _ in layers]
+        total = sum(weights)
+        return {
+            'key': rng.getrandbits(32),
+            # Mean latency in microseconds, and requests per second.
+            'latency': math.exp(rng.uniform(math.log(20000), math.log(2000000))),
+            'rate': math.exp(rng.uniform(math.log(0.05), math.log(200))),
+            'error_rate': rng.uniform(0, 0.05),
+            'phase': rng.uniform(0, 2 * math.pi),
+            'layers': dict((layer, (weight / total, rng.choice((1, 1, 2, 5))))
+                           for layer, weight in zip(layers, weights)),
+        }
+
+
+def _noise(key, timestamp):
+    """ A deterministic pseudo-random number in [0, 1) for a key and timestamp. """
+    value = (int(timestamp) * 2654435761 ^ key * 40503) & 0xffffffff
+    value = (value ^ (value >> 15)) * 2246822519 & 0xffffffff
+    value ^= value >> 13
+    return value / 4294967296.0
+
+
+class _NotFound(Exception):
+    pass
+
+
+class _FakeHandler(_Handler):
+
+    def _respond(self):
+        server = self.server
+        server.paths.append(self.path)
+        if server.latency:
+            low, high = server.latency
+            time.sleep(server.rng_uniform(low, high))
+
+        status, content = 200, None
+        if server.error_rate and server.rng_uniform(0, 1) < server.error_rate:
+            status, content = server.error_status, {'response': 'error', 'message': 'Injected error'}
+        else:
+            url = urlsplit(self.path)
+            params = dict(parse_qsl(url.query))
+            if server.api_key is not None and params.pop('key', None) != server.api_key:
+                status, content = 403, {'response': 'error', 'message': 'Invalid API key'}
+            else:
+                params.pop('key', None)
+                segments = [unquote(segment) for segment in url.path.split('/')[2:]]
+                try:
+                    content = {'response': 'ok', 'data': server.route(self.command, segments, params)}
+                except _NotFound as e:
+                    status, content = 404, {'response': 'error', 'message': str(e)}
+                except (KeyError, ValueError) as e:
+                    status, content = 400, {'response': 'error', 'message': 'Bad request: %s' % (e,)}
+
+        body = json.dumps(content).encode('utf-8')
+        encoding = None
+        if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body, encoding = compressor.compress(body) + compressor.flush(), 'gzip'
+        if server.bandwidth:
+            time.sleep(len(body) / float(server.bandwidth))
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_DELETE = _respond
+
+
+class _FakeHTTPServer(_ThreadingHTTPServer):
+
+    def route(self, method, segments, params):
+        data = self.data
+        root, rest = segments[0], segments[1:]
+        if method == 'GET' and root == 'apps' and not rest:
+            return sorted(data.apps)
+        if method == 'GET' and root == 'hosts' and not rest:
+            return data.host_list()
+        if root == 'hosts' and rest:
+            host_id = int(rest[0])
+            if host_id not in data.hosts:
+                raise _NotFound('No host %d' % host_id)
+            if method == 'DELETE' and len(rest) == 1:
+                data.delete_host(host_id)
+                return True
+            if method == 'GET' and rest[1:] == ['versions']:
+                return [{'name': 'tracelyzer', 'version': '1.3.0', 'release_date': 1374537600,
+                         'update_required': False}]
+        if root == 'app' and rest:
+            app = self._app(rest[0])
+            if method == 'DELETE' and len(rest) == 1:
+                data.delete_app(app)
+                return True
+            if method == 'GET' and rest[1:] == ['hosts']:
+                return data.app_hosts(app)
+            if method == 'GET' and rest[1:] == ['annotations']:
+                return [annotation for annotation in data.annotations if annotation['app'] == app]
+        if method == 'GET' and root == 'annotations' and not rest:
+            return list(data.annotations)
+        if method == 'POST' and root == 'log_message' and not rest:
+            app = params.get('appname')
+            if app is not None:
+                self._app(app)
+            data.add_annotation(params['message'], app, params.get('hostname'), params.get('username'),
+                                params.get('layer'), float(params['time']) if 'time' in params else None)
+            return True
+        if method == 'POST' and root == 'assign_app' and not rest:
+            host = next((host for host in list(data.hosts.values()) if host['name'] == params['hostname']), None)
+            if host is None:
+                raise _NotFound('No host %s' % params['hostname'])
+            data.assign(host['id'], params['appname'])
+            return True
+        if method == 'GET' and root == 'layers' and len(rest) == 1:
+            return sorted(data.apps[self._app(rest[0])]['layers'])
+        if method == 'GET' and root in ('latency', 'total_requests', 'errors') and rest:
+            return self._series(root, self._app(rest[0]), rest[1:], params)
+        if method == 'GET' and root in _STATIC and not rest:
+            return _STATIC[root]
+        if method == 'GET' and root == 'organization':
+            if not rest:
+                return {'fullname': 'the example organization', 'name': 'example'}
+            if rest == ['users']:
+                return data.users
+            if rest == ['licenses']:
+                return {'hosts_used': len(data.hosts), 'hosts_limit': max(10, len(data.hosts) * 2)}
+        raise _NotFound('No route for %s /%s' % (method, '/'.join(segments)))
+
+    def rng_uniform(self, low, high):
+        with self.rng_lock:
+            return self.rng.uniform(low, high)
+
+    def _app(self, app):
+        if app not in self.data.apps:
+            raise _NotFound('No app %s' % app)
+        return app
+
+    def _series(self, root, app, rest, params):
+        data = self.data
+        window = params.get('time_window', 'hour')
+        if window not in WINDOWS:
+            raise ValueError('time_window %s' % window)
+        end = float(params.get('time_end', data.now()))
+
+        if root == 'total_requests':
+            series = data.series(app, 'total_requests', window, end)
+            if rest == ['series']:
+                return series
+            if rest == ['summary']:
+                total = sum(item[1] for item in series['items'])
+                return {'total_requests': total,
+                        'reqs_per_time_period': '%.2f/sec' % (total / WINDOWS[window])}
+        elif root == 'errors' and rest == ['rate']:
+            return data.series(app, 'errors', window, end)
+        elif root == 'latency' and len(rest) == 2 and rest[0] in ('server', 'client'):
+            if rest[1] == 'series':
+                return data.series(app, rest[0], window, end)
+            if rest[1] == 'summary':
+                items = data.series(app, rest[0], window, end)['items']
+                count = sum(item[1] for item in items)
+                weighted = sum(item[1] * item[2] for item in items if item[2] is not None)
+                latest = next((item[2] for item in reversed(items) if item[2] is not None), None)
+                return {'count': count, 'average': weighted / count if count else None, 'latest': latest}
+            if rest == ['server', 'by-layer']:
+                layers = sorted(data.apps[app]['layers'])
+                if 'layer' in params:
+                    layers = [layer for layer in layers if layer == params['layer']]
+                return [{'layer': layer, 'timeseries': data.series(app, layer, window, end)} for layer in layers]
+        raise _NotFound('No route for GET /%s/%s/%s' % (root, app, '/'.join(rest)))
+
+
+_STATIC = {
+    'actions': ['admin', 'products', 'blog', 'settings', 'logout'],
+    'browsers': ['Chrome', 'Firefox', 'Safari', 'IE', 'Opera'],
+    'controllers': ['AdminController', 'ProductController', 'BlogController'],
+    'domains': ['example.com', 'www.example.com', 'api.example.com'],
+    'metrics': ['cpu_user_frac:all', 'load', 'mem_apps', 'mem_cached', 'mem_swap', 'mem_totalused'],
+    'regions': ['CA', 'CA-BC', 'MX', 'RU', 'US', 'US-RI'],
+}
+
+
+class FakeApiServer(object):
+    """ Serves :class:`SyntheticData` through the TraceView API paths on a
+    local port.
+
+    :param data: (optional) The :class:`SyntheticData` to serve. Defaults to ``SyntheticData()``.
+    :param latency: (optional) Seconds to wait before every response, or a ``(min, max)`` range to draw it from.
+    :param float error_rate: (optional) Fraction of requests answered with ``error_status`` instead.
+    :param int error_status: (optional) HTTP status of the injected errors.
+    :param str api_key: (optional) Reject requests without this key with a 403.
+    :param int seed: (optional) Seed of the injected latencies and errors.
+    :param int port: (optional) Port to listen on. Defaults to any free port.
+    :param bool compress: (optional) Gzip the responses of clients accepting it.
+    :param int bandwidth: (optional) Bytes per second to send responses at, to stand in for a slow link.
+
+    Usage::
+
+      >>> with FakeApiServer(SyntheticData(apps=1000, hosts=5000), latency=(0.01, 0.05)) as server:
+      ...     tv = traceview.TraceView('KEY', authority=server.authority)
+      ...     tv.server.latency_series_range('Default', time.time() - 30 * 86400, time.time())
+
+    """
+
+    def __init__(self, data=None, latency=0, error_rate=0, error_status=503, api_key=None,
+                 seed=0, port=0, compress=True, bandwidth=None):
+        self._httpd = _FakeHTTPServer(('127.0.0.1', port), _FakeHandler)
+        self._httpd.data = data if data is not None else SyntheticData()
+        self._httpd.paths = []
+        self._httpd.latency = latency if isinstance(latency, (tuple, list)) else \
+            ((latency, latency) if latency else None)
+        self._httpd.error_rate = error_rate
+        self._httpd.error_status = error_status
+        self._httpd.api_key = api_key
+        self._httpd.compress = compress
+        self._httpd.bandwidth = bandwidth
+        self._httpd.rng = random.Random(seed)
+        self._httpd.rng_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+
+    @property
+    def data(self):
+        """ The :class:`SyntheticData` being served. """
+        return self._httpd.data
+
+    @property
+    def paths(self):
+        """ Request paths (including query strings) received so far. """
+        return self._httpd.paths
+
+    @property
+    def authority(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic TraceView API data on a local port.")
+    parser.add_argument('--port', '-p', type=int, default=8080)
+    parser.add_argument('--apps', type=int, default=20)
+    parser.add_argument('--hosts', type=int, default=200)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0, help="Seconds to wait before every response.")
+    parser.add_argument('--error-rate', type=float, default=0, help="Fraction of requests failing with a 503.")
+    parser.add_argument('--bandwidth', type=int, default=None, help="Bytes per second to send responses at.")
+    parser.add_argument('--no-compress', dest='compress', action='store_false', help="Never gzip responses.")
+    args = parser.parse_args(argv)
+
+    data = SyntheticData(apps=args.apps, hosts=args.hosts, days=args.days, seed=args.seed)
+    server = FakeApiServer(data, latency=args.latency, error_rate=args.error_rate,
+                           seed=args.seed, port=args.port, compress=args.compress,
+                           bandwidth=args.bandwidth).start()
+    print('Serving %d apps and %d hosts on %s' % (args.apps, args.hosts, server.authority))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks.stub_server
+
+A minimal local stand-in for the TraceView API, used to benchmark the client
+without leaving the machine.
+
+"""
+
+import json
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so that clients are able to keep connections alive.
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't let Nagle's algorithm
+    # hold back the body on a kept-alive connection.
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        self.server.paths.append(self.path)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        body = self.server.body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(object):
+    """ Serves a canned TraceView API response on a local port.
+
+    :param data: (optional) The ``data`` member of every response.
+    :param float delay: (optional) Seconds to wait before every response, to stand in for network latency.
+
+    Usage::
+
+      >>> with StubServer() as server:
+      ...     tv = traceview.TraceView('KEY', authority=server.authority)
+
+    """
+
+    def __init__(self, data=None, delay=0):
+        content = {'data': data if data is not None else {}, 'response': 'ok'}
+        self._httpd = _ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.body = json.dumps(content).encode('utf-8')
+        self._httpd.paths = []
+        self._httpd.delay = delay
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+
+    @property
+    def paths(self):
+        """ Request paths (including query strings) received so far. """
+        return self._httpd.paths
+
+    @property
+    def authority(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
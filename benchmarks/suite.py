@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Offline benchmark suite for the client hot paths, writing its results as
+JSON so they can be compared between versions.
+
+Benchmarks:
+
+* ``request_overhead``: one ``Api.get`` through a canned transport adapter,
+  i.e. the client's own overhead without any socket.
+* ``request_loopback``: one ``Api.get`` against the local stub server.
+* ``request_replay``: one ``Api.get`` replayed from a cassette of 100k
+  recorded responses.
+* ``format_<formatter>_<payload>``: formatter throughput on a week of 30
+  second points and on a day of ``latency_by_layer`` results for 12 layers.
+* ``decode_<backend>_<payload>``: JSON decoding of the week, by-layer and
+  5000 hosts response bodies, with every decoder backend installed.
+* ``fanout_<apps>``: ``TraceView.batch`` over many apps, against a stub
+  server answering after 20ms.
+* ``synthetic_range_90d``: ``latency_series_range`` over 90 days, and
+  ``synthetic_inventory``: a host inventory refresh of 5000 hosts over 1000
+  apps, against the fake API serving synthetic data.
+* ``transfer_by_layer_<gzip|identity>``: a week of ``latency_by_layer``
+  results sent at 1 MB/s, with and without compression. The results
+  include the bytes received per call.
+
+Usage::
+
+  $ python -m benchmarks.suite --output before.json
+  $ python -m benchmarks.suite --output after.json --compare before.json
+
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+import requests
+from requests.adapters import BaseAdapter
+
+import traceview
+from traceview.api import Api
+from traceview.cassette import Cassette
+from traceview.decoders import available, get_decoder
+from traceview.formatters import columnar, identity, layer_matrix, tuplify
+
+from .fake_api import FakeApiServer, SyntheticData
+from .stub_server import StubServer
+
+
+WEEK_POINTS = 7 * 24 * 120
+DAY_POINTS = 24 * 120
+LAYERS = 12
+
+
+def latency_series(points, seed=0):
+    rng = random.Random(seed)
+    return {
+        'fields': 'timestamp,volume,avg_latency',
+        'items': [[1399089120.0 + 30 * i, float(rng.randint(0, 50)),
+                   rng.random() * 1e6 if i % 10 else None] for i in range(points)],
+    }
+
+
+def latency_by_layer(layers=LAYERS, points=DAY_POINTS):
+    return [{'layer': 'layer-%d' % index, 'timeseries': latency_series(points, seed=index)}
+            for index in range(layers)]
+
+
+class _CannedAdapter(BaseAdapter):
+    """ Answers every request with the same response, without a socket. """
+
+    def __init__(self, body):
+        super(_CannedAdapter, self).__init__()
+        self._body = body
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = self._body
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def measure(func, number, repeat):
+    """ Returns timing statistics of ``func``, in seconds per call. """
+    func()  # warm up
+    times = [elapsed / number for elapsed in timeit.repeat(func, number=number, repeat=repeat)]
+    mean = sum(times) / len(times)
+    stdev = math.sqrt(sum((t - mean) ** 2 for t in times) / len(times))
+    return {'mean': mean, 'min': min(times), 'stdev': stdev,
+            'number': number, 'repeat': repeat, 'unit': 's/call'}
+
+
+def bench_requests(repeat):
+    results = {}
+    series = latency_series(120)
+    body = json.dumps({'data': series}).encode('utf-8')
+
+    api = Api('KEY')
+    session = api._get_session()
+    session.mount('https://', _CannedAdapter(body))
+    results['request_overhead'] = measure(
+        lambda: api.get('latency/Default/server/series', time_window='hour'), 2000, repeat)
+    api.close()
+
+    with StubServer(series) as server:
+        api = Api('KEY', authority=server.authority)
+        results['request_loopback'] = measure(
+            lambda: api.get('latency/Default/server/series', time_window='hour'), 300, repeat)
+        api.close()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'replay.tvc')
+        with Cassette(path, mode='record') as cassette:
+            for index in range(100000):
+                url = '{0}/{1}/latency/app{2}/server/series?time_window=hour'.format(
+                    Api.AUTHORITY, Api.VERSION, index)
+                cassette.add(cassette.key('get', url), 200, body)
+        with Cassette(path) as cassette:
+            api = Api('KEY', cassette=cassette)
+            apps = itertools.cycle(range(0, 100000, 7))
+            results['request_replay'] = measure(
+                lambda: api.get('latency/app%d/server/series' % next(apps), time_window='hour'), 2000, repeat)
+            api.close()
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def bench_formatters(repeat):
+    results = {}
+    payloads = {'week': latency_series(WEEK_POINTS), 'by_layer': latency_by_layer()}
+    formatters = {'identity': identity, 'tuplify': tuplify, 'columnar': columnar}
+    for payload_name, payload in sorted(payloads.items()):
+        for formatter_name, formatter in sorted(formatters.items()):
+            if payload_name == 'by_layer':
+                if formatter is identity:
+                    func = lambda: identity(payload)
+                else:
+                    func = lambda: [formatter(layer['timeseries']) for layer in payload]
+            else:
+                func = lambda: formatter(payload)
+            results['format_{0}_{1}'.format(formatter_name, payload_name)] = measure(func, 3, repeat)
+    results['format_layer_matrix_by_layer'] = measure(
+        lambda: layer_matrix(payloads['by_layer']), 3, repeat)
+    return results
+
+
+def payloads():
+    """ Returns representative API response bodies, by name. """
+    hosts = sorted(SyntheticData(apps=100, hosts=5000).hosts.values(), key=lambda host: host['id'])
+    bodies = {'week': latency_series(WEEK_POINTS), 'by_layer': latency_by_layer(), 'hosts': hosts}
+    return dict((name, json.dumps({'data': data, 'response': 'ok'}).encode('utf-8'))
+                for name, data in bodies.items())
+
+
+def bench_decoders(repeat):
+    results = {}
+    for payload_name, body in sorted(payloads().items()):
+        for backend in available():
+            loads = get_decoder(backend)
+            result = measure(lambda: loads(body), 5, repeat)
+            result['bytes'] = len(body)
+            results['decode_{0}_{1}'.format(backend, payload_name)] = result
+    return results
+
+
+def bench_fanout(repeat, apps=(10, 100)):
+    results = {}
+    with StubServer(latency_series(120), delay=0.02) as server:
+        with traceview.TraceView('KEY', authority=server.authority, pool_size=16) as tv:
+            for count in apps:
+                calls = [(tv.server.latency_series, ('app%d' % index,)) for index in range(count)]
+                results['fanout_{0}'.format(count)] = measure(
+                    lambda: tv.batch(calls, concurrency=16), 1, repeat)
+    return results
+
+
+def bench_synthetic(repeat):
+    results = {}
+    with FakeApiServer(SyntheticData(apps=1000, hosts=5000)) as server:
+        with traceview.TraceView('KEY', authority=server.authority, pool_size=16) as tv:
+            end = server.data.now()
+            results['synthetic_range_90d'] = measure(
+                lambda: tv.server.latency_series_range('Default', end - 90 * 86400, end), 1, repeat)
+            inventory = tv.host_inventory(concurrency=16)
+            results['synthetic_inventory'] = measure(inventory.refresh, 1, repeat)
+
+    data = SyntheticData(apps=1)
+    for compress in (True, False):
+        with FakeApiServer(data, bandwidth=1024 * 1024) as server:
+            with traceview.TraceView('KEY', authority=server.authority, compress=compress) as tv:
+                name = 'transfer_by_layer_{0}'.format('gzip' if compress else 'identity')
+                results[name] = measure(lambda: tv.server.latency_by_layer('Default', time_window='week'),
+                                        3, repeat)
+                stats = tv._api.stats
+                calls = (3 * repeat + 1)
+                results[name]['wire_bytes'] = stats['wire_bytes'] // calls
+                results[name]['decoded_bytes'] = stats['decoded_bytes'] // calls
+    return results
+
+
+def environment():
+    return {
+        'traceview': traceview.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'requests': requests.__version__,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def compare(results, baseline):
+    print('{0:<32} {1:>12} {2:>12} {3:>8}'.format('benchmark', 'baseline', 'current', 'ratio'))
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['min'], results[name]['min']
+        print('{0:<32} {1:>9.3f} ms {2:>9.3f} ms {3:>7.2f}x'.format(
+            name, before * 1000, after * 1000, after / before if before else float('nan')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', '-o', help="File to write the JSON results to. Defaults to stdout.")
+    parser.add_argument('--compare', '-c', help="JSON results of a previous run to compare with.")
+    parser.add_argument('--repeat', '-r', type=int, default=5, help="Repetitions of every benchmark.")
+    parser.add_argument('--only', help="Run the benchmark groups in this comma separated list "
+                                       "(requests, formatters, decoders, fanout, synthetic).")
+    args = parser.parse_args(argv)
+
+    groups = [('requests', bench_requests), ('formatters', bench_formatters),
+              ('decoders', bench_decoders), ('fanout', bench_fanout),
+              ('synthetic', bench_synthetic)]
+    only = set(args.only.split(',')) if args.only else None
+
+    results = {}
+    for name, bench in groups:
+        if only is None or name in only:
+            results.update(bench(args.repeat))
+
+    report = {'environment': environment(), 'results': results}
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -83,6 +83,11 @@ setup(
         'requests == 2.10.0'
     ],
 
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+    },
+
     package_data={'': ['README.rst']},
     package_dir={'traceview': 'traceview'},
     include_package_data=True,
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library asyncio client
+
+"""
+
+import unittest
+
+try:
+    import asyncio
+    from traceview.aio import AsyncApi, AsyncFollower, AsyncTraceView
+except (ImportError, SyntaxError):
+    AsyncTraceView = None
+
+from benchmarks.stub_server import StubServer
+
+
+@unittest.skipIf(AsyncTraceView is None, 'asyncio client requires Python 3.5+ and aiohttp.')
+class TestAsyncTraceView(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer({'foo': 'bar'}).start()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.tv = AsyncTraceView('ABC123', authority=self.server.authority)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.tv.close())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.server.stop()
+
+    def run_async(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def test_api_class(self):
+        self.assertIsInstance(self.tv._api, AsyncApi)
+
+    def test_resource_method(self):
+        results = self.run_async(self.tv.server.latency_series('Default', time_window='hour'))
+        self.assertEqual(results, {'foo': 'bar'})
+        self.assertEqual(self.server.paths[-1],
+                         '/api-v2/latency/Default/server/series?time_window=hour&key=ABC123')
+
+    def test_annotation_is_awaitable(self):
+        self.run_async(self.tv.annotation('Code deployed', appname='Default'))
+        self.assertTrue(self.server.paths[-1].startswith('/api-v2/log_message?'))
+
+    def test_assign_is_awaitable(self):
+        self.run_async(self.tv.assign('web-1', 'Default'))
+        self.assertTrue(self.server.paths[-1].startswith('/api-v2/assign_app?'))
+
+    def test_many_in_flight(self):
+        calls = [self.tv.total_requests.series('app%d' % i) for i in range(200)]
+        results = self.run_async(asyncio.gather(*calls))
+        self.assertEqual(len(results), 200)
+        self.assertEqual(len(self.server.paths), 200)
+
+    def test_batch(self):
+        calls = [(self.tv.server.latency_series, ('app%d' % i,)) for i in range(50)]
+        calls.append((self.tv.hosts, (), {'appname': 'Default'}))
+        results = self.run_async(self.tv.batch(calls, concurrency=10))
+        self.assertEqual(len(results), 51)
+        self.assertEqual(results[0], {'foo': 'bar'})
+
+    def test_batch_errors_as_values(self):
+        def fail():
+            raise ValueError('lol')
+        results = self.run_async(self.tv.batch([fail, self.tv.apps]))
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(results[1], {'foo': 'bar'})
+
+    def test_delete_hosts(self):
+        report = self.run_async(self.tv.delete_hosts(range(20), concurrency=5))
+        self.assertTrue(report.ok)
+        self.assertEqual(len(self.server.paths), 20)
+        report = self.run_async(self.tv.assign_hosts([('web-1', 'app')], dry_run=True))
+        self.assertTrue(report.dry_run)
+        self.assertEqual(len(self.server.paths), 20)
+
+    def test_rate_limit(self):
+        tv = AsyncTraceView('ABC123', rate_limit=50, authority=self.server.authority)
+        self.run_async(tv.batch([tv.apps] * 60))
+        self.assertTrue(tv._api.stats['throttle_delay'] > 0)
+        self.run_async(tv.close())
+
+    def test_coalesce(self):
+        tv = AsyncTraceView('ABC123', coalesce=True, authority=self.server.authority)
+        results = self.run_async(asyncio.gather(*[tv.apps() for _ in range(20)]))
+        self.assertEqual(results, [{'foo': 'bar'}] * 20)
+        self.assertEqual(len(self.server.paths), 1)
+        self.assertEqual(tv._api.stats['coalesced'], 19)
+        self.run_async(tv.close())
+
+    def test_series_range(self):
+        self.server.stop()
+        self.server = StubServer({'fields': 'timestamp,volume', 'items': [[3600.0, 1]]}).start()
+        tv = AsyncTraceView('ABC123', authority=self.server.authority)
+        results = self.run_async(tv.server.latency_series_range('Default', 0, 86400 + 3600))
+        self.assertEqual(results, {'fields': 'timestamp,volume', 'items': [[3600.0, 1]]})
+        self.assertEqual(len(self.server.paths), 2)
+        self.run_async(tv.close())
+
+    def test_follower(self):
+        self.server.stop()
+        now = 1500000000.0
+        self.server = StubServer({'fields': 'timestamp,error_rate',
+                                  'items': [[now - 30, 0.1], [now, 0.2]]}).start()
+        tv = AsyncTraceView('ABC123', authority=self.server.authority)
+        follower = tv.error_rates_follower('app')
+        self.assertIsInstance(follower, AsyncFollower)
+        self.assertEqual(self.run_async(follower.poll())['items'], [[now - 30, 0.1], [now, 0.2]])
+        self.assertEqual(self.run_async(follower.poll())['items'], [])
+        self.assertEqual(len(follower), 2)
+
+        async def follow():
+            # Not an async comprehension, which is a SyntaxError before Python 3.6.
+            polls = []
+            iterator = tv.server.latency_follower('app').follow(interval=0, polls=2).__aiter__()
+            while True:
+                try:
+                    polls.append(await iterator.__anext__())
+                except StopAsyncIteration:
+                    return polls
+
+        polls = self.run_async(follow())
+        self.assertEqual([len(series['items']) for series in polls], [2, 0])
+        self.assertEqual(len(self.server.paths), 4)
+        self.run_async(tv.close())
+
+    def test_formatter(self):
+        tv = AsyncTraceView('ABC123', formatter=lambda results: 2,
+                            authority=self.server.authority)
+        self.assertEqual(self.run_async(tv.apps()), 2)
+        self.run_async(tv.close())
+
+
+if __name__ == '__main__':
+    unittest.main()
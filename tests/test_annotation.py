@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library annotation writer
+
+"""
+
+import gc
+import threading
+import time
+import unittest
+import weakref
+
+from httmock import HTTMock, all_requests, response
+import requests
+from requests.packages.urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+import traceview
+from traceview import annotation
+
+
+class TestAnnotationWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.messages = []
+        self.failures = {}
+        self.lock = threading.Lock()
+
+        @all_requests
+        def api_mock(url, request):
+            query = parse_qs(url.query)
+            message = query['message'][0]
+            with self.lock:
+                remaining = self.failures.get(message, 0)
+                if remaining:
+                    self.failures[message] = remaining - 1
+                    return response(503, {}, {}, None, 5, request)
+                self.messages.append(message)
+            return response(200, {'data': True}, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+        self.mock.__enter__()
+        self.tv = traceview.TraceView('ABC123')
+
+    def tearDown(self):
+        self.mock.__exit__(None, None, None)
+
+    def test_close_flushes(self):
+        with self.tv.annotation_writer(flush_interval=60) as writer:
+            for index in range(120):
+                self.assertTrue(writer.write('deploy %d' % index, hostname='web-%d' % index))
+        self.assertEqual(sorted(self.messages), sorted('deploy %d' % index for index in range(120)))
+        self.assertEqual(writer.stats['delivered'], 120)
+        self.assertEqual(writer.pending, 0)
+        with self.assertRaises(RuntimeError):
+            writer.write('late')
+
+    def test_closed_writer_is_released(self):
+        writer = self.tv.annotation_writer(flush_interval=60)
+        writer.write('deploy')
+        self.assertIn(writer, annotation._writers)
+        writer.close()
+        self.assertNotIn(writer, annotation._writers)
+        ref = weakref.ref(writer)
+        del writer
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_open_writers_closed_at_exit(self):
+        writer = self.tv.annotation_writer(flush_interval=60)
+        writer.write('deploy')
+        annotation._close_writers()
+        self.assertEqual(self.messages, ['deploy'])
+        with self.assertRaises(RuntimeError):
+            writer.write('late')
+
+    def test_flush_interval(self):
+        writer = self.tv.annotation_writer(flush_interval=0.05)
+        writer.write('deploy')
+        deadline = time.time() + 5
+        while not self.messages and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.messages, ['deploy'])
+        writer.close()
+
+    def test_write_does_not_block(self):
+        writer = self.tv.annotation_writer(flush_interval=60, batch_size=1000)
+        writer.write('deploy')
+        self.assertEqual(self.messages, [])
+        self.assertEqual(writer.pending, 1)
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(self.messages, ['deploy'])
+        writer.close()
+
+    def test_retries(self):
+        self.failures = {'flaky': 2, 'broken': 10}
+        with self.tv.annotation_writer(retries=2, backoff=0.001) as writer:
+            writer.write('flaky')
+            writer.write('broken')
+        self.assertEqual(self.messages, ['flaky'])
+        self.assertEqual(writer.stats['delivered'], 1)
+        self.assertEqual(writer.stats['failed'], 1)
+        self.assertEqual(writer.stats['retried'], 4)
+        annotation, error = writer.errors[0]
+        self.assertEqual(annotation['message'], 'broken')
+
+    def test_max_pending(self):
+        writer = self.tv.annotation_writer(flush_interval=60, batch_size=1000, max_pending=2)
+        self.assertTrue(writer.write('a'))
+        self.assertTrue(writer.write('b'))
+        self.assertFalse(writer.write('c'))
+        self.assertEqual(writer.stats['dropped'], 1)
+        writer.close()
+        self.assertEqual(sorted(self.messages), ['a', 'b'])
+
+    def test_exit_timeout(self):
+        self.failures = {'stuck': 100}
+        writer = self.tv.annotation_writer(flush_interval=0.01, batch_size=1, concurrency=1,
+                                           retries=100, backoff=0.01, exit_timeout=0.1)
+        writer.write('stuck')
+        writer.write('queued')
+        started = time.time()
+        annotation._close_writers()
+        self.assertTrue(time.time() - started < 1)
+        self.assertEqual(writer.stats['dropped'], 1)
+        self.assertEqual(writer.pending, 1)
+        with self.lock:
+            self.failures = {}
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(self.messages, ['stuck'])
+
+
+class TestRetryable(unittest.TestCase):
+
+    def test_connect_failures(self):
+        refused = NewConnectionError(None, 'Connection refused')
+        self.assertTrue(annotation._retryable(requests.ConnectTimeout()))
+        self.assertTrue(annotation._retryable(
+            requests.ConnectionError(MaxRetryError(None, '/', refused))))
+
+    def test_sent_requests_not_retried(self):
+        reset = ProtocolError('Connection aborted.', IOError('reset'))
+        self.assertFalse(annotation._retryable(requests.ConnectionError(reset)))
+        self.assertFalse(annotation._retryable(requests.ReadTimeout()))
+        self.assertFalse(annotation._retryable(requests.HTTPError(400, '/', '')))
+        self.assertTrue(annotation._retryable(requests.HTTPError(503, '/', '')))
+
+
+if __name__ == '__main__':
+    unittest.main()
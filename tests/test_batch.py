@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library batch calls
+
+"""
+
+import threading
+import time
+import unittest
+
+from httmock import all_requests, response, with_httmock
+import requests
+
+import traceview
+from traceview import batch
+
+
+@all_requests
+def traceview_api_mock(url, request):
+    headers = {'content-type': 'application/json'}
+    if 'broken' in url.path:
+        return response(500, {}, headers, None, 5, request)
+    content = {
+        'data': url.path,
+        'response': 'ok'
+    }
+    return response(200, content, headers, None, 5, request)
+
+
+class TestRun(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(batch.run([]), [])
+
+    def test_call_forms(self):
+        add = lambda a=0, b=0: a + b
+        results = batch.run([add, (add,), (add, (1,)), (add, (1,), {'b': 2})])
+        self.assertEqual(results, [0, 0, 1, 3])
+
+    def test_order(self):
+        def sleepy(n):
+            time.sleep(0.01 * (5 - n))
+            return n
+        results = batch.run([(sleepy, (n,)) for n in range(5)], concurrency=5)
+        self.assertEqual(results, list(range(5)))
+
+    def test_errors_as_values(self):
+        def fail():
+            raise ValueError('lol')
+        results = batch.run([fail, lambda: 1])
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(results[1], 1)
+
+    def test_concurrency_bound(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def work():
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.01)
+            with lock:
+                state['active'] -= 1
+
+        batch.run([work] * 20, concurrency=3)
+        self.assertTrue(state['peak'] <= 3)
+
+
+class TestBulk(unittest.TestCase):
+
+    def test_report(self):
+        def delete(host_id):
+            if host_id == 2:
+                raise ValueError(host_id)
+            return host_id != 3
+        report = batch.bulk(delete, [1, 2, 3, 4])
+        self.assertFalse(report.ok)
+        self.assertEqual([outcome.item for outcome in report.succeeded], [1, 4])
+        self.assertEqual([outcome.item for outcome in report.failed], [2, 3])
+        self.assertIsInstance(report.failed[0].error, ValueError)
+        self.assertEqual(repr(report), '<BulkReport [2 succeeded, 2 failed]>')
+
+    def test_tuple_items(self):
+        report = batch.bulk(lambda a, b: a + b, [(1, 2), (3, 4)])
+        self.assertEqual([outcome.result for outcome in report], [3, 7])
+        self.assertTrue(report.ok)
+
+    def test_dry_run(self):
+        def fail(item):
+            raise AssertionError('called')
+        report = batch.bulk(fail, iter([1, 2]), dry_run=True)
+        self.assertTrue(report.dry_run and report.ok)
+        self.assertEqual(len(report), 2)
+
+
+class TestTraceViewBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tv = traceview.TraceView('ABC123')
+
+    @with_httmock(traceview_api_mock)
+    def test_batch(self):
+        apps = ['one', 'broken', 'two']
+        results = self.tv.batch([(self.tv.server.latency_series, (app,)) for app in apps])
+        self.assertEqual(results[0], '/api-v2/latency/one/server/series')
+        self.assertIsInstance(results[1], requests.HTTPError)
+        self.assertEqual(results[2], '/api-v2/latency/two/server/series')
+
+    @with_httmock(traceview_api_mock)
+    def test_delete_hosts(self):
+        report = self.tv.delete_hosts([1, 'broken', 3], concurrency=2)
+        self.assertEqual([outcome.ok for outcome in report], [True, False, True])
+        self.assertEqual(report.outcomes[0].result, '/api-v2/hosts/1')
+        self.assertIsInstance(report.failed[0].error, requests.HTTPError)
+
+    @with_httmock(traceview_api_mock)
+    def test_assign_hosts(self):
+        report = self.tv.assign_hosts([['web-1', 'app'], ('web-2', 'app')])
+        self.assertTrue(report.ok)
+        self.assertEqual(report.outcomes[0].item, ('web-1', 'app'))
+
+    def test_dry_run_sends_nothing(self):
+        report = self.tv.delete_hosts(range(5000), dry_run=True)
+        self.assertEqual(len(report.succeeded), 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library response cache
+
+"""
+
+import time
+import unittest
+
+from httmock import HTTMock, all_requests, response
+
+import traceview
+from traceview.cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(max_size=2)
+
+    def test_ttl(self):
+        self.assertEqual(self.cache.ttl('apps'), 300)
+        self.assertEqual(self.cache.ttl('layers/Default'), 300)
+        self.assertEqual(self.cache.ttl('organization/licenses'), 300)
+        self.assertEqual(self.cache.ttl('latency/Default/server/series'), 0)
+
+    def test_miss_then_hit(self):
+        self.assertEqual(self.cache.lookup('apps', {}), (False, None))
+        self.cache.store('apps', {}, ['Default'])
+        self.assertEqual(self.cache.lookup('apps', {}), (True, ['Default']))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_ignores_api_key_and_param_order(self):
+        self.cache.store('layers/Default', {'key': 'A', 'since_time': 1, 'x': None}, ['PHP'])
+        hit, results = self.cache.lookup('layers/Default', {'since_time': '1', 'key': 'B'})
+        self.assertTrue(hit)
+        self.assertEqual(results, ['PHP'])
+
+    def test_uncached_path(self):
+        self.cache.store('latency/Default/server/series', {}, {})
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.lookup('latency/Default/server/series', {}), (False, None))
+        self.assertEqual(self.cache.misses, 0)
+
+    def test_expiry(self):
+        cache = ResponseCache(ttls=[(r'^apps$', 0.01)])
+        cache.store('apps', {}, ['Default'])
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup('apps', {}), (False, None))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        self.cache.store('apps', {}, 1)
+        self.cache.store('domains', {}, 2)
+        self.cache.lookup('apps', {})
+        self.cache.store('regions', {}, 3)
+        self.assertTrue(self.cache.lookup('apps', {})[0])
+        self.assertFalse(self.cache.lookup('domains', {})[0])
+        self.assertEqual(len(self.cache), 2)
+
+    def test_results_are_copies(self):
+        result = {'items': [[1.0, 2.0]]}
+        self.cache.store('apps', {}, result)
+        result['items'].append([3.0, 4.0])
+        hit = self.cache.lookup('apps', {})[1]
+        self.assertEqual(hit, {'items': [[1.0, 2.0]]})
+        hit['items'].append([5.0, 6.0])
+        self.assertEqual(self.cache.lookup('apps', {})[1], {'items': [[1.0, 2.0]]})
+
+    def test_invalidated_while_fetching(self):
+        generation = self.cache.generation()
+        self.cache.invalidate('assign_app')
+        self.cache.store('apps', {}, ['stale'], generation)
+        self.cache.store('domains', {}, ['current'], generation)
+        self.assertEqual(self.cache.lookup('apps', {}), (False, None))
+        self.assertEqual(self.cache.lookup('domains', {}), (True, ['current']))
+        self.cache.store('apps', {}, ['fresh'], self.cache.generation())
+        self.assertEqual(self.cache.lookup('apps', {}), (True, ['fresh']))
+
+    def test_invalidation_log_overflow(self):
+        generation = self.cache.generation()
+        for _ in range(ResponseCache.INVALIDATION_LOG_SIZE + 1):
+            self.cache.invalidate('log_message')
+        self.cache.store('domains', {}, ['current'], generation)
+        self.assertEqual(self.cache.lookup('domains', {}), (False, None))
+
+    def test_invalidate(self):
+        cache = ResponseCache(default_ttl=60)
+        cache.store('apps', {}, 1)
+        cache.store('hosts', {}, 2)
+        cache.store('app/Default/hosts', {}, 3)
+        cache.store('organization', {}, 4)
+        cache.invalidate('hosts/123')
+        self.assertTrue(cache.lookup('apps', {})[0])
+        self.assertFalse(cache.lookup('hosts', {})[0])
+        self.assertFalse(cache.lookup('app/Default/hosts', {})[0])
+        self.assertTrue(cache.lookup('organization', {})[0])
+        cache.invalidate('app/Default')
+        self.assertFalse(cache.lookup('apps', {})[0])
+
+
+class TestApiCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        @all_requests
+        def api_mock(url, request):
+            self.calls.append((request.method, url.path))
+            content = {'data': ['Default'], 'response': 'ok'}
+            return response(200, content, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+        self.tv = traceview.TraceView('ABC123', cache=True)
+
+    def test_disabled_by_default(self):
+        self.assertEqual(traceview.TraceView('ABC123')._api.cache, None)
+
+    def test_cached_get(self):
+        with self.mock:
+            self.assertEqual(self.tv.apps(), ['Default'])
+            self.assertEqual(self.tv.apps(), ['Default'])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.tv._api.cache.hits, 1)
+
+    def test_series_not_cached(self):
+        with self.mock:
+            self.tv.server.latency_series('Default')
+            self.tv.server.latency_series('Default')
+        self.assertEqual(len(self.calls), 2)
+
+    def test_mutation_invalidates(self):
+        with self.mock:
+            self.tv.apps()
+            self.tv.assign('web-1', 'Default')
+            self.tv.apps()
+        self.assertEqual([method for method, path in self.calls], ['GET', 'POST', 'GET'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library record and replay cassettes
+
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import traceview
+from traceview.cassette import Cassette, CassetteMiss
+
+try:
+    from traceview.aio import AsyncTraceView
+except (ImportError, SyntaxError):
+    AsyncTraceView = None
+
+from benchmarks.fake_api import FakeApiServer, SyntheticData
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'responses.tvc')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key(self):
+        cassette = Cassette(self.path, mode='record', ignore=('time_end',))
+        key = cassette.key('get', 'https://host/api-v2/apps?time_window=hour&key=SECRET&time_end=1&app=a')
+        self.assertEqual(key, b'GET /api-v2/apps?app=a&time_window=hour')
+        cassette.close()
+
+    def test_add_lookup(self):
+        with Cassette(self.path, mode='record') as cassette:
+            for index in range(1000):
+                cassette.add(('GET /%d?' % index).encode('ascii'), 200, b'{"data": %d}' % index)
+            cassette.add(b'GET /7?', 503, b'{}')
+            cassette.add(b'GET /7?', 200, b'{"data": "last"}')
+            self.assertEqual(len(cassette), 1000)
+
+        with Cassette(self.path) as cassette:
+            self.assertEqual(len(cassette), 1000)
+            self.assertEqual(cassette.lookup(b'GET /999?'), (200, b'{"data": 999}'))
+            self.assertEqual(cassette.lookup(b'GET /7?'), (200, b'{"data": "last"}'))
+            self.assertIsNone(cassette.lookup(b'GET /1000?'))
+
+    def test_large_replay(self):
+        count = 100000
+        with Cassette(self.path, mode='record') as cassette:
+            for index in range(count):
+                cassette.add(('GET /latency/app%d?' % index).encode('ascii'), 200, b'{"data": []}')
+
+        with Cassette(self.path) as cassette:
+            started = time.time()
+            for index in range(0, count, 10):
+                self.assertIsNotNone(cassette.lookup(('GET /latency/app%d?' % index).encode('ascii')))
+            self.assertTrue(time.time() - started < 5)
+
+    def test_unclosed_recording(self):
+        cassette = Cassette(self.path, mode='record')
+        cassette.add(b'GET /apps?', 200, b'{}')
+        cassette._file.flush()
+        with self.assertRaises(ValueError):
+            Cassette(self.path)
+        cassette.close()
+
+    def test_modes(self):
+        with self.assertRaises(ValueError):
+            Cassette(self.path, mode='rewind')
+        with Cassette(self.path, mode='record') as cassette:
+            with self.assertRaises(ValueError):
+                cassette.lookup(b'GET /apps?')
+        with Cassette(self.path) as cassette:
+            with self.assertRaises(ValueError):
+                cassette.add(b'GET /apps?', 200, b'{}')
+
+
+class TestRecordReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'responses.tvc')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record_then_replay(self):
+        end = 1500000000.0
+        with FakeApiServer(SyntheticData(apps=3, hosts=10, now=end)) as server:
+            with Cassette(self.path, mode='record') as cassette:
+                tv = traceview.TraceView('KEY', authority=server.authority, cassette=cassette)
+                recorded = (tv.apps(), tv.hosts(),
+                            tv.server.latency_series_range('Default', end - 3 * 86400, end),
+                            list(tv._api.get('latency/app-1/server/series', stream=True)))
+                tv.close()
+            authority = server.authority
+            requests_sent = len(server.paths)
+
+        with open(self.path, 'rb') as f:
+            self.assertNotIn(b'KEY', f.read())
+
+        with Cassette(self.path) as cassette:
+            tv = traceview.TraceView('OTHER KEY', authority=authority, cassette=cassette)
+            replayed = (tv.apps(), tv.hosts(),
+                        tv.server.latency_series_range('Default', end - 3 * 86400, end),
+                        list(tv._api.get('latency/app-1/server/series', stream=True)))
+            self.assertEqual(json.dumps(replayed), json.dumps(recorded))
+            self.assertEqual(len(cassette), requests_sent)
+            with self.assertRaises(CassetteMiss):
+                tv.server.latency_series('app-2')
+            tv.close()
+
+    @unittest.skipIf(AsyncTraceView is None, 'asyncio client requires Python 3.5+ and aiohttp.')
+    def test_async_unsupported(self):
+        with Cassette(self.path, mode='record') as cassette:
+            with self.assertRaises(TypeError):
+                AsyncTraceView('KEY', cassette=cassette)
+
+
+if __name__ == '__main__':
+    unittest.main()
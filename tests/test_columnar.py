@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library columnar timeseries
+
+"""
+
+import json
+import math
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from traceview.columnar import Columns, ColumnsBuilder
+from traceview.formatters import columnar
+from traceview.stream import TimeseriesStream
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+        self.results = {
+            'fields': 'timestamp,volume,avg_latency',
+            'items': [
+                [1.0, 10, 100.0],
+                [2.0, 0, None],
+                [3.0, 30, 300.0],
+                [4.0, 20, 200.0],
+            ]
+        }
+        self.columns = columnar(self.results)
+
+    def test_fields(self):
+        self.assertIsInstance(self.columns, Columns)
+        self.assertEqual(self.columns.fields, ('timestamp', 'volume', 'avg_latency'))
+        self.assertEqual(len(self.columns), 4)
+
+    def test_column(self):
+        self.assertEqual(list(self.columns['timestamp']), [1.0, 2.0, 3.0, 4.0])
+        self.assertTrue(math.isnan(self.columns['avg_latency'][1]))
+        self.assertEqual(list(self.columns.mask('avg_latency')), [1, 0, 1, 1])
+
+    def test_rows(self):
+        self.assertEqual(list(self.columns)[1], (2.0, 0.0, None))
+
+    def test_aggregates(self):
+        self.assertEqual(self.columns.count('avg_latency'), 3)
+        self.assertEqual(self.columns.sum('avg_latency'), 600.0)
+        self.assertEqual(self.columns.mean('avg_latency'), 200.0)
+        self.assertEqual(self.columns.mean('avg_latency', weights='volume'),
+                         (10 * 100.0 + 30 * 300.0 + 20 * 200.0) / 60)
+        self.assertEqual(self.columns.min('avg_latency'), 100.0)
+        self.assertEqual(self.columns.max('volume'), 30.0)
+
+    def test_slice(self):
+        tail = self.columns[1:3]
+        self.assertEqual(len(tail), 2)
+        self.assertEqual(list(tail.values('avg_latency')), [None, 300.0])
+        self.assertEqual(tail.mean('avg_latency'), 300.0)
+
+    def test_empty(self):
+        columns = columnar({'fields': 'timestamp,volume', 'items': []})
+        self.assertEqual(len(columns), 0)
+        self.assertEqual(columns.mean('volume'), None)
+        self.assertEqual(columns.max('volume'), None)
+
+    def test_stream(self):
+        body = json.dumps({'data': self.results}).encode('utf-8')
+        columns = columnar(TimeseriesStream([body[:20], body[20:]]))
+        self.assertEqual(list(columns.values('avg_latency')), [100.0, None, 300.0, 200.0])
+
+    def test_ragged_items(self):
+        builder = ColumnsBuilder('timestamp,volume')
+        builder.extend([[1.0, 10.0]])
+        for items in ([[2.0, 20.0], [3.0]], [[2.0, 20.0, 1.0]], [[2.0]]):
+            with self.assertRaises(ValueError):
+                builder.extend(items)
+        columns = builder.build()
+        self.assertEqual(len(columns), 1)
+        self.assertEqual(list(columns), [(1.0, 10.0)])
+
+    def test_non_timeseries(self):
+        self.assertEqual(columnar(['Default']), ['Default'])
+        self.assertEqual(columnar({'count': 1}), {'count': 1})
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed.')
+    def test_to_numpy(self):
+        volume = self.columns.to_numpy('volume')
+        self.assertEqual(volume.tolist(), [10.0, 0.0, 30.0, 20.0])
+        volume[0] = 5
+        self.assertEqual(self.columns['volume'][0], 5.0)
+        latency = self.columns.to_numpy('avg_latency', masked=True)
+        self.assertEqual(latency.mean(), 200.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library compressed transfers and byte counters
+
+"""
+
+import sys
+import unittest
+
+import requests
+
+import traceview
+from traceview.api import accept_encoding
+from traceview.instrument import MetricsAggregator
+
+try:
+    import asyncio
+    from traceview.aio import AsyncTraceView
+except (ImportError, SyntaxError):
+    AsyncTraceView = None
+
+from benchmarks.fake_api import FakeApiServer, SyntheticData
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeApiServer(SyntheticData(apps=2, hosts=10)).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_accept_encoding(self):
+        self.assertIn('gzip', accept_encoding())
+        self.assertIn('deflate', accept_encoding())
+        self.assertEqual(accept_encoding(), requests.utils.default_headers()['Accept-Encoding'])
+
+    def test_accept_encoding_without_standalone_urllib3(self):
+        saved = dict((name, sys.modules.get(name)) for name in ('urllib3', 'urllib3.util'))
+        sys.modules.update(dict.fromkeys(saved))
+        try:
+            self.assertIn('gzip', accept_encoding())
+        finally:
+            for name, module in saved.items():
+                if module is None:
+                    del sys.modules[name]
+                else:
+                    sys.modules[name] = module
+
+    def test_compressed(self):
+        metrics = MetricsAggregator()
+        with traceview.TraceView('KEY', authority=self.server.authority, instruments=[metrics]) as tv:
+            layers = tv.server.latency_by_layer('Default', time_window='week')
+            stats = tv._api.stats
+        self.assertTrue(layers)
+        self.assertTrue(0 < stats['wire_bytes'] < stats['decoded_bytes'] / 2)
+        endpoint = metrics.endpoint('get', 'latency/{app}/server/by-layer')
+        self.assertEqual((endpoint.wire_bytes, endpoint.bytes), (stats['wire_bytes'], stats['decoded_bytes']))
+
+    def test_uncompressed(self):
+        with traceview.TraceView('KEY', authority=self.server.authority, compress=False) as tv:
+            compressed = traceview.TraceView('KEY', authority=self.server.authority)
+            self.assertEqual(tv.server.latency_by_layer('Default'), compressed.server.latency_by_layer('Default'))
+            compressed.close()
+            stats = tv._api.stats
+        self.assertTrue(stats['wire_bytes'] > 0)
+        self.assertEqual(stats['wire_bytes'], stats['decoded_bytes'])
+
+    def test_streamed(self):
+        with traceview.TraceView('KEY', authority=self.server.authority) as tv:
+            with tv._api.get('latency/Default/server/series', stream=True, time_window='week') as stream:
+                self.assertEqual(len(list(stream)), 120)
+            stats = tv._api.stats
+        self.assertTrue(0 < stats['wire_bytes'] < stats['decoded_bytes'])
+
+    @unittest.skipIf(AsyncTraceView is None, 'asyncio client requires Python 3.5+ and aiohttp.')
+    def test_async(self):
+        loop = asyncio.new_event_loop()
+        for compress in (True, False):
+            tv = AsyncTraceView('KEY', authority=self.server.authority, compress=compress)
+            try:
+                loop.run_until_complete(tv.server.latency_by_layer('Default', time_window='week'))
+            finally:
+                loop.run_until_complete(tv.close())
+            stats = tv._api.stats
+            self.assertTrue(stats['wire_bytes'] > 0)
+            self.assertEqual(stats['wire_bytes'] < stats['decoded_bytes'], compress)
+        loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
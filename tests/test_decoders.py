@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library JSON decoder backends
+
+"""
+
+import json
+import sys
+import unittest
+
+from httmock import HTTMock, all_requests, response
+
+import traceview
+import traceview.api
+from traceview import decoders
+from traceview.formatters import columnar, tuplify
+
+
+PAYLOAD = json.dumps({
+    'data': {
+        'fields': 'timestamp,volume,avg_latency',
+        'items': [[1399089120.0, 27, 226074.07407407407], [1399089150.0, 0, None],
+                  [1399089180.0, 3, 1e-7], [1399089210.0, 12345678901234, -0.0]],
+        'host': u'hôte-\U0001f680',
+        'flags': [True, False, None, {}, []],
+    },
+    'response': 'ok',
+}).encode('utf-8')
+
+
+class TestDecoders(unittest.TestCase):
+
+    def test_backends_agree(self):
+        expected = json.loads(PAYLOAD.decode('utf-8'))
+        for name in decoders.available():
+            decoded = decoders.get_decoder(name)(PAYLOAD)
+            self.assertEqual(decoded, expected, name)
+            self.assertEqual(repr(decoded), repr(expected), name)
+            self.assertEqual(tuplify(decoded['data']), tuplify(expected['data']), name)
+            self.assertEqual(columnar(decoded['data']).to_results(),
+                             columnar(expected['data']).to_results(), name)
+
+    def test_auto(self):
+        self.assertIn('json', decoders.available())
+        self.assertIs(decoders.get_decoder('auto'), decoders.get_decoder(decoders.available()[0]))
+        self.assertIs(decoders.get_decoder(None), decoders.get_decoder('auto'))
+
+    def test_auto_falls_back(self):
+        blocked = dict((name, None) for name in ('orjson', 'ujson', 'simdjson'))
+        saved = dict((name, sys.modules.get(name)) for name in blocked)
+        sys.modules.update(blocked)
+        try:
+            self.assertEqual(decoders.available(), ['json'])
+            self.assertIs(decoders.get_decoder(), decoders._json_loads)
+            with self.assertRaises(ImportError):
+                decoders.get_decoder('orjson')
+        finally:
+            for name, module in saved.items():
+                if module is None:
+                    del sys.modules[name]
+                else:
+                    sys.modules[name] = module
+
+    def test_rejected_documents_fall_back(self):
+        body = b'{"a": [18446744073709551616, 1e400]}'
+        expected = json.loads(body.decode('utf-8'))
+        for name in decoders.available():
+            self.assertEqual(decoders.get_decoder(name)(body), expected, name)
+
+        def strict(body):
+            raise ValueError("Integer exceeds 64-bit range")
+
+        self.assertEqual(decoders._with_fallback(strict)(body), expected)
+        with self.assertRaises(ValueError):
+            decoders._with_fallback(strict)(b'{"a": ')
+
+    def test_callable(self):
+        loads = lambda body: {'data': 'custom'}
+        self.assertIs(decoders.get_decoder(loads), loads)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            decoders.get_decoder('yaml')
+        with self.assertRaises(ValueError):
+            traceview.TraceView('ABC123', decoder='yaml')
+
+    def test_not_installed(self):
+        saved = sys.modules.get('ujson')
+        sys.modules['ujson'] = None
+        try:
+            with self.assertRaises(ImportError):
+                traceview.TraceView('ABC123', decoder='ujson')
+            traceview.TraceView('ABC123', decoder='auto')
+        finally:
+            if saved is None:
+                del sys.modules['ujson']
+            else:
+                sys.modules['ujson'] = saved
+
+
+class TestApiDecoder(unittest.TestCase):
+
+    def setUp(self):
+        @all_requests
+        def api_mock(url, request):
+            return response(200, PAYLOAD, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+
+    def test_backends(self):
+        results = []
+        for name in decoders.available():
+            api = traceview.api.Api('ABC123', decoder=name)
+            with self.mock:
+                results.append(api.get('latency/Default/server/series'))
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_custom_decoder(self):
+        bodies = []
+
+        def loads(body):
+            bodies.append(body)
+            return json.loads(body.decode('utf-8'))
+
+        api = traceview.api.Api('ABC123', decoder=loads)
+        with self.mock:
+            api.get('apps')
+        self.assertEqual(bodies, [PAYLOAD])
+
+
+if __name__ == '__main__':
+    unittest.main()
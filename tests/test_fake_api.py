@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the local TraceView API stand-in and its synthetic data
+
+"""
+
+import unittest
+
+import requests
+
+import traceview
+from traceview.throttle import RetryPolicy
+
+from benchmarks.fake_api import FakeApiServer, SyntheticData
+
+
+NOW = 1500000000.0
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def test_seeded(self):
+        first, second = SyntheticData(seed=1, now=NOW), SyntheticData(seed=1, now=NOW)
+        self.assertEqual(first.hosts, second.hosts)
+        self.assertEqual(first.series('Default', 'server', 'day', NOW),
+                         second.series('Default', 'server', 'day', NOW))
+        self.assertNotEqual(SyntheticData(seed=2, now=NOW).series('Default', 'server', 'day', NOW),
+                            first.series('Default', 'server', 'day', NOW))
+
+    def test_series(self):
+        data = SyntheticData(now=NOW)
+        series = data.series('Default', 'server', 'hour', NOW)
+        self.assertEqual(series['fields'], 'timestamp,volume,avg_latency')
+        self.assertEqual(len(series['items']), 120)
+        self.assertEqual(series['items'][1][0] - series['items'][0][0], 30)
+        self.assertTrue(series['items'][-1][0] <= NOW)
+
+    def test_overlapping_windows_agree(self):
+        data = SyntheticData(now=NOW)
+        day = dict((item[0], item) for item in data.series('Default', 'server', 'day', NOW)['items'])
+        earlier = data.series('Default', 'server', 'day', NOW - 43200)['items']
+        shared = [item for item in earlier if item[0] in day]
+        self.assertTrue(shared)
+        self.assertTrue(all(day[item[0]] == item for item in shared))
+
+    def test_history_limit(self):
+        data = SyntheticData(days=1, now=NOW)
+        self.assertEqual(data.series('Default', 'server', 'hour', NOW - 2 * 86400)['items'], [])
+
+    def test_scale(self):
+        data = SyntheticData(apps=1000, hosts=5000, now=NOW)
+        self.assertEqual((len(data.apps), len(data.hosts)), (1000, 5000))
+        self.assertEqual(len(set(host['name'] for host in data.hosts.values())), 5000)
+
+
+class TestFakeApiServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeApiServer(SyntheticData(apps=5, hosts=50)).start()
+        self.tv = traceview.TraceView('KEY', authority=self.server.authority)
+
+    def tearDown(self):
+        self.tv.close()
+        self.server.stop()
+
+    def test_discovery(self):
+        self.assertEqual(self.tv.apps(), ['Default', 'app-1', 'app-2', 'app-3', 'app-4'])
+        self.assertEqual(self.tv.layers('Default'), sorted(self.server.data.apps['Default']['layers']))
+        for method in ('actions', 'browsers', 'controllers', 'domains', 'metrics', 'regions', 'users'):
+            self.assertTrue(getattr(self.tv, method)())
+        self.assertEqual(self.tv.licenses()['hosts_used'], 50)
+        self.assertIn('name', self.tv.organization())
+
+    def test_series_endpoints(self):
+        self.assertEqual(len(self.tv.server.latency_series('Default', time_window='day')['items']), 120)
+        self.assertEqual(self.tv.client.latency_series('Default')['fields'], 'timestamp,volume,avg_latency')
+        self.assertEqual(self.tv.total_requests.series('Default')['fields'], 'timestamp,total_requests')
+        self.assertEqual(self.tv.error_rates('Default')['fields'], 'timestamp,error_rate')
+        self.assertIn('average', self.tv.server.latency_summary('Default'))
+        self.assertIn('count', self.tv.client.latency_summary('Default'))
+        self.assertIn('reqs_per_time_period', self.tv.total_requests.summary('Default'))
+        layers = self.tv.server.latency_by_layer('Default')
+        self.assertEqual([layer['layer'] for layer in layers], self.tv.layers('Default'))
+
+    def test_series_range(self):
+        end = self.server.data.now()
+        series = self.tv.server.latency_series_range('Default', end - 30 * 86400, end)
+        timestamps = [item[0] for item in series['items']]
+        self.assertEqual(timestamps, sorted(set(timestamps)))
+        self.assertTrue(len(timestamps) > 500)
+
+    def test_hosts(self):
+        hosts = self.tv.hosts()
+        self.assertEqual(len(hosts), 50)
+        host = hosts[0]
+        self.assertTrue(self.tv.instrumentation(host['id']))
+
+        self.tv.assign(hostname=host['name'], appname='new_app')
+        self.assertEqual(self.tv.hosts(appname='new_app'), [host])
+        self.assertIn('new_app', self.tv.apps())
+
+        self.assertTrue(self.tv.delete_host(host['id']))
+        self.assertEqual(len(self.tv.hosts()), 49)
+        with self.assertRaises(requests.HTTPError):
+            self.tv.delete_host(host['id'])
+
+        inventory = self.tv.host_inventory()
+        self.assertEqual(len(inventory), 49)
+
+    def test_annotations(self):
+        self.tv.annotation('Code deployed', appname='Default', hostname='web-1')
+        self.tv.annotation('Restarted')
+        self.assertEqual(len(self.tv.annotations()), 2)
+        annotation, = self.tv.annotations(appname='Default')
+        self.assertEqual((annotation['message'], annotation['host']), ('Code deployed', 'web-1'))
+
+    def test_unknown_app(self):
+        with self.assertRaises(requests.HTTPError):
+            self.tv.server.latency_series('missing')
+
+
+class TestInjectedFaults(unittest.TestCase):
+
+    def test_error_rate(self):
+        with FakeApiServer(error_rate=0.5, seed=3) as server:
+            tv = traceview.TraceView('KEY', authority=server.authority,
+                                     retries=RetryPolicy(retries=10, backoff=0))
+            for _ in range(10):
+                self.assertTrue(tv.apps())
+            self.assertTrue(tv._api.stats['retries'] > 0)
+            tv.close()
+
+    def test_api_key(self):
+        with FakeApiServer(api_key='KEY') as server:
+            with self.assertRaises(requests.HTTPError):
+                traceview.TraceView('WRONG', authority=server.authority).apps()
+            self.assertTrue(traceview.TraceView('KEY', authority=server.authority).apps())
+
+
+if __name__ == '__main__':
+    unittest.main()
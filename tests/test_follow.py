@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library timeseries followers
+
+"""
+
+import time
+import unittest
+
+from httmock import HTTMock, all_requests, response
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+import traceview
+from traceview.formatters import tuplify
+
+
+class TestFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = []
+        self.now = int(time.time()) // 30 * 30
+        self.items = [[self.now - 90, 1.0], [self.now - 60, 2.0], [self.now - 30, 3.0]]
+
+        @all_requests
+        def api_mock(url, request):
+            self.queries.append(parse_qs(url.query))
+            content = {'data': {'fields': 'timestamp,error_rate', 'items': self.items}}
+            return response(200, content, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+
+    def test_poll_returns_new_points(self):
+        tv = traceview.TraceView('ABC123')
+        follower = tv.error_rates_follower('app', layer='PHP')
+        with self.mock:
+            first = follower.poll()
+            self.items = self.items[1:] + [[self.now, 4.0]]
+            follower._resolution = None
+            second = follower.poll()
+
+        self.assertEqual(first['items'], [[self.now - 90, 1.0], [self.now - 60, 2.0], [self.now - 30, 3.0]])
+        self.assertEqual(second, {'fields': 'timestamp,error_rate', 'items': [[self.now, 4.0]]})
+        self.assertEqual(self.queries[0]['time_window'], ['hour'])
+        self.assertEqual(self.queries[0]['layer'], ['PHP'])
+        self.assertEqual(follower.last_timestamp, self.now)
+        self.assertEqual(len(follower), 4)
+
+    def test_ring_buffer(self):
+        tv = traceview.TraceView('ABC123', tuplify)
+        follower = tv.total_requests.follower('app', size=2)
+        with self.mock:
+            new = follower.poll()
+        self.assertEqual(len(new), 2)
+        snapshot = follower.snapshot()
+        self.assertEqual([point.timestamp for point in snapshot], [self.now - 60, self.now - 30])
+
+    def test_snapshot_before_poll(self):
+        tv = traceview.TraceView('ABC123', tuplify)
+        follower = tv.total_requests.follower('app')
+        self.assertEqual(follower.snapshot(), {'fields': None, 'items': []})
+
+    def test_unbounded(self):
+        tv = traceview.TraceView('ABC123')
+        follower = tv.total_requests.follower('app', size=None)
+        with self.mock:
+            self.assertEqual(len(follower.poll()['items']), 3)
+        self.assertEqual(len(follower.snapshot()['items']), 3)
+
+    def test_skips_poll_before_next_point(self):
+        tv = traceview.TraceView('ABC123')
+        follower = tv.server.latency_follower('app')
+        self.items = [[self.now + 3600, 1.0], [self.now + 3630, 2.0]]
+        with self.mock:
+            follower.poll()
+            empty = follower.poll()
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual(empty['items'], [])
+
+    def test_window(self):
+        follower = traceview.TraceView('ABC123').client.latency_follower('app')
+        self.assertEqual(follower._window(1000, None), 'hour')
+        self.assertEqual(follower._window(1000, 970), 'hour')
+        self.assertEqual(follower._window(3 * 3600, 0), 'day')
+        self.assertEqual(follower._window(30 * 86400, 0), 'week')
+
+    def test_follow(self):
+        tv = traceview.TraceView('ABC123')
+        follower = tv.total_requests.follower('app')
+        with self.mock:
+            polls = list(follower.follow(interval=0, polls=2))
+        self.assertEqual(len(polls[0]['items']), 3)
+        self.assertEqual(polls[1]['items'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,9 +6,11 @@ Tests for TraceView API Library
 
 """
 
+from collections import OrderedDict
+import threading
 import unittest
 
-from traceview.formatters import tuplify
+from traceview.formatters import RecordRegistry, tuplify
 
 
 class TestTuplifyTimeseries(unittest.TestCase):
@@ -39,6 +41,12 @@ class TestTuplifyTimeseries(unittest.TestCase):
         actual = tuplify(self.results, 'Lol')
         self.assertEqual(actual[0].__class__.__name__, 'LolTuple')
 
+    def test_tuplify_reuses_type(self):
+        first = tuplify(self.results)
+        second = tuplify({'fields': 'one,two,three', 'items': [[1, 2, 3]]})
+        self.assertIs(type(first[0]), type(second[0]))
+        self.assertEqual(first[0], second[0])
+
 
 class TestTuplifyDict(unittest.TestCase):
 
@@ -55,6 +63,36 @@ class TestTuplifyDict(unittest.TestCase):
         self.assertEqual(actual.total_requests, 980)
         self.assertEqual(actual.reqs_per_time_period, '0.27/sec')
 
+    def test_tuplify_key_order(self):
+        first = tuplify(OrderedDict([('total_requests', 980), ('reqs_per_time_period', '0.27/sec')]))
+        second = tuplify(OrderedDict([('reqs_per_time_period', '0.28/sec'), ('total_requests', 990)]))
+        self.assertIs(type(first), type(second))
+        self.assertEqual(first._fields, ('reqs_per_time_period', 'total_requests'))
+        self.assertEqual(tuple(second), ('0.28/sec', 990))
+
+
+class TestRecordRegistry(unittest.TestCase):
+
+    def test_get(self):
+        registry = RecordRegistry()
+        record_type = registry.get('FooTuple', 'a,b')
+        self.assertIs(registry.get('FooTuple', ['a', 'b']), record_type)
+        self.assertIsNot(registry.get('BarTuple', 'a,b'), record_type)
+        self.assertIsNot(registry.get('FooTuple', 'a,c'), record_type)
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(record_type.__slots__, ())
+
+    def test_threads(self):
+        registry = RecordRegistry()
+        types = []
+        threads = [threading.Thread(target=lambda: types.append(registry.get('T', 'a,b')))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(types)), 1)
+
 
 class TestTuplifyList(unittest.TestCase):
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library import time
+
+"""
+
+import subprocess
+import sys
+import unittest
+
+import traceview
+
+
+def run_python(code, *options):
+    args = [sys.executable] + list(options) + ['-c', code]
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+
+def imported_after(code):
+    stdout, _ = run_python(code + '; import sys; print(" ".join(sorted(sys.modules)))')
+    return set(stdout.split())
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'Lazy imports require Python 3.7+.')
+class TestLazyImport(unittest.TestCase):
+
+    def test_import_is_lazy(self):
+        modules = imported_after('import traceview')
+        self.assertNotIn('requests', modules)
+        self.assertNotIn('traceview.latency', modules)
+        self.assertNotIn('multiprocessing.pool', modules)
+
+    def test_construct_is_lazy(self):
+        modules = imported_after('import traceview; traceview.TraceView("KEY")')
+        self.assertNotIn('requests', modules)
+        self.assertNotIn('traceview.latency', modules)
+
+    def test_resource_import_on_access(self):
+        modules = imported_after('import traceview; traceview.TraceView("KEY").server')
+        self.assertIn('traceview.latency', modules)
+        self.assertNotIn('traceview.discovery', modules)
+
+    def test_importtime(self):
+        # Cumulative import time, in microseconds, reported by `python -X importtime`.
+        _, stderr = run_python('import traceview', '-X', 'importtime')
+        lines = [line.split('|') for line in stderr.splitlines() if line.startswith('import time:')]
+        cumulative = dict((line[2].strip(), int(line[1])) for line in lines[1:])
+        self.assertIn('traceview', cumulative)
+        self.assertNotIn('requests', cumulative)
+
+
+class TestLazyExports(unittest.TestCase):
+
+    def test_exports(self):
+        from traceview.latency import Server
+        self.assertIs(traceview.Server, Server)
+        self.assertIn('TotalRequests', dir(traceview))
+
+    def test_missing_export(self):
+        with self.assertRaises(AttributeError):
+            traceview.NotAResource
+
+    def test_resources_built_once(self):
+        tv = traceview.TraceView('KEY')
+        self.assertIs(tv.server, tv.server)
+        self.assertIs(tv.server.api, tv._api)
+        self.assertIsInstance(tv.total_requests, traceview.TotalRequests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library request instrumentation
+
+"""
+
+import unittest
+
+from httmock import HTTMock, all_requests, response
+import requests
+
+import traceview
+import traceview.api
+from traceview.formatters import tuplify
+from traceview.instrument import BUCKETS, Instrument, MetricsAggregator, RequestEvent, path_template
+from traceview.throttle import RetryPolicy
+
+try:
+    import asyncio
+    from traceview.aio import AsyncTraceView
+except (ImportError, SyntaxError):
+    AsyncTraceView = None
+
+from benchmarks.stub_server import StubServer
+
+
+class Recorder(Instrument):
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+
+    def request_started(self, event):
+        self.started.append(event)
+
+    def request_finished(self, event):
+        self.finished.append(event)
+
+
+class TestPathTemplate(unittest.TestCase):
+
+    def test_templates(self):
+        self.assertEqual(path_template('latency/Default/server/series'), 'latency/{app}/server/series')
+        self.assertEqual(path_template('app/Default/hosts'), 'app/{app}/hosts')
+        self.assertEqual(path_template('hosts/123/versions'), 'hosts/{host_id}/versions')
+        self.assertEqual(path_template('hosts'), 'hosts')
+        self.assertEqual(path_template('apps'), 'apps')
+
+
+class TestMetricsAggregator(unittest.TestCase):
+
+    def event(self, duration, status=200, error=None, path='latency/Default/server/series'):
+        event = RequestEvent('get', path)
+        event.status = status
+        event.finish(error)
+        event.duration = duration
+        return event
+
+    def test_histogram(self):
+        metrics = MetricsAggregator()
+        for duration in [0.002] * 90 + [0.3] * 9 + [20.0]:
+            metrics.request_finished(self.event(duration))
+        endpoint = metrics.endpoint('GET', 'latency/{app}/server/series')
+        self.assertEqual(endpoint.count, 100)
+        self.assertEqual(sum(endpoint.histogram), 100)
+        self.assertEqual(endpoint.histogram[-1], 1)
+        self.assertEqual(endpoint.quantile(0.5), 0.0025)
+        self.assertEqual(endpoint.quantile(0.95), 0.5)
+        self.assertEqual(endpoint.quantile(1), 20.0)
+        self.assertEqual(endpoint.max, 20.0)
+
+    def test_endpoints(self):
+        metrics = MetricsAggregator()
+        metrics.request_finished(self.event(0.1))
+        metrics.request_finished(self.event(0.1, path='latency/other/server/series'))
+        metrics.request_finished(self.event(0.5, 503, ValueError('lol'), path='hosts/1'))
+        self.assertEqual(len(metrics), 2)
+        slowest = metrics.endpoints()[0]
+        self.assertEqual((slowest.template, slowest.errors, slowest.statuses), ('hosts/{host_id}', 1, {503: 1}))
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['GET latency/{app}/server/series']['count'], 2)
+        self.assertEqual(len(snapshot['GET hosts/{host_id}']['histogram']), len(BUCKETS) + 1)
+        self.assertIn('GET hosts/{host_id}', metrics.report())
+
+        metrics.reset()
+        self.assertEqual(len(metrics), 0)
+
+
+class TestApiInstruments(unittest.TestCase):
+
+    def setUp(self):
+        self.statuses = []
+
+        @all_requests
+        def api_mock(url, request):
+            status = self.statuses.pop(0) if self.statuses else 200
+            headers = {'content-type': 'application/json'}
+            content = {'data': {'fields': 'timestamp,volume', 'items': [[1, 2.0]]}}
+            return response(status, content, headers, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+        self.recorder = Recorder()
+
+    def test_events(self):
+        api = traceview.api.Api('ABC123', instruments=[self.recorder], after_request=tuplify)
+        with self.mock:
+            api.get('latency/Default/server/series')
+        self.assertEqual(len(self.recorder.started), 1)
+        event = self.recorder.finished[0]
+        self.assertEqual((event.method, event.template, event.status, event.attempts),
+                         ('GET', 'latency/{app}/server/series', 200, 1))
+        self.assertTrue(event.bytes > 0)
+        self.assertTrue(event.duration >= sum(event.timings.values()))
+        self.assertTrue(all(seconds > 0 for seconds in event.timings.values()))
+
+    def test_retries_and_errors(self):
+        api = traceview.api.Api('ABC123', instruments=[self.recorder],
+                                retries=RetryPolicy(retries=1, backoff=0))
+        self.statuses = [503, 200, 503, 503]
+        with self.mock:
+            api.get('apps')
+            with self.assertRaises(requests.HTTPError):
+                api.get('apps')
+        first, second = self.recorder.finished
+        self.assertEqual((first.attempts, first.status, first.error), (2, 200, None))
+        self.assertEqual((second.attempts, second.status), (2, 503))
+        self.assertIsInstance(second.error, requests.HTTPError)
+
+    def test_cached(self):
+        api = traceview.api.Api('ABC123', instruments=[self.recorder], cache=True)
+        with self.mock:
+            api.get('apps')
+            api.get('apps')
+        self.assertEqual([event.cached for event in self.recorder.finished], [False, True])
+        self.assertEqual(self.recorder.finished[1].attempts, 0)
+
+    def test_failing_instrument(self):
+        class Broken(Instrument):
+            def request_finished(self, event):
+                raise ValueError('lol')
+
+        api = traceview.api.Api('ABC123', instruments=[Broken(), self.recorder])
+        with self.mock:
+            self.assertEqual(api.get('apps')['items'], [[1, 2.0]])
+        self.assertEqual(len(self.recorder.finished), 1)
+
+    def test_no_instruments(self):
+        api = traceview.api.Api('ABC123')
+        self.assertIsNone(api._start_event('get', 'apps'))
+
+    def test_get_range(self):
+        metrics = MetricsAggregator()
+        tv = traceview.TraceView('ABC123', instruments=[metrics])
+        with self.mock:
+            tv._api.get_range('latency/Default/server/series', 0, 3 * 86400)
+        endpoint = metrics.endpoint('get', 'latency/{app}/server/series')
+        self.assertEqual(endpoint.count, 3)
+
+
+@unittest.skipIf(AsyncTraceView is None, 'asyncio client requires Python 3.5+ and aiohttp.')
+class TestAsyncInstruments(unittest.TestCase):
+
+    def test_events(self):
+        recorder = Recorder()
+        with StubServer({'foo': 'bar'}) as server:
+            loop = asyncio.new_event_loop()
+            tv = AsyncTraceView('ABC123', authority=server.authority, instruments=[recorder])
+            try:
+                loop.run_until_complete(tv.server.latency_series('Default'))
+            finally:
+                loop.run_until_complete(tv.close())
+                loop.close()
+        event, = recorder.finished
+        self.assertEqual((event.template, event.status, event.attempts), ('latency/{app}/server/series', 200, 1))
+        self.assertTrue(event.bytes > 0)
+        self.assertTrue(event.timings['connect'] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,16 +23,21 @@ class TestTraceViewInterface(unittest.TestCase):
     def test_methods_interface(self):
         self.assertMethodExists(self.tv, 'actions')
         self.assertMethodExists(self.tv, 'annotation')
+        self.assertMethodExists(self.tv, 'annotation_writer')
         self.assertMethodExists(self.tv, 'annotations')
         self.assertMethodExists(self.tv, 'apps')
         self.assertMethodExists(self.tv, 'assign')
+        self.assertMethodExists(self.tv, 'assign_hosts')
         self.assertMethodExists(self.tv, 'browsers')
         self.assertMethodExists(self.tv, 'controllers')
         self.assertMethodExists(self.tv, 'delete')
         self.assertMethodExists(self.tv, 'delete_app')
         self.assertMethodExists(self.tv, 'delete_host')
+        self.assertMethodExists(self.tv, 'delete_hosts')
         self.assertMethodExists(self.tv, 'domains')
         self.assertMethodExists(self.tv, 'error_rates')
+        self.assertMethodExists(self.tv, 'error_rates_follower')
+        self.assertMethodExists(self.tv, 'host_inventory')
         self.assertMethodExists(self.tv, 'hosts')
         self.assertMethodExists(self.tv, 'instrumentation')
         self.assertMethodExists(self.tv, 'layers')
@@ -45,16 +50,22 @@ class TestTraceViewInterface(unittest.TestCase):
 
     def test_client_interface(self):
         self.assertTrue(hasattr(self.tv, 'client'))
+        self.assertMethodExists(self.tv.client, 'latency_follower')
         self.assertMethodExists(self.tv.client, 'latency_series')
+        self.assertMethodExists(self.tv.client, 'latency_series_range')
         self.assertMethodExists(self.tv.client, 'latency_summary')
 
     def test_server_interface(self):
         self.assertTrue(hasattr(self.tv, 'server'))
         self.assertMethodExists(self.tv.server, 'latency_by_layer')
+        self.assertMethodExists(self.tv.server, 'latency_follower')
         self.assertMethodExists(self.tv.server, 'latency_series')
+        self.assertMethodExists(self.tv.server, 'latency_series_range')
         self.assertMethodExists(self.tv.server, 'latency_summary')
 
     def test_total_requests_interface(self):
         self.assertTrue(hasattr(self.tv, 'total_requests'))
+        self.assertMethodExists(self.tv.total_requests, 'follower')
         self.assertMethodExists(self.tv.total_requests, 'series')
+        self.assertMethodExists(self.tv.total_requests, 'series_range')
         self.assertMethodExists(self.tv.total_requests, 'summary')
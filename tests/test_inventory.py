@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library host inventory
+
+"""
+
+import threading
+import unittest
+
+from httmock import HTTMock, all_requests, response
+
+import traceview
+
+
+def host(host_id, name, heartbeat, trace=None):
+    return {'id': host_id, 'name': name, 'first_heartbeat': 0,
+            'last_heartbeat': heartbeat, 'last_trace': trace}
+
+
+class TestHostInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.hosts = [host(1, 'web-1', 100, 90), host(2, 'web-2', 200),
+                      host(3, 'db-1', 300, 300), host(4, 'new', None)]
+        self.apps = {'web': [1, 2], 'db': [3]}
+        self.requests = 0
+
+        @all_requests
+        def api_mock(url, request):
+            self.requests += 1
+            path = url.path.replace('/api-v2/', '')
+            if path == 'hosts':
+                data = self.hosts
+            elif path == 'apps':
+                data = sorted(self.apps)
+            else:
+                ids = self.apps[path.split('/')[1]]
+                data = [h for h in self.hosts if h['id'] in ids]
+            return response(200, {'data': data}, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+        self.mock.__enter__()
+        self.tv = traceview.TraceView('ABC123')
+        self.inventory = self.tv.host_inventory()
+
+    def tearDown(self):
+        self.inventory.stop()
+        self.mock.__exit__(None, None, None)
+
+    def test_indexes(self):
+        self.assertEqual(len(self.inventory), 4)
+        self.assertIn(3, self.inventory)
+        self.assertEqual(self.inventory.get(2)['name'], 'web-2')
+        self.assertEqual(self.inventory.by_name('db-1')['id'], 3)
+        self.assertIsNone(self.inventory.by_name('missing'))
+        self.assertEqual([h['id'] for h in self.inventory.by_app('web')], [1, 2])
+        self.assertEqual(self.inventory.apps_of(3), ['db'])
+
+    def test_range_queries(self):
+        ids = lambda hosts: [h['id'] for h in hosts]
+        self.assertEqual(ids(self.inventory.heartbeat_between(100, 200)), [1, 2])
+        self.assertEqual(ids(self.inventory.heartbeat_between(start=150)), [2, 3])
+        self.assertEqual(ids(self.inventory.traced_between(end=100)), [1])
+        self.assertEqual(ids(self.inventory.stale(50, now=260)), [4, 1, 2])
+
+    def test_refresh_diff(self):
+        self.hosts = [host(1, 'web-1', 400, 90), host(2, 'web-2', 200),
+                      host(4, 'new', None), host(5, 'web-3', 350)]
+        self.apps = {'web': [1, 2, 5], 'db': [], 'jobs': [2]}
+        diff = self.inventory.refresh()
+        self.assertEqual([h['id'] for h in diff.added], [5])
+        self.assertEqual([h['id'] for h in diff.removed], [3])
+        self.assertEqual(sorted(h['id'] for h in diff.changed), [1, 2])
+        self.assertIsNone(self.inventory.by_name('db-1'))
+        self.assertEqual(self.inventory.by_app('db'), [])
+        self.assertEqual(self.inventory.apps_of(2), ['jobs', 'web'])
+        self.assertEqual([h['id'] for h in self.inventory.heartbeat_between(300)], [5, 1])
+        self.assertFalse(self.inventory.refresh())
+
+    def test_without_apps(self):
+        self.requests = 0
+        inventory = self.tv.host_inventory(apps=False)
+        self.assertEqual(self.requests, 1)
+        self.assertEqual(inventory.by_app('web'), [])
+
+    def test_background_refresh(self):
+        changes = []
+        event = threading.Event()
+
+        def on_change(diff):
+            changes.append(diff)
+            event.set()
+
+        self.inventory.start(interval=0.01, on_change=on_change)
+        self.hosts = self.hosts[1:]
+        self.assertTrue(event.wait(5))
+        self.inventory.stop()
+        self.assertEqual([h['id'] for h in changes[0].removed], [1])
+        self.assertNotIn(1, self.inventory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library layer matrices
+
+"""
+
+import math
+import unittest
+
+from traceview.formatters import layer_matrix
+from traceview.matrix import LayerMatrix
+
+
+RESULTS = [
+    {'layer': 'PHP', 'timeseries': {'fields': 'timestamp,volume,avg_latency',
+                                    'items': [[0.0, 10, 100.0], [30.0, 20, 50.0], [60.0, 10, None]]}},
+    {'layer': 'mysql', 'timeseries': {'fields': 'timestamp,volume,avg_latency',
+                                      'items': [[30.0, 20, 25.0], [90.0, 5, 200.0]]}},
+]
+
+
+def isnan(value):
+    return value != value
+
+
+class TestLayerMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = LayerMatrix.from_results(RESULTS)
+
+    def test_alignment(self):
+        self.assertEqual(self.matrix.layers, ('PHP', 'mysql'))
+        self.assertEqual(self.matrix.index, {'PHP': 0, 'mysql': 1})
+        self.assertEqual(self.matrix.shape, (2, 4))
+        self.assertEqual(list(self.matrix.timestamps), [0.0, 30.0, 60.0, 90.0])
+        self.assertEqual(self.matrix.fields, ('volume', 'avg_latency'))
+
+    def test_row(self):
+        self.assertEqual(list(self.matrix.row('PHP', 'volume'))[:3], [10.0, 20.0, 10.0])
+        latency = list(self.matrix.row('mysql', 'avg_latency'))
+        self.assertTrue(isnan(latency[0]) and isnan(latency[2]))
+        self.assertEqual([latency[1], latency[3]], [25.0, 200.0])
+
+    def test_column(self):
+        self.assertEqual(list(self.matrix.column(30.0, 'volume')), [20.0, 20.0])
+        with self.assertRaises(KeyError):
+            self.matrix.column(45.0, 'volume')
+
+    def test_share(self):
+        self.assertEqual(self.matrix.time_spent(), {'PHP': 2000.0, 'mysql': 1500.0})
+        share = self.matrix.share()
+        self.assertAlmostEqual(share['PHP'], 2000.0 / 3500)
+        self.assertAlmostEqual(share['mysql'], 1500.0 / 3500)
+
+    def test_shares(self):
+        shares = self.matrix.shares()
+        self.assertEqual(list(shares.row('PHP', 'share'))[:2], [1.0, 1000.0 / 1500])
+        self.assertTrue(math.isnan(shares.row('PHP', 'share')[2]))
+        self.assertEqual(shares.row('mysql', 'share')[3], 1.0)
+
+    def test_to_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+        array = self.matrix.to_numpy('volume')
+        self.assertEqual(array.shape, (2, 4))
+        self.assertEqual(numpy.nansum(array, axis=1).tolist(), [40.0, 25.0])
+
+    def test_empty(self):
+        matrix = LayerMatrix.from_results([{'layer': 'PHP', 'timeseries': {}}])
+        self.assertEqual(matrix.shape, (1, 0))
+
+    def test_formatter(self):
+        self.assertIsInstance(layer_matrix(RESULTS), LayerMatrix)
+        self.assertEqual(layer_matrix(['Default']), ['Default'])
+        self.assertEqual(layer_matrix({'count': 1}), {'count': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
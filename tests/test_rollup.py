@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library timeseries rollups
+
+"""
+
+import random
+import unittest
+
+from traceview import rollup as rollup_module
+from traceview.formatters import columnar
+from traceview.rollup import Rollup, rollup
+
+
+def latency_series(points=1000, start=1399089120.0):
+    random.seed(points)
+    return {
+        'fields': 'timestamp,volume,avg_latency',
+        'items': [[start + 30 * i, float(random.randint(0, 50)),
+                   random.random() * 1e6 if i % 7 else None] for i in range(points)],
+    }
+
+
+def naive(results, interval):
+    buckets = {}
+    for timestamp, volume, latency in results['items']:
+        buckets.setdefault(timestamp // interval * interval, []).append((volume, latency))
+    items = []
+    for bucket in sorted(buckets):
+        points = buckets[bucket]
+        weighted = [(v, l) for v, l in points if l is not None]
+        weight = sum(v for v, _ in weighted)
+        items.append([bucket, sum(v for v, _ in points),
+                      sum(v * l for v, l in weighted) / weight if weight else None])
+    return items
+
+
+class TestRollup(unittest.TestCase):
+
+    def assertItemsClose(self, first, second):
+        self.assertEqual(len(first), len(second))
+        for a, b in zip(first, second):
+            self.assertEqual(len(a), len(b))
+            for x, y in zip(a, b):
+                if x is None or y is None:
+                    self.assertEqual(x, y)
+                else:
+                    self.assertAlmostEqual(x, y, delta=abs(y) * 1e-9)
+
+    def test_weighted_mean_and_sum(self):
+        results = latency_series()
+        rolled = rollup(results, 300)
+        self.assertEqual(rolled['fields'], 'timestamp,volume,avg_latency')
+        self.assertItemsClose(rolled['items'], naive(results, 300))
+
+    def test_chunks(self):
+        results = latency_series()
+        self.assertItemsClose(rollup(results, 3600, chunk_size=7)['items'], naive(results, 3600))
+
+    def test_columns(self):
+        results = latency_series()
+        rolled = rollup(columnar(results), 300, chunk_size=100)
+        self.assertItemsClose(rolled['items'], naive(results, 300))
+
+    def test_aggregations(self):
+        results = {'fields': 'timestamp,value', 'items': [[0, 1], [10, None], [20, 3], [60, 5]]}
+        for aggregation, expected in (('sum', [4.0, 5.0]), ('count', [2, 1]), ('mean', [2.0, 5.0]),
+                                      ('min', [1.0, 5.0]), ('max', [3.0, 5.0])):
+            rolled = rollup(results, 60, {'value': aggregation})
+            self.assertEqual([item[1] for item in rolled['items']], expected)
+
+    def test_missing_values(self):
+        results = {'fields': 'timestamp,value', 'items': [[0, None], [10, None]]}
+        self.assertEqual(rollup(results, 60)['items'], [[0.0, None]])
+        self.assertEqual(rollup(results, 60, {'value': 'count'})['items'], [[0.0, 0]])
+
+    def test_offset(self):
+        rolled = Rollup('timestamp,value', 60, offset=30)
+        rolled.add([[10, 1], [40, 2], [80, 3]])
+        self.assertEqual(rolled.results()['items'], [[-30.0, 1.0], [30.0, 2.5]])
+
+    def test_unsorted_chunks(self):
+        rolled = Rollup('timestamp,total_requests', 60)
+        rolled.add([[70, 1], [10, 2]])
+        rolled.add([[20, 3]])
+        self.assertEqual(rolled.results()['items'], [[0.0, 5.0], [60.0, 1.0]])
+
+    def test_unknown_aggregation(self):
+        with self.assertRaises(ValueError):
+            Rollup('timestamp,value', 60, {'value': 'median'})
+
+
+class TestPurePythonRollup(TestRollup):
+
+    def setUp(self):
+        self._numpy = rollup_module._numpy
+        rollup_module._numpy = lambda: None
+
+    def tearDown(self):
+        rollup_module._numpy = self._numpy
+
+
+if __name__ == '__main__':
+    unittest.main()
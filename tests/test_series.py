@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library time range series
+
+"""
+
+import unittest
+
+from httmock import HTTMock, all_requests, response
+import requests
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+import traceview
+from traceview import series
+from traceview.formatters import tuplify
+
+
+HOUR, DAY, WEEK = 3600, 86400, 604800
+
+
+class TestPlan(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(series.plan(10, 10), [])
+
+    def test_exact_week(self):
+        self.assertEqual(series.plan(0, WEEK), [('week', WEEK)])
+
+    def test_single_window(self):
+        end = 2 * WEEK + DAY + 90 * 60
+        self.assertEqual(series.plan(0, end), [
+            ('week', end),
+            ('week', end - WEEK),
+            ('week', end - 2 * WEEK),
+        ])
+
+    def test_ninety_days(self):
+        windows = [window for window, _ in series.plan(0, 90 * DAY)]
+        self.assertEqual(windows, ['week'] * 13)
+
+    def test_time_window(self):
+        self.assertEqual(series.window(0, DAY + HOUR), 'day')
+        self.assertEqual(series.window(0, 10), 'hour')
+        self.assertEqual(series.plan(0, 2 * HOUR, 'hour'), [('hour', 2 * HOUR), ('hour', HOUR)])
+        with self.assertRaises(ValueError):
+            series.plan(0, HOUR, 'month')
+
+
+class TestStitch(unittest.TestCase):
+
+    def test_stitch(self):
+        results = [
+            {'fields': 'timestamp,value', 'items': [[30, 3], [40, 4], [50, 5]]},
+            {'fields': 'timestamp,value', 'items': [[0, 0], [10, 1], [20, 2], [30, 3]]},
+            {'fields': 'timestamp,value', 'items': []},
+        ]
+        stitched = series.stitch(results, 10, 40)
+        self.assertEqual(stitched, {
+            'fields': 'timestamp,value',
+            'items': [[10, 1], [20, 2], [30, 3], [40, 4]],
+        })
+
+
+class TestSeriesRange(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = []
+
+        @all_requests
+        def api_mock(url, request):
+            query = parse_qs(url.query)
+            self.queries.append(query)
+            if 'broken' in url.path:
+                return response(500, {}, {}, None, 5, request)
+            size = dict(series.WINDOWS)[query['time_window'][0]]
+            end = float(query['time_end'][0])
+            items = [[end - offset, 1] for offset in range(0, size + 1, 1800)]
+            content = {'data': {'fields': 'timestamp,total_requests', 'items': items}}
+            return response(200, content, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+
+    def test_series_range(self):
+        tv = traceview.TraceView('ABC123')
+        with self.mock:
+            results = tv.total_requests.series_range('app', 0, DAY + 2 * HOUR)
+        self.assertEqual([query['time_window'] for query in self.queries], [['day'], ['day']])
+        timestamps = [item[0] for item in results['items']]
+        self.assertEqual(timestamps, [float(t) for t in range(0, DAY + 2 * HOUR + 1, 1800)])
+
+    def test_time_window(self):
+        tv = traceview.TraceView('ABC123')
+        with self.mock:
+            tv.total_requests.series_range('app', 0, 2 * HOUR, time_window='hour')
+        self.assertEqual(sorted(query['time_end'][0] for query in self.queries), ['3600', '7200'])
+        self.assertEqual(set(query['time_window'][0] for query in self.queries), set(['hour']))
+
+    def test_filters_and_formatter(self):
+        tv = traceview.TraceView('ABC123', tuplify)
+        with self.mock:
+            results = tv.server.latency_series_range('app', 0, HOUR, layer='PHP')
+        self.assertEqual(self.queries[0]['layer'], ['PHP'])
+        self.assertEqual(results[-1].timestamp, HOUR)
+
+    def test_error(self):
+        tv = traceview.TraceView('ABC123')
+        with self.mock:
+            with self.assertRaises(requests.HTTPError):
+                tv.client.latency_series_range('broken', 0, DAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library request coalescing
+
+"""
+
+import threading
+import time
+import unittest
+
+from httmock import HTTMock, all_requests, response
+
+import traceview.api
+from traceview.singleflight import SingleFlight
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.calls = []
+        self.results = []
+
+    def slow(self):
+        self.calls.append(1)
+        time.sleep(0.1)
+        return 'result'
+
+    def test_shared(self):
+        run_threads(10, lambda: self.results.append(self.flights.do('key', self.slow)))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(sorted(self.results)[0], ('result', False))
+        self.assertEqual(self.results.count(('result', True)), 9)
+
+    def test_sequential_calls_not_shared(self):
+        self.assertEqual(self.flights.do('key', lambda: 1), (1, False))
+        self.assertEqual(self.flights.do('key', lambda: 2), (2, False))
+
+    def test_error_shared(self):
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('lol')
+
+        def call():
+            try:
+                self.flights.do('key', fail)
+            except ValueError as e:
+                self.results.append(e)
+
+        run_threads(5, call)
+        self.assertEqual(len(self.results), 5)
+        self.assertEqual(len(set(map(id, self.results))), 1)
+
+    def test_interrupted_call_retried(self):
+        started = threading.Event()
+
+        def interrupted():
+            started.set()
+            time.sleep(0.1)
+            raise KeyboardInterrupt
+
+        def leader():
+            try:
+                self.flights.do('key', interrupted)
+            except KeyboardInterrupt:
+                self.results.append('interrupted')
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        started.wait()
+        self.assertEqual(self.flights.do('key', lambda: 'result'), ('result', False))
+        thread.join()
+        self.assertEqual(self.results, ['interrupted'])
+
+
+class TestApiCoalesce(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        @all_requests
+        def api_mock(url, request):
+            self.calls.append(url.path)
+            time.sleep(0.1)
+            content = {'data': {'foo': 'bar'}, 'response': 'ok'}
+            return response(200, content, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+
+    def test_coalesce(self):
+        api = traceview.api.Api('ABC123', coalesce=True)
+        with self.mock:
+            run_threads(8, lambda: api.get('total_requests/app/series', time_window='hour'))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(api.stats['coalesced'], 7)
+
+    def test_different_params_not_coalesced(self):
+        api = traceview.api.Api('ABC123', coalesce=True)
+        windows = iter(['hour', 'day'])
+        with self.mock:
+            run_threads(2, lambda: api.get('total_requests/app/series', time_window=next(windows)))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_disabled_by_default(self):
+        api = traceview.api.Api('ABC123')
+        with self.mock:
+            run_threads(3, lambda: api.get('lol'))
+        self.assertEqual(len(self.calls), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
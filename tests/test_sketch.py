@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library quantile sketches
+
+"""
+
+import json
+import random
+import unittest
+
+from traceview.formatters import columnar
+from traceview.sketch import QuantileSketch, merge
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[max(0, int(-(-q * len(values) // 1)) - 1)]
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(42)
+        self.values = [random.lognormvariate(12, 1) for _ in range(20000)]
+
+    def test_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in self.values:
+            sketch.add(value)
+        for q in (0.5, 0.9, 0.95, 0.99, 0.999):
+            exact = exact_quantile(self.values, q)
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.01)
+        self.assertEqual(sketch.quantile(0), min(self.values))
+        self.assertEqual(sketch.quantile(1), max(self.values))
+        self.assertEqual(sketch.count, len(self.values))
+
+    def test_weights(self):
+        sketch = QuantileSketch()
+        sketch.add(100.0, 99)
+        sketch.add(10000.0, 1)
+        self.assertAlmostEqual(sketch.quantile(0.5), 100.0, delta=1)
+        self.assertAlmostEqual(sketch.quantile(0.995), 10000.0, delta=100)
+        self.assertAlmostEqual(sketch.mean(), 199.0)
+
+    def test_merge(self):
+        parts = [QuantileSketch() for _ in range(4)]
+        whole = QuantileSketch()
+        for index, value in enumerate(self.values):
+            parts[index % 4].add(value)
+            whole.add(value)
+        merged = merge(parts)
+        self.assertEqual(merged.to_dict()['bins'], whole.to_dict()['bins'])
+        self.assertEqual(merged.quantile(0.99), whole.quantile(0.99))
+
+    def test_merge_different_accuracy(self):
+        with self.assertRaises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+    def test_serialization(self):
+        sketch = QuantileSketch()
+        for value in self.values[:100]:
+            sketch.add(value)
+        sketch.add(0.0)
+        restored = QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        self.assertEqual(restored, sketch)
+        self.assertEqual(merge([sketch.to_dict(), restored.to_dict()]).count, 202)
+
+    def test_max_bins(self):
+        sketch = QuantileSketch(relative_accuracy=0.01, max_bins=50)
+        for value in self.values:
+            sketch.add(value)
+        self.assertLessEqual(len(sketch), 50)
+        exact = exact_quantile(self.values, 0.99)
+        self.assertAlmostEqual(sketch.quantile(0.99), exact, delta=exact * 0.01)
+
+    def test_empty(self):
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+        with self.assertRaises(ValueError):
+            QuantileSketch().quantile(2)
+
+    def test_add_series(self):
+        results = {'fields': 'timestamp,volume,avg_latency',
+                   'items': [[0, 10, 100.0], [30, 0, 5000.0], [60, 5, None], [90, 1, 1000.0]]}
+        sketch = QuantileSketch()
+        sketch.add_series(results)
+        self.assertEqual(sketch.count, 11)
+        self.assertEqual(sketch.max, 1000.0)
+
+        from_columns = QuantileSketch()
+        from_columns.add_series(columnar(results))
+        self.assertEqual(from_columns, sketch)
+
+    def test_by_layer(self):
+        results = [
+            {'layer': 'PHP', 'timeseries': {'fields': 'timestamp,volume,avg_latency',
+                                            'items': [[0, 10, 100.0], [30, 2, 300.0]]}},
+            {'layer': 'mysql', 'timeseries': {'fields': 'timestamp,volume,avg_latency',
+                                              'items': [[0, 4, 50.0]]}},
+        ]
+        sketches = QuantileSketch.by_layer(results)
+        self.assertEqual(sorted(sketches), ['PHP', 'mysql'])
+        self.assertEqual(sketches['PHP'].count, 12)
+        self.assertEqual(merge(sketches.values()).count, 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library persistent timeseries store
+
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from httmock import HTTMock, all_requests, response
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+import traceview
+from traceview import series
+from traceview.store import SeriesStore
+
+from benchmarks.fake_api import FakeApiServer, SyntheticData
+
+
+HOUR, DAY = 3600, 86400
+NOW = 1500000000.0
+PATH = 'total_requests/app/series'
+
+
+def results(start, end, step=1800):
+    return {'fields': 'timestamp,total_requests',
+            'items': [[float(t), float(t) / 100 if t % 3600 else None] for t in range(start, end + 1, step)]}
+
+
+class TestSeriesStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SeriesStore(self.directory, settle=0)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_missing(self):
+        self.assertEqual(self.store.missing(PATH, {}, 0, DAY), [(0, DAY)])
+        self.store.write(PATH, {}, HOUR, 2 * HOUR, results(HOUR, 2 * HOUR))
+        self.store.write(PATH, {}, 5 * HOUR, 6 * HOUR, results(5 * HOUR, 6 * HOUR))
+        self.assertEqual(self.store.missing(PATH, {}, 0, DAY),
+                         [(0, HOUR), (2 * HOUR, 5 * HOUR), (6 * HOUR, DAY)])
+        self.assertEqual(self.store.missing(PATH, {}, HOUR, 2 * HOUR), [])
+        self.assertEqual(self.store.missing(PATH, {'layer': 'PHP'}, HOUR, 2 * HOUR),
+                         [(HOUR, 2 * HOUR)])
+
+    def test_read(self):
+        self.store.write(PATH, {}, 0, DAY, results(0, DAY))
+        columns = self.store.read(PATH, {}, HOUR, 3 * HOUR)
+        self.assertEqual(columns.fields, ('timestamp', 'total_requests'))
+        self.assertEqual(list(columns), [(3600.0, None), (5400.0, 54.0), (7200.0, None),
+                                         (9000.0, 90.0), (10800.0, None)])
+        self.assertEqual(columns.sum('total_requests'), 144.0)
+
+    @unittest.skipIf(sys.version_info < (3,), "memoryview.cast requires Python 3")
+    def test_read_is_mapped(self):
+        self.store.write(PATH, {}, 0, DAY, results(0, DAY))
+        columns = self.store.read(PATH, {}, HOUR, 3 * HOUR)
+        self.assertIsInstance(columns['timestamp'], memoryview)
+
+    def test_read_across_segments(self):
+        self.store.write(PATH, {}, 0, HOUR, results(0, HOUR))
+        self.store.write(PATH, {}, HOUR, 2 * HOUR, results(HOUR, 2 * HOUR))
+        columns = self.store.read(PATH, {}, 0, 2 * HOUR)
+        self.assertEqual(list(columns['timestamp']), [0.0, 1800.0, 3600.0, 5400.0, 7200.0])
+        self.assertEqual(columns.count('total_requests'), 2)
+
+    def test_compacts_segments(self):
+        self.store.write(PATH, {}, 0, HOUR, results(0, HOUR))
+        self.store.write(PATH, {}, 2 * HOUR, 3 * HOUR, results(2 * HOUR, 3 * HOUR))
+        self.assertEqual(self.store.coverage(PATH, {}), [(0, HOUR), (2 * HOUR, 3 * HOUR)])
+        self.store.read(PATH, {}, 0, 3 * HOUR)
+        self.store.write(PATH, {}, HOUR, 2 * HOUR, results(HOUR, 2 * HOUR))
+        self.assertEqual(self.store.coverage(PATH, {}), [(0, 3 * HOUR)])
+        self.assertEqual(len(os.listdir(self.store._directory(PATH, {}))), 1)
+        self.assertEqual(list(self.store.read(PATH, {}, 0, 3 * HOUR)['timestamp']),
+                         [float(t) for t in range(0, 3 * HOUR + 1, 1800)])
+
+    def test_overlapping_write_replaces_points(self):
+        self.store.write(PATH, {}, 0, 2 * HOUR, results(0, 2 * HOUR))
+        update = {'fields': 'timestamp,total_requests', 'items': [[5400.0, 1.0], [9000.0, 2.0]]}
+        self.store.write(PATH, {}, HOUR, 3 * HOUR, update)
+        self.assertEqual(self.store.coverage(PATH, {}), [(0, 3 * HOUR)])
+        self.assertEqual(list(self.store.read(PATH, {}, 0, 3 * HOUR)),
+                         [(0.0, None), (1800.0, 18.0), (3600.0, None), (5400.0, 1.0),
+                          (7200.0, None), (9000.0, 2.0)])
+
+    def test_different_fields_not_merged(self):
+        self.store.write(PATH, {}, 0, HOUR, results(0, HOUR))
+        self.store.write(PATH, {}, HOUR, 2 * HOUR, {'fields': 'timestamp,volume', 'items': [[5400.0, 1.0]]})
+        self.assertEqual(self.store.coverage(PATH, {}), [(0, HOUR), (HOUR, 2 * HOUR)])
+
+    def test_max_maps(self):
+        store = SeriesStore(self.directory, settle=0, max_maps=2)
+        for day in range(4):
+            store.write(PATH, {'day': day}, 0, HOUR, results(0, HOUR))
+            self.assertEqual(len(store.read(PATH, {'day': day}, 0, HOUR)), 3)
+        self.assertEqual(len(store._maps), 2)
+        self.assertEqual(len(store.read(PATH, {'day': 0}, 0, HOUR)), 3)
+        store.close()
+
+    def test_segment_size_capped(self):
+        store = SeriesStore(self.directory, settle=0, max_segment_points=10)
+        for hour in range(6):
+            store.write(PATH, {}, hour * HOUR, (hour + 1) * HOUR, results(hour * HOUR, (hour + 1) * HOUR))
+        segments = store._segments(PATH, {})
+        self.assertTrue(1 < len(segments) < 6)
+        self.assertTrue(all(len(store.read(PATH, {}, start, end)) <= 10 for start, end, _ in segments))
+        self.assertEqual(store.missing(PATH, {}, 0, 6 * HOUR), [])
+        self.assertEqual(list(store.read(PATH, {}, 0, 6 * HOUR)['timestamp']),
+                         [float(t) for t in range(0, 6 * HOUR + 1, 1800)])
+        store.close()
+
+    def test_read_empty(self):
+        self.assertEqual(len(self.store.read(PATH, {}, 0, DAY)), 0)
+
+    def test_persistent(self):
+        self.store.write(PATH, {}, 0, HOUR, results(0, HOUR))
+        with SeriesStore(self.directory) as store:
+            self.assertEqual(store.coverage(PATH, {}), [(0, HOUR)])
+            self.assertEqual(len(store.read(PATH, {}, 0, HOUR)), 3)
+
+    def test_settle(self):
+        store = SeriesStore(self.directory, settle=DAY)
+        self.assertFalse(store.write(PATH, {}, 1e12, 1e12 + HOUR, results(0, HOUR)))
+        self.assertEqual(store.coverage(PATH, {}), [])
+
+
+class TestStoredSeriesRange(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queries = []
+
+        @all_requests
+        def api_mock(url, request):
+            query = parse_qs(url.query)
+            self.queries.append(query)
+            size = dict(series.WINDOWS)[query['time_window'][0]]
+            end = int(float(query['time_end'][0]))
+            content = {'data': results(end - size, end)}
+            return response(200, content, {'content-type': 'application/json'}, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_fetches_missing_ranges(self):
+        tv = traceview.TraceView('ABC123', store=SeriesStore(self.directory, settle=0))
+        with self.mock:
+            first = tv.total_requests.series_range('app', HOUR, 3 * HOUR)
+            self.assertEqual(len(self.queries), 2)
+            second = tv.total_requests.series_range('app', HOUR, 3 * HOUR)
+            self.assertEqual(len(self.queries), 2)
+            third = tv.total_requests.series_range('app', 0, 4 * HOUR)
+            self.assertEqual(len(self.queries), 4)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, {'fields': 'timestamp,total_requests',
+                                 'items': results(HOUR, 3 * HOUR)['items']})
+        self.assertEqual(third['items'], results(0, 4 * HOUR)['items'])
+
+
+class TestStoredResolutions(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = FakeApiServer(SyntheticData(apps=1, hosts=1, now=NOW)).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_short_range_after_long_range(self):
+        plain = traceview.TraceView('KEY', authority=self.server.authority)
+        expected = plain.server.latency_series_range('Default', NOW - 2 * HOUR, NOW)
+        plain.close()
+
+        tv = traceview.TraceView('KEY', authority=self.server.authority,
+                                 store=SeriesStore(self.directory, settle=0))
+        long_range = tv.server.latency_series_range('Default', NOW - 14 * DAY, NOW)
+        requests_sent = len(self.server.paths)
+        short_range = tv.server.latency_series_range('Default', NOW - 2 * HOUR, NOW)
+        self.assertTrue(len(self.server.paths) > requests_sent)
+        self.assertEqual(short_range, expected)
+        self.assertTrue(len(short_range['items']) > len([item for item in long_range['items']
+                                                         if item[0] >= NOW - 2 * HOUR]))
+        requests_sent = len(self.server.paths)
+        self.assertEqual(tv.server.latency_series_range('Default', NOW - 2 * HOUR, NOW), expected)
+        self.assertEqual(len(self.server.paths), requests_sent)
+        tv.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library streamed responses
+
+"""
+
+import gc
+import json
+import unittest
+
+from httmock import all_requests, response, with_httmock
+
+import traceview.api
+from traceview.formatters import tuplify
+from traceview.stream import TimeseriesStream
+
+
+ITEMS = [[1399089120.0 + 30 * i, i, 226074.07407407407 if i % 3 else None]
+         for i in range(100)]
+
+BODY = json.dumps({
+    'response': 'ok',
+    'data': {'fields': 'timestamp,volume,avg_latency', 'items': ITEMS},
+}).encode('utf-8')
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+QUERIES = []
+
+
+@all_requests
+def traceview_api_mock(url, request):
+    QUERIES.append(url.query)
+    return response(200, BODY, {'content-type': 'application/json'}, None, 5, request)
+
+
+class TestTimeseriesStream(unittest.TestCase):
+
+    def test_items(self):
+        for size in (1, 7, 1024, len(BODY)):
+            stream = TimeseriesStream(chunked(BODY, size))
+            self.assertEqual(list(stream), ITEMS)
+            self.assertEqual(stream.fields, 'timestamp,volume,avg_latency')
+
+    def test_fields_after_items(self):
+        body = b'{"data": {"items": [[1, 2], [3, 4]], "fields": "a,b"}, "response": "ok"}'
+        stream = TimeseriesStream(chunked(body, 5))
+        self.assertEqual(stream.fields, 'a,b')
+        self.assertEqual(list(stream), [[1, 2], [3, 4]])
+
+    def test_empty_items(self):
+        stream = TimeseriesStream([b'{"data": {"fields": "a", "items": []}}'])
+        self.assertEqual(list(stream), [])
+
+    def test_unicode_split(self):
+        body = u'{"data": {"fields": "café", "items": [["é"]]}}'.encode('utf-8')
+        stream = TimeseriesStream(chunked(body, 1))
+        self.assertEqual(list(stream), [[u'é']])
+        self.assertEqual(stream.fields, u'café')
+
+    def test_not_timeseries(self):
+        stream = TimeseriesStream([b'{"data": ["Default"]}'])
+        with self.assertRaises(ValueError):
+            list(stream)
+
+    def test_truncated(self):
+        stream = TimeseriesStream(chunked(BODY[:-20], 64))
+        with self.assertRaises(ValueError):
+            list(stream)
+
+    def test_close(self):
+        closed = []
+        stream = TimeseriesStream(chunked(BODY, 64), close=lambda: closed.append(True))
+        list(stream)
+        self.assertEqual(closed, [True])
+
+    def test_close_when_parsed(self):
+        closed = []
+
+        def chunks():
+            yield BODY
+            self.fail("Read past the end of the result")
+
+        stream = TimeseriesStream(chunks(), close=lambda: closed.append(True))
+        self.assertEqual(stream.fields, 'timestamp,volume,avg_latency')
+        self.assertEqual(closed, [True])
+        self.assertEqual(list(stream), ITEMS)
+
+    def test_close_on_error(self):
+        closed = []
+        stream = TimeseriesStream([b'{"data": ["Default"]}'], close=lambda: closed.append(True))
+        with self.assertRaises(ValueError):
+            list(stream)
+        self.assertEqual(closed, [True])
+
+    def test_context_manager(self):
+        closed = []
+        with TimeseriesStream(chunked(BODY, 64), close=lambda: closed.append(True)) as stream:
+            self.assertEqual(next(iter(stream)), ITEMS[0])
+            self.assertEqual(closed, [])
+        self.assertEqual(closed, [True])
+        # Only the items already read are left.
+        rest = list(stream)
+        self.assertEqual(rest, ITEMS[1:len(rest) + 1])
+        self.assertTrue(len(rest) < len(ITEMS) - 1)
+
+    def test_close_when_dropped(self):
+        closed = []
+        stream = TimeseriesStream(chunked(BODY, 64), close=lambda: closed.append(True))
+        next(iter(stream))
+        del stream
+        gc.collect()
+        self.assertEqual(closed, [True])
+
+    def test_tuplify(self):
+        results = tuplify(TimeseriesStream(chunked(BODY, 64)), 'Lol')
+        self.assertFalse(isinstance(results, list))
+        first = next(results)
+        self.assertEqual(first.__class__.__name__, 'LolTuple')
+        self.assertEqual(first.volume, 0)
+        self.assertEqual(len(list(results)), 99)
+
+
+class TestApiStream(unittest.TestCase):
+
+    @with_httmock(traceview_api_mock)
+    def test_stream(self):
+        api = traceview.api.Api('ABC123', cache=True)
+        with api.get('latency/Default/server/series', stream=True) as results:
+            self.assertIsInstance(results, TimeseriesStream)
+            self.assertEqual(list(results), ITEMS)
+        self.assertEqual(api.stats['decoded_bytes'], len(BODY))
+
+    @with_httmock(traceview_api_mock)
+    def test_stream_not_sent_as_query_param(self):
+        api = traceview.api.Api('ABC123')
+        with api.get('lol', stream=True, time_window='week') as results:
+            self.assertEqual(results.fields, 'timestamp,volume,avg_latency')
+        self.assertNotIn('stream', QUERIES[-1])
+        self.assertIn('time_window=week', QUERIES[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
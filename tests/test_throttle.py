@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for TraceView API Library retries and rate limiting
+
+"""
+
+import time
+import unittest
+
+from httmock import HTTMock, all_requests, response
+import requests
+
+import traceview.api
+from traceview.throttle import RetryPolicy, TokenBucket, retry_after
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst(self):
+        bucket = TokenBucket(10, burst=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertTrue(0.05 < bucket.reserve() <= 0.1)
+        self.assertTrue(0.15 < bucket.reserve() <= 0.2)
+
+    def test_pause(self):
+        bucket = TokenBucket(100)
+        bucket.pause(1)
+        self.assertTrue(0.9 < bucket.reserve() <= 1)
+
+    def test_pause_staggers_requests(self):
+        bucket = TokenBucket(10)
+        bucket.pause(1)
+        waits = [bucket.reserve() for _ in range(3)]
+        self.assertTrue(0.9 < waits[0] <= 1)
+        self.assertAlmostEqual(waits[1] - waits[0], 0.1, places=2)
+        self.assertAlmostEqual(waits[2] - waits[1], 0.1, places=2)
+
+    def test_pause_extends(self):
+        bucket = TokenBucket(10)
+        bucket.pause(1)
+        bucket.pause(0.5)
+        self.assertTrue(0.9 < bucket.reserve() <= 1)
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(retries=2, backoff=1, max_backoff=3)
+
+    def test_should_retry(self):
+        self.assertTrue(self.policy.should_retry('get', 0, 503))
+        self.assertTrue(self.policy.should_retry('get', 1, None))
+        self.assertFalse(self.policy.should_retry('get', 2, 503))
+        self.assertFalse(self.policy.should_retry('get', 0, 403))
+        self.assertFalse(self.policy.should_retry('post', 0, 503))
+
+    def test_delay(self):
+        for attempt in range(5):
+            self.assertTrue(0 <= self.policy.delay(attempt) <= 3)
+        self.assertTrue(self.policy.delay(0, retry_after=5) >= 5)
+
+
+class TestRetryAfter(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(retry_after({'Retry-After': '3'}), 3.0)
+
+    def test_date(self):
+        date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 60))
+        self.assertTrue(50 < retry_after({'Retry-After': date}) <= 60)
+
+    def test_missing(self):
+        self.assertEqual(retry_after({}), None)
+        self.assertEqual(retry_after({'Retry-After': 'soon'}), None)
+
+
+class TestApiRetries(unittest.TestCase):
+
+    def setUp(self):
+        self.statuses = []
+
+        @all_requests
+        def api_mock(url, request):
+            status = self.statuses.pop(0) if self.statuses else 200
+            headers = {'content-type': 'application/json', 'Retry-After': '0'}
+            content = {'data': {'foo': 'bar'}, 'response': 'ok'}
+            return response(status, content, headers, None, 5, request)
+
+        self.mock = HTTMock(api_mock)
+
+    def test_no_retries_by_default(self):
+        api = traceview.api.Api('ABC123')
+        self.statuses = [503]
+        with self.mock:
+            with self.assertRaises(requests.HTTPError):
+                api.get('lol')
+
+    def test_retries_get(self):
+        api = traceview.api.Api('ABC123', retries=RetryPolicy(retries=3, backoff=0))
+        self.statuses = [503, 429]
+        with self.mock:
+            self.assertEqual(api.get('lol'), {'foo': 'bar'})
+        self.assertEqual(api.stats['retries'], 2)
+
+    def test_retries_exhausted(self):
+        api = traceview.api.Api('ABC123', retries=RetryPolicy(retries=1, backoff=0))
+        self.statuses = [503, 503]
+        with self.mock:
+            with self.assertRaises(requests.HTTPError):
+                api.get('lol')
+        self.assertEqual(api.stats['retries'], 1)
+
+    def test_failed_responses_closed(self):
+        closed = []
+
+        @all_requests
+        def api_mock(url, request):
+            failed = response(503, {}, {'Retry-After': '0'}, None, 5, request)
+            failed.close = lambda: closed.append(failed.status_code)
+            return failed
+
+        api = traceview.api.Api('ABC123', retries=RetryPolicy(retries=1, backoff=0))
+        with HTTMock(api_mock):
+            with self.assertRaises(requests.HTTPError):
+                api.get('lol', stream=True)
+        self.assertEqual(closed, [503, 503])
+
+    def test_post_not_retried(self):
+        api = traceview.api.Api('ABC123', retries=3)
+        self.statuses = [503]
+        with self.mock:
+            with self.assertRaises(requests.HTTPError):
+                api.post('lol')
+        self.assertEqual(api.stats['retries'], 0)
+
+    def test_rate_limit(self):
+        api = traceview.api.Api('ABC123', rate_limit=TokenBucket(20, burst=1))
+        with self.mock:
+            for _ in range(4):
+                api.get('lol')
+        self.assertTrue(api.stats['throttle_delay'] > 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
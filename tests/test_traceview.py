@@ -8,6 +8,8 @@ Tests for TraceView API Library
 
 import datetime
 import os
+import threading
+import time
 import unittest
 
 from httmock import all_requests, response, with_httmock
@@ -343,6 +345,10 @@ class TestTraceView(unittest.TestCase):
         tv = traceview.TraceView(None)
         self.assertIsInstance(tv, traceview.TraceView)
 
+    def test_context_manager(self):
+        with traceview.TraceView(None) as tv:
+            self.assertIsInstance(tv, traceview.TraceView)
+
 
 class TestApi(unittest.TestCase):
 
@@ -376,6 +382,43 @@ class TestApi(unittest.TestCase):
         self.assertEqual(self.api._url('lol'),
                          'https://api.tv.appneta.com/api-v2/lol')
 
+    def test_url_authority(self):
+        api = traceview.api.Api('ABC123', authority='http://localhost:8080')
+        self.assertEqual(api._url('lol'), 'http://localhost:8080/api-v2/lol')
+
+    def test_session_pool_size(self):
+        api = traceview.api.Api('ABC123', pool_size=3)
+        adapter = api._get_session().get_adapter(api._url('lol'))
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_session_built_once_across_threads(self):
+        api = traceview.api.Api('ABC123')
+        build = api._build_session
+        built = []
+
+        def slow_build(pool_size):
+            time.sleep(0.05)
+            built.append(build(pool_size))
+            return built[-1]
+
+        api._build_session = slow_build
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(api._get_session())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(built), 1)
+        self.assertTrue(all(session is built[0] for session in sessions))
+        api.close()
+
+    @with_httmock(traceview_api_mock)
+    def test_request_reuses_session(self):
+        self.api.get('lol')
+        session = self.api._session
+        self.api.get('lol')
+        self.assertIs(self.api._session, session)
+
     @with_httmock(traceview_api_mock)
     def test_request_get(self):
         results = self.api.get('lol')
@@ -14,16 +14,71 @@ __author__ = 'Daniel Riti'
 __license__ = 'MIT'
 
 
-from .annotation import Annotation
+import importlib
+import sys
+
 from .api import Api
-from .app import App, Assign
-from .discovery import Action, Browser, Controller, Domain
-from .discovery import Layer, Metric, Region
-from .host import Host, Instrumentation
-from .error import Rate
-from .latency import Client, Server
-from .organization import Organization
-from .total_request import TotalRequests
+
+
+# Public classes of the submodules, imported on first access.
+_LAZY_EXPORTS = {
+    'Annotation': 'annotation',
+    'App': 'app',
+    'Assign': 'app',
+    'Action': 'discovery',
+    'Browser': 'discovery',
+    'Controller': 'discovery',
+    'Domain': 'discovery',
+    'Layer': 'discovery',
+    'Metric': 'discovery',
+    'Region': 'discovery',
+    'Host': 'host',
+    'Instrumentation': 'host',
+    'Rate': 'error',
+    'Client': 'latency',
+    'Server': 'latency',
+    'Organization': 'organization',
+    'TotalRequests': 'total_request',
+}
+
+
+def _import(module, name):
+    return getattr(importlib.import_module('.' + module, __name__), name)
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in _LAZY_EXPORTS:
+            raise AttributeError("module %r has no attribute %r" % (__name__, name,))
+        value = globals()[name] = _import(_LAZY_EXPORTS[name], name)
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY_EXPORTS))
+else:
+    for _name, _module in _LAZY_EXPORTS.items():
+        globals()[_name] = _import(_module, _name)
+
+
+class _Resource(object):
+    """ A resource of a :class:`TraceView <TraceView>` object, which is built
+    on first access.
+
+    """
+
+    def __init__(self, name, module, class_name, doc=None):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.__doc__ = doc
+
+    def __get__(self, tv, owner):
+        if tv is None:
+            return self
+        # Stored on the instance, which takes precedence over this descriptor
+        # from now on.
+        resource = tv.__dict__[self.name] = _import(self.module, self.class_name)(tv._api)
+        return resource
 
 
 class TraceView(object):
@@ -33,39 +88,79 @@ class TraceView(object):
 
     :param api_key: The TraceView API access key.
     :param func formatter: (optional) Function to format API results. See the module :mod:`traceview.formatters`.
+    :param int pool_size: (optional) Maximum number of connections kept alive to the API.
+    :param str authority: (optional) Scheme and host of the API, defaults to ``https://api.tv.appneta.com``.
+    :param float timeout: (optional) Seconds to wait for the API before giving up on a request.
+    :param cache: (optional) ``True`` or a :class:`ResponseCache <traceview.cache.ResponseCache>` to cache results of rarely changing resources.
+    :param retries: (optional) Number of retries, or a :class:`RetryPolicy <traceview.throttle.RetryPolicy>`, for failed GET requests.
+    :param rate_limit: (optional) Requests per second, or a shared :class:`TokenBucket <traceview.throttle.TokenBucket>`, to pace requests.
+    :param bool coalesce: (optional) Share one HTTP request between identical requests made at the same time.
+    :param store: (optional) A :class:`SeriesStore <traceview.store.SeriesStore>` serving time ranges of timeseries already fetched.
+    :param instruments: (optional) :class:`Instrument <traceview.instrument.Instrument>` objects notified around each API call, e.g. a :class:`MetricsAggregator <traceview.instrument.MetricsAggregator>`.
+    :param cassette: (optional) A :class:`Cassette <traceview.cassette.Cassette>` recording or replaying the responses of the API.
+    :param bool compress: (optional) Ask for compressed responses, in every content coding the client is able to decode.
+    :param decoder: (optional) JSON decoder backend of the responses: ``'auto'`` for the fastest installed, a name in :data:`BACKENDS <traceview.decoders.BACKENDS>` or a function.
+
+    Connections to the API are pooled and reused between calls. Use the
+    object as a context manager, or call :meth:`close`, to release them.
 
     Usage::
 
       >>> import traceview
       >>> tv = traceview.TraceView('API KEY HERE')
 
+      >>> with traceview.TraceView('API KEY HERE') as tv:
+      ...     tv.apps()
+      [u'Default', u'flask_app']
+
     """
 
-    def __init__(self, api_key, formatter=None):
-        self._api = Api(api_key, after_request=formatter)
-
-        self._actions = Action(self._api)
-        self._annotation = Annotation(self._api)
-        self._apps = App(self._api)
-        self._assign = Assign(self._api)
-        self._browsers = Browser(self._api)
-        self._controllers = Controller(self._api)
-        self._domains = Domain(self._api)
-        self._error_rates = Rate(self._api)
-        self._hosts = Host(self._api)
-        self._instrumentation = Instrumentation(self._api)
-        self._layers = Layer(self._api)
-        self._metrics = Metric(self._api)
-        self._organization = Organization(self._api)
-        self._regions = Region(self._api)
-
-        #: Get :py:class:`Client <traceview.latency.Client>` latency information.
-        self.client = Client(self._api)
-        #: Get :py:class:`Server <traceview.latency.Server>` latency information.
-        self.server = Server(self._api)
-        #: Get :py:class:`TotalRequests <traceview.total_request.TotalRequests>` information.
-        self.total_requests = TotalRequests(self._api)
+    _api_class = Api
+
+    _actions = _Resource('_actions', 'discovery', 'Action')
+    _annotation = _Resource('_annotation', 'annotation', 'Annotation')
+    _apps = _Resource('_apps', 'app', 'App')
+    _assign = _Resource('_assign', 'app', 'Assign')
+    _browsers = _Resource('_browsers', 'discovery', 'Browser')
+    _controllers = _Resource('_controllers', 'discovery', 'Controller')
+    _domains = _Resource('_domains', 'discovery', 'Domain')
+    _error_rates = _Resource('_error_rates', 'error', 'Rate')
+    _hosts = _Resource('_hosts', 'host', 'Host')
+    _instrumentation = _Resource('_instrumentation', 'host', 'Instrumentation')
+    _layers = _Resource('_layers', 'discovery', 'Layer')
+    _metrics = _Resource('_metrics', 'discovery', 'Metric')
+    _organization = _Resource('_organization', 'organization', 'Organization')
+    _regions = _Resource('_regions', 'discovery', 'Region')
+
+    client = _Resource('client', 'latency', 'Client',
+                       "Get :py:class:`Client <traceview.latency.Client>` latency information.")
+    server = _Resource('server', 'latency', 'Server',
+                       "Get :py:class:`Server <traceview.latency.Server>` latency information.")
+    total_requests = _Resource('total_requests', 'total_request', 'TotalRequests',
+                               "Get :py:class:`TotalRequests <traceview.total_request.TotalRequests>` information.")
+
+    def __init__(self, api_key, formatter=None, **kwargs):
+        self._api = self._api_class(api_key, after_request=formatter, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Close all pooled connections to the TraceView API.
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> tv.apps()
+          [u'Default', u'flask_app']
+          >>> tv.close()
 
+        """
+        self._api.close()
 
     def actions(self):
         """ Get all actions that have been traced.
@@ -106,6 +201,32 @@ class TraceView(object):
         """
         self._annotation.create(message, *args, **kwargs)
 
+    def annotation_writer(self, **kwargs):
+        """ Get a writer that creates annotations in the background.
+
+        Annotations written to it are queued and sent concurrently by a
+        background thread, so the caller never waits on the API.
+
+        :param int batch_size: (optional) Number of pending annotations that triggers a flush.
+        :param float flush_interval: (optional) Maximum seconds an annotation waits before being sent.
+        :param int concurrency: (optional) Maximum number of annotations sent at the same time.
+        :param int retries: (optional) Maximum number of retries per annotation.
+        :return: an annotation writer
+        :rtype: :class:`AnnotationWriter <traceview.annotation.AnnotationWriter>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> writer = tv.annotation_writer()
+          >>> writer.write('Code deployed', appname='production_web', hostname='web-1')
+          True
+          >>> writer.close()
+          True
+
+        """
+        return self._annotation.writer(**kwargs)
+
     def annotations(self, appname=None, *args, **kwargs):
         """ Get annotations.
 
@@ -173,6 +294,54 @@ class TraceView(object):
         """
         self._assign.update(hostname, appname, *args, **kwargs)
 
+    def assign_hosts(self, assignments, concurrency=8, dry_run=False):
+        """ Assign many hosts to existing applications concurrently.
+
+        Requests are paced by the ``rate_limit`` of this object, if any.
+
+        :param assignments: ``(hostname, appname)`` pairs.
+        :param int concurrency: (optional) Maximum number of requests in flight.
+        :param bool dry_run: (optional) Report the assignments without making them.
+        :return: the outcome of every assignment
+        :rtype: :class:`BulkReport <traceview.batch.BulkReport>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> report = tv.assign_hosts([('web-app-1234', 'production_web'),
+          ...                           ('web-app-1235', 'production_web')])
+          >>> report
+          <BulkReport [2 succeeded, 0 failed]>
+
+        """
+        return self._assign.update_many(assignments, concurrency=concurrency, dry_run=dry_run)
+
+    def batch(self, calls, concurrency=8):
+        """ Run many API calls concurrently.
+
+        Each call is either a callable or a ``(func, args, kwargs)`` tuple,
+        where ``args`` and ``kwargs`` may be omitted. Results are returned in
+        the same order as the calls. A call that fails returns its exception
+        as the result, so one failing app doesn't abort the whole batch.
+
+        :param calls: The calls to run.
+        :param int concurrency: (optional) Maximum number of calls in flight.
+        :return: the result (or exception) of each call
+        :rtype: list
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE', timeout=10)
+          >>> apps = tv.apps()
+          >>> tv.batch([(tv.server.latency_series, (app,), {'time_window': 'hour'}) for app in apps])
+          [{u'fields': u'timestamp,volume,avg_latency', u'items': [...]}, HTTPError(500, ...), ...]
+
+        """
+        from .batch import run
+        return run(calls, concurrency=concurrency)
+
     def browsers(self):
         """ Get all browsers used by end users.
 
@@ -243,6 +412,30 @@ class TraceView(object):
         """
         return self._hosts.delete(host_id, *args, **kwargs)
 
+    def delete_hosts(self, host_ids, concurrency=8, dry_run=False):
+        """ Delete many existing hosts concurrently.
+
+        Requests are paced by the ``rate_limit`` of this object, if any.
+
+        :param host_ids: The ids of the hosts to delete.
+        :param int concurrency: (optional) Maximum number of requests in flight.
+        :param bool dry_run: (optional) Report the hosts without deleting them.
+        :return: the outcome of every deletion
+        :rtype: :class:`BulkReport <traceview.batch.BulkReport>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE', rate_limit=50)
+          >>> report = tv.delete_hosts(stale_host_ids, concurrency=16)
+          >>> report
+          <BulkReport [4998 succeeded, 2 failed]>
+          >>> [(outcome.item, outcome.error) for outcome in report.failed]
+          [(123, HTTPError(404, ...)), (456, HTTPError(404, ...))]
+
+        """
+        return self._hosts.delete_many(host_ids, concurrency=concurrency, dry_run=dry_run)
+
     def delete_app(self, app_name, *args, **kwargs):
         """ Delete an existing app.
 
@@ -297,6 +490,28 @@ class TraceView(object):
         """
         return self._error_rates.get(app, *args, **kwargs)
 
+    def error_rates_follower(self, app, size=120, **kwargs):
+        """ Follow the error rate of an application.
+
+        Each poll of the follower only returns the points that are new since
+        the previous one.
+
+        :param str app: The application name.
+        :param int size: (optional) Number of points kept by the follower.
+        :return: a follower of the application's error rate
+        :rtype: :class:`Follower <traceview.follow.Follower>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> follower = tv.error_rates_follower('Default')
+          >>> follower.poll()
+          {u'fields': u'timestamp,error_rate', u'items': [[1399082880.0, 0], [1399082910.0, 0], ...]}
+
+        """
+        return self._error_rates.follower(app, size=size, **kwargs)
+
     def hosts(self, appname=None, *args, **kwargs):
         """ Get all hosts that have been traced.
 
@@ -313,6 +528,30 @@ class TraceView(object):
         """
         return self._hosts.get(app=appname)
 
+    def host_inventory(self, apps=True, concurrency=8):
+        """ Get an inventory of all hosts, indexed by id, name, app, last
+        heartbeat and last trace.
+
+        :param bool apps: (optional) Index hosts by app, which takes one request per app on every refresh.
+        :param int concurrency: (optional) Maximum number of app requests in flight.
+        :return: a refreshed host inventory
+        :rtype: :class:`HostInventory <traceview.inventory.HostInventory>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> inventory = tv.host_inventory()
+          >>> [host['name'] for host in inventory.by_app('production_web')]
+          [u'web-app-1234', u'web-app-1235']
+
+        """
+        from .inventory import HostInventory
+
+        inventory = HostInventory(self._api, apps=apps, concurrency=concurrency)
+        inventory.refresh()
+        return inventory
+
     def instrumentation(self, host_id):
         """ Get instrumentation version information for a host.
 
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.aio
+
+This module contains an asyncio based client for the TraceView API. It
+requires Python 3.5+ and the `aiohttp <https://aiohttp.readthedocs.io/>`_
+library.
+
+"""
+
+import asyncio
+
+import aiohttp
+import requests
+
+from . import TraceView
+from . import batch as _batch
+from .api import Api
+from .cache import request_key
+from .follow import Follower
+from .instrument import clock
+
+
+class AsyncApi(Api):
+    """ The :class:`AsyncApi <AsyncApi>` object.
+
+    Responsible for making non-blocking HTTP requests to the TraceView API.
+    :meth:`get`, :meth:`post` and :meth:`delete` return awaitables.
+
+    :param str api_key: The TraceView API access key.
+    :param func after_request: (optional) Function to format API results.
+    :param int pool_size: (optional) Maximum number of concurrent connections to the API.
+
+    Other keyword arguments are the same as for :class:`Api <traceview.api.Api>`.
+
+    """
+
+    def __init__(self, api_key, after_request=None, pool_size=100, **kwargs):
+        if kwargs.get('cassette') is not None:
+            raise TypeError("Cassettes are not supported by AsyncApi")
+        super(AsyncApi, self).__init__(api_key, after_request=after_request,
+                                       pool_size=pool_size, **kwargs)
+        self._in_flight = {}
+
+    async def close(self):
+        """ Close all pooled connections to the TraceView API. """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_range(self, path, start, end, concurrency=8, **kwargs):
+        """ Perform HTTP GET requests for a timeseries over a time range.
+
+        See :meth:`Api.get_range <traceview.api.Api.get_range>`.
+
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(params):
+            async with semaphore:
+                return await self._get_unformatted(path, params)
+
+        kwargs = self._range_params(start, end, kwargs)
+        gaps, requests = self._plan_range(path, start, end, kwargs)
+        results = await asyncio.gather(*[fetch(params) for _, params in requests])
+        return self._format(self._merge_range(path, start, end, kwargs, gaps, requests, results))
+
+    def follower(self, path, size=120, params=None):
+        """ Returns an :class:`AsyncFollower <AsyncFollower>` of a timeseries.
+
+        See :meth:`Api.follower <traceview.api.Api.follower>`.
+
+        """
+        return AsyncFollower(self, path, size=size, params=params)
+
+    async def _request(self, method, path, *args, **kwargs):
+        """ Perform a HTTP request.
+
+        :param str method: The HTTP method to perform on the request.
+        :param str path: The HTTP path to request.
+        :param dict kwargs: (optional) Query parameters for the request.
+
+        """
+        if kwargs.pop('stream', False):
+            raise ValueError("Streamed responses are not supported by AsyncApi")
+        method, url, params = self._prepare(method, path, kwargs)
+        event = self._start_event(method, path)
+        try:
+            if method == 'get':
+                results = await self._get(path, url, params, event)
+            else:
+                results = await self._send(method, url, params, event)
+                if self.cache is not None:
+                    self.cache.invalidate(path)
+            results = self._timed_format(results, event)
+        except Exception as e:
+            self._finish_event(event, e)
+            raise
+        self._finish_event(event)
+        return results
+
+    async def _get_unformatted(self, path, params):
+        method, url, params = self._prepare('get', path, params)
+        event = self._start_event(method, path)
+        try:
+            results = await self._get(path, url, params, event)
+        except Exception as e:
+            self._finish_event(event, e)
+            raise
+        self._finish_event(event)
+        return results
+
+    async def _get(self, path, url, params, event=None):
+        """ Get the unformatted API results of a GET request, from the cache
+        or a coalesced request when possible.
+
+        """
+        if self.cache is not None:
+            hit, results = self.cache.lookup(path, params)
+            if hit:
+                if event is not None:
+                    event.cached = True
+                return results
+            generation = self.cache.generation()
+
+        if self._flights is None:
+            results = await self._send('get', url, params, event)
+        else:
+            results = await self._coalesce(request_key(path, params), url, params, event)
+
+        if self.cache is not None:
+            self.cache.store(path, params, results, generation)
+        return results
+
+    def _coalesce(self, key, url, params, event=None):
+        """ Returns an awaitable of the results of a GET request, shared with
+        the identical requests in flight on the event loop.
+
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(self._send('get', url, params, event))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._count('coalesced')
+            if event is not None:
+                event.coalesced = True
+        # Shielded, so that a cancelled waiter doesn't cancel the others.
+        return asyncio.shield(task)
+
+    async def _send(self, method, url, params, event=None):
+        """ Send a HTTP request and return the unformatted API results.
+
+        :param str method: The HTTP method to perform on the request.
+        :param str url: The URL to request.
+        :param dict params: Query parameters for the request.
+        :param event: (optional) The :class:`RequestEvent <traceview.instrument.RequestEvent>` timing the request.
+
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            await _sleep(self._throttle_delay())
+            if event is not None:
+                event.attempts += 1
+                started = clock()
+            try:
+                async with session.request(method, url, params=_query(params),
+                                           allow_redirects=False) as response:
+                    if event is not None:
+                        received = clock()
+                        self._time_response(event, started, response.status)
+                    decoded = len(await response.read())
+                    if event is not None:
+                        event.timings['transfer'] += clock() - received
+                    self._count_transfer(decoded, _wire_size(response, decoded), event)
+                    if response.status == requests.codes.ok: # pylint: disable-msg=E1101
+                        if event is None:
+                            return self._decode(await response.read())['data']
+                        started = clock()
+                        results = self._decode(await response.read())['data']
+                        event.timings['decode'] += clock() - started
+                        return results
+
+                    wait = self._retry_after(response.status, response.headers)
+                    if not self._retry.should_retry(method, attempt, response.status):
+                        raise requests.HTTPError(response.status, url, await response.text())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not self._retry.should_retry(method, attempt):
+                    raise
+                wait = None
+
+            await _sleep(self._backoff_delay(attempt, wait))
+            attempt += 1
+
+    def _build_session(self, pool_size):
+        """ Builds a :class:`aiohttp.ClientSession` with a connection pool.
+
+        :param int pool_size: Maximum number of concurrent connections in the pool.
+
+        """
+        connector = aiohttp.TCPConnector(limit=pool_size)
+        timeout = aiohttp.ClientTimeout(total=self._timeout)
+        # aiohttp asks for the content codings it is able to decompress.
+        headers = None if self.compress else {'Accept-Encoding': 'identity'}
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+
+
+class AsyncFollower(Follower):
+    """ The :class:`AsyncFollower <AsyncFollower>` object.
+
+    A :class:`Follower <traceview.follow.Follower>` whose :meth:`poll`
+    returns an awaitable, and whose :meth:`follow` is an asynchronous
+    iterator.
+
+    Usage::
+
+      >>> async def main():
+      ...     async with AsyncTraceView('API KEY HERE') as tv:
+      ...         follower = tv.server.latency_follower('Default')
+      ...         async for series in follower.follow(interval=30):
+      ...             print(series['items'])
+
+    """
+
+    async def poll(self):
+        """ Fetches the points that are new since the last poll.
+
+        :return: timeseries data of the new points, formatted by the configured formatter.
+
+        """
+        last = self.last_timestamp
+        params = self._params_due(last)
+        if params is None:
+            return self._format([])
+        return self._add(await self._api._get_unformatted(self._path, params), last)
+
+    def follow(self, interval=30, polls=None):
+        """ Polls every ``interval`` seconds and yields the new points, as
+        an asynchronous iterator.
+
+        :param float interval: (optional) Seconds between polls.
+        :param int polls: (optional) Number of polls before stopping. Runs forever by default.
+
+        """
+        return _Polls(self, interval, polls)
+
+
+class _Polls(object):
+    """ Asynchronous iterator of the polls of an :class:`AsyncFollower`. """
+
+    def __init__(self, follower, interval, polls):
+        self._follower = follower
+        self._interval = interval
+        self._polls = polls
+        self._count = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._polls is not None and self._count >= self._polls:
+            raise StopAsyncIteration
+        if self._count:
+            await _sleep(self._interval)
+        self._count += 1
+        return await self._follower.poll()
+
+
+class AsyncTraceView(TraceView):
+    """ The :class:`AsyncTraceView <AsyncTraceView>` object.
+
+    Provides asyncio access to TraceView API resources. It has the same
+    interface as :class:`TraceView <traceview.TraceView>`, but every method
+    (including those of ``client``, ``server`` and ``total_requests``)
+    returns an awaitable.
+
+    :param api_key: The TraceView API access key.
+    :param func formatter: (optional) Function to format API results. See the module :mod:`traceview.formatters`.
+    :param int pool_size: (optional) Maximum number of concurrent connections to the API.
+
+    Other keyword arguments are the same as for :class:`TraceView <traceview.TraceView>`.
+
+    Usage::
+
+      >>> import asyncio
+      >>> from traceview.aio import AsyncTraceView
+      >>> async def main():
+      ...     async with AsyncTraceView('API KEY HERE') as tv:
+      ...         apps = await tv.apps()
+      ...         return await asyncio.gather(*[tv.server.latency_series(app) for app in apps])
+      >>> asyncio.get_event_loop().run_until_complete(main())
+
+    """
+
+    _api_class = AsyncApi
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError("Use 'async with' with AsyncTraceView")
+
+    async def close(self):
+        """ Close all pooled connections to the TraceView API. """
+        await self._api.close()
+
+    async def batch(self, calls, concurrency=100):
+        """ Run many API calls concurrently on the event loop.
+
+        See :meth:`TraceView.batch <traceview.TraceView.batch>`.
+
+        :param calls: The calls to run.
+        :param int concurrency: (optional) Maximum number of calls in flight.
+        :rtype: list
+
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def invoke(func, args, kwargs):
+            async with semaphore:
+                return await func(*args, **kwargs)
+
+        calls = [_batch._normalize(call) for call in calls]
+        return await asyncio.gather(*[invoke(*call) for call in calls],
+                                    return_exceptions=True)
+
+    def annotation(self, message, *args, **kwargs):
+        """ Create an annotation.
+
+        See :meth:`TraceView.annotation <traceview.TraceView.annotation>`.
+
+        """
+        return self._annotation.create(message, *args, **kwargs)
+
+    async def assign_hosts(self, assignments, concurrency=100, dry_run=False):
+        """ Assign many hosts to existing applications concurrently.
+
+        See :meth:`TraceView.assign_hosts <traceview.TraceView.assign_hosts>`.
+
+        """
+        return await self._bulk(self._assign.update,
+                                [tuple(assignment) for assignment in assignments],
+                                concurrency, dry_run)
+
+    async def delete_hosts(self, host_ids, concurrency=100, dry_run=False):
+        """ Delete many existing hosts concurrently.
+
+        See :meth:`TraceView.delete_hosts <traceview.TraceView.delete_hosts>`.
+
+        """
+        return await self._bulk(self._hosts.delete, host_ids, concurrency, dry_run)
+
+    async def _bulk(self, func, items, concurrency, dry_run):
+        items = list(items)
+        if dry_run:
+            return _batch.bulk(func, items, dry_run=True)
+        results = await self.batch(_batch._bulk_calls(func, items), concurrency)
+        return _batch._report(items, results)
+
+    def annotation_writer(self, **kwargs):
+        raise TypeError("AsyncTraceView annotations don't block; "
+                        "gather tv.annotation() calls or use batch() instead")
+
+    def host_inventory(self, apps=True, concurrency=8):
+        raise TypeError("HostInventory refreshes synchronously; use it with TraceView")
+
+    def assign(self, hostname, appname, *args, **kwargs):
+        """ Assign a host to an existing application.
+
+        See :meth:`TraceView.assign <traceview.TraceView.assign>`.
+
+        """
+        return self._assign.update(hostname, appname, *args, **kwargs)
+
+
+async def _sleep(seconds):
+    if seconds > 0:
+        await asyncio.sleep(seconds)
+
+
+def _wire_size(response, decoded):
+    """ Returns the size of a response body as received, before it was
+    decompressed.
+
+    """
+    wire = getattr(response.content, 'total_raw_bytes', None)
+    if not wire:
+        try:
+            wire = int(response.headers.get('Content-Length', decoded))
+        except ValueError:
+            wire = decoded
+    return wire
+
+
+def _query(params):
+    """ Converts query parameters to the string values aiohttp expects,
+    dropping parameters set to ``None`` the same way requests does.
+
+    """
+    return dict((key, str(value)) for key, value in params.items()
+                if value is not None)
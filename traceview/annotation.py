@@ -9,7 +9,35 @@ http://dev.appneta.com/docs/api-v2/annotations.html
 
 """
 
+import atexit
+from collections import deque
+import logging
+import threading
+import time
+import weakref
+
+import requests
+from requests.packages.urllib3.exceptions import NewConnectionError
+
 from .resource import Resource
+from .throttle import RetryPolicy
+
+
+log = logging.getLogger(__name__)
+
+# Writers with a background thread, closed at interpreter exit. Held weakly,
+# so that closed writers and their Api can be collected.
+_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_writers():
+    for writer in list(_writers):
+        if not writer.flush(writer.exit_timeout):
+            dropped, in_flight = writer._drop_queued()
+            log.warning("Exiting with %d annotations dropped and %d in flight after %.1f seconds",
+                        dropped, in_flight, writer.exit_timeout)
+        writer.close(0)
 
 
 class Annotation(Resource):
@@ -24,3 +52,218 @@ class Annotation(Resource):
     def create(self, message, *args, **kwargs):
         kwargs['message'] = message
         return self.api.post('log_message', *args, **kwargs)
+
+    def writer(self, **kwargs):
+        return AnnotationWriter(self.api, **kwargs)
+
+
+class AnnotationWriter(object):
+    """ The :class:`AnnotationWriter <AnnotationWriter>` object.
+
+    Queues annotations and creates them from a background thread, so callers
+    never wait on the API. Queued annotations are sent when ``batch_size`` of
+    them are pending, when the oldest has waited ``flush_interval`` seconds,
+    on :meth:`flush` and on :meth:`close`. At interpreter exit, open writers
+    are flushed for at most ``exit_timeout`` seconds; annotations not sent
+    by then are dropped. Annotations that fail to connect or get a retryable
+    status are retried with backoff.
+
+    The ``stats`` dictionary counts annotations ``delivered``, ``failed``
+    after their last retry, ``retried`` and ``dropped`` because the queue
+    was full or at exit. The last failures are kept in ``errors`` as ``(annotation,
+    exception)`` pairs.
+
+    :param api: The :class:`Api <traceview.api.Api>` used to create annotations.
+    :param int batch_size: (optional) Number of pending annotations that triggers a flush.
+    :param float flush_interval: (optional) Maximum seconds an annotation waits before being sent.
+    :param int concurrency: (optional) Maximum number of annotations sent at the same time.
+    :param int retries: (optional) Maximum number of retries per annotation.
+    :param float backoff: (optional) Base wait, in seconds, before the first retry.
+    :param int max_pending: (optional) Maximum number of queued annotations. Further annotations are dropped.
+    :param float exit_timeout: (optional) Maximum seconds spent sending queued annotations at interpreter exit.
+
+    Usage::
+
+      >>> import traceview
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> with tv.annotation_writer(concurrency=16) as writer:
+      ...     for host in hosts:
+      ...         writer.write('Code deployed', appname='production_web', hostname=host)
+      >>> writer.stats
+      {'delivered': 250, 'failed': 0, 'retried': 2, 'dropped': 0}
+
+    """
+
+    def __init__(self, api, batch_size=50, flush_interval=1.0, concurrency=8,
+                 retries=3, backoff=0.5, max_pending=10000, exit_timeout=5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.exit_timeout = exit_timeout
+        self.stats = {'delivered': 0, 'failed': 0, 'retried': 0, 'dropped': 0}
+        self.errors = deque(maxlen=100)
+
+        self._api = api
+        self._retry = RetryPolicy(retries, backoff)
+        self._queue = deque()
+        self._in_flight = 0
+        self._flushing = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pending(self):
+        """ Number of annotations queued or being sent. """
+        with self._condition:
+            return len(self._queue) + self._in_flight
+
+    def write(self, message, **kwargs):
+        """ Queues an annotation. Takes the same arguments as
+        :meth:`TraceView.annotation <traceview.TraceView.annotation>`.
+
+        :return: whether the annotation was queued
+        :rtype: bool
+
+        """
+        kwargs['message'] = message
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AnnotationWriter is closed")
+            if len(self._queue) >= self.max_pending:
+                self.stats['dropped'] += 1
+                return False
+            self._queue.append((time.time(), kwargs))
+            if self._worker is None:
+                self._start()
+            if len(self._queue) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        """ Sends the queued annotations and waits until they are delivered
+        or failed.
+
+        :param float timeout: (optional) Maximum seconds to wait.
+        :return: whether every annotation was sent before the timeout
+        :rtype: bool
+
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            if self._worker is None:
+                return not self._queue
+            self._flushing = True
+            self._condition.notify_all()
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """ Flushes the queued annotations and stops the background thread.
+
+        :param float timeout: (optional) Maximum seconds to wait for the queued annotations.
+
+        """
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            worker = self._worker
+        _writers.discard(self)
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+        return flushed
+
+    def _drop_queued(self):
+        """ Drops the queued annotations. Returns the number dropped and the
+        number still in flight.
+
+        """
+        with self._condition:
+            dropped = len(self._queue)
+            self._queue.clear()
+            self.stats['dropped'] += dropped
+            self._condition.notify_all()
+            return dropped, self._in_flight
+
+    def _start(self):
+        self._worker = threading.Thread(target=self._run, name='traceview-annotations')
+        self._worker.daemon = True
+        self._worker.start()
+        _writers.add(self)
+
+    def _run(self):
+        from .batch import run
+
+        while True:
+            with self._condition:
+                while not self._closed and not self._due():
+                    self._condition.wait(self._wait())
+                if self._closed and not self._queue:
+                    return
+                annotations = [self._queue.popleft()[1]
+                               for _ in range(min(len(self._queue), self.batch_size))]
+                self._in_flight += len(annotations)
+
+            results = run([(self._deliver, (annotation,)) for annotation in annotations],
+                          concurrency=self.concurrency)
+
+            with self._condition:
+                for annotation, result in zip(annotations, results):
+                    if isinstance(result, Exception):
+                        self.stats['failed'] += 1
+                        self.errors.append((annotation, result))
+                    else:
+                        self.stats['delivered'] += 1
+                self._in_flight -= len(annotations)
+                if not self._queue:
+                    self._flushing = False
+                self._condition.notify_all()
+
+    def _due(self):
+        if not self._queue:
+            return False
+        return (self._flushing or len(self._queue) >= self.batch_size or
+                self._queue[0][0] + self.flush_interval <= time.time())
+
+    def _wait(self):
+        if not self._queue:
+            return None
+        return max(0.0, self._queue[0][0] + self.flush_interval - time.time())
+
+    def _deliver(self, annotation):
+        attempt = 0
+        while True:
+            try:
+                return self._api.post('log_message', **annotation)
+            except Exception as e:
+                if not _retryable(e) or attempt >= self._retry.retries:
+                    raise
+                with self._condition:
+                    self.stats['retried'] += 1
+                time.sleep(self._retry.delay(attempt))
+                attempt += 1
+
+
+def _retryable(error):
+    # Only failures to connect are retried: once the request may have been
+    # sent, e.g. when the connection is reset or reading the response times
+    # out, the annotation may already have been created.
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError):
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    return isinstance(error, requests.HTTPError) and bool(error.args) and \
+        error.args[0] in RetryPolicy.STATUSES
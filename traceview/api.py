@@ -8,8 +8,17 @@ This module is responsible for communicating with the TraceView API.
 """
 
 import logging
+import threading
+import time
 
-import requests
+from . import series
+from .cache import ResponseCache, request_key
+from .decoders import BACKENDS, get_decoder
+from .follow import Follower
+from .instrument import RequestEvent, clock
+from .singleflight import SingleFlight
+from .stream import TimeseriesStream
+from .throttle import RetryPolicy, TokenBucket, retry_after
 
 
 log = logging.getLogger(__name__)
@@ -20,23 +29,91 @@ class Api(object):
 
     Responsible for making HTTP requests to the TraceView API.
 
+    Requests are sent through a single :class:`requests.Session`, so
+    connections to the API are kept alive and reused between calls. Call
+    :meth:`close` to release the pooled connections. The session, and the
+    ``requests`` library itself, are only loaded on the first request.
+
+    :param str api_key: The TraceView API access key.
+    :param func after_request: (optional) Function to format API results.
+    :param int pool_size: (optional) Maximum number of connections kept alive in the pool.
+    :param str authority: (optional) Scheme and host of the API, defaults to :attr:`AUTHORITY`.
+    :param float timeout: (optional) Seconds to wait for the API before giving up on a request.
+    :param cache: (optional) ``True`` or a :class:`ResponseCache <traceview.cache.ResponseCache>` to cache GET results.
+    :param retries: (optional) Number of retries, or a :class:`RetryPolicy <traceview.throttle.RetryPolicy>`, for failed GET requests.
+    :param rate_limit: (optional) Requests per second, or a shared :class:`TokenBucket <traceview.throttle.TokenBucket>`, to pace requests.
+    :param bool coalesce: (optional) Share one HTTP request between identical GET requests made at the same time.
+    :param store: (optional) A :class:`SeriesStore <traceview.store.SeriesStore>` serving time ranges of timeseries already fetched.
+    :param instruments: (optional) :class:`Instrument <traceview.instrument.Instrument>` objects notified around each API call.
+    :param cassette: (optional) A :class:`Cassette <traceview.cassette.Cassette>` recording or replaying the responses of the API.
+    :param bool compress: (optional) Ask for compressed responses, in every content coding the client is able to decode.
+    :param decoder: (optional) JSON decoder backend of the responses: ``'auto'`` for the fastest installed, a name in :data:`BACKENDS <traceview.decoders.BACKENDS>` or a function. See :func:`get_decoder <traceview.decoders.get_decoder>`.
+
+    The ``stats`` dictionary counts ``retries``, GET requests answered by
+    another identical request in flight (``coalesced``), the seconds spent
+    waiting on the rate limit (``throttle_delay``) and between retries
+    (``backoff_delay``), and the response bytes received (``wire_bytes``)
+    and decompressed (``decoded_bytes``).
+
+    Each API call is described to the ``instruments`` by a
+    :class:`RequestEvent <traceview.instrument.RequestEvent>`, with its
+    endpoint, status, size and the time spent connecting, transferring,
+    decoding and formatting. Calls aren't timed without instruments.
+
     """
 
     AUTHORITY = "https://api.tv.appneta.com"
     VERSION = "api-v2"
+    #: Size, in bytes, of the response chunks read by streamed requests.
+    STREAM_CHUNK_SIZE = 65536
     __methods = [
         'get',
         'post',
         'delete'
     ]
 
-    def __init__(self, api_key, after_request=None):
+    def __init__(self, api_key, after_request=None, pool_size=10, authority=None,
+                 timeout=None, cache=None, retries=0, rate_limit=None,
+                 coalesce=False, store=None, instruments=None, cassette=None,
+                 compress=True, decoder='auto'):
         self._api_key = api_key
         self._after_request = after_request
+        self._authority = authority or self.AUTHORITY
+        self._timeout = timeout
+        self.cache = ResponseCache() if cache is True else cache
+        self._retry = retries if isinstance(retries, RetryPolicy) else RetryPolicy(retries)
+        if rate_limit is not None and not isinstance(rate_limit, TokenBucket):
+            rate_limit = TokenBucket(rate_limit)
+        self._limiter = rate_limit
+        self._flights = SingleFlight() if coalesce else None
+        self.store = store
+        self.instruments = list(instruments or ())
+        self.cassette = cassette
+        self.compress = compress
+        if not callable(decoder) and decoder not in BACKENDS + ('auto', None):
+            raise ValueError("Unknown JSON decoder: {0}".format(decoder))
+        self._decoder = decoder
+        # A named backend must be installed; 'auto' is picked on first use.
+        self._loads = None if decoder in ('auto', None) else get_decoder(decoder)
+        self.stats = {'retries': 0, 'coalesced': 0,
+                      'throttle_delay': 0.0, 'backoff_delay': 0.0,
+                      'wire_bytes': 0, 'decoded_bytes': 0}
+        self._stats_lock = threading.Lock()
+        self._pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def close(self):
+        """ Close all pooled connections to the TraceView API. """
+        with self._session_lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
 
     def get(self, path, *args, **kwargs):
         """ Perform a HTTP GET request.
 
+        :param bool stream: (optional) Decode a timeseries response while it is read, returning a :class:`TimeseriesStream <traceview.stream.TimeseriesStream>`.
         :param dict kwargs: (optional) Query parameters for the request.
 
         """
@@ -58,6 +135,82 @@ class Api(object):
         """
         return self._request(method='delete', path=path, *args, **kwargs)
 
+    def get_range(self, path, start, end, concurrency=8, **kwargs):
+        """ Perform HTTP GET requests for a timeseries over a time range.
+
+        The range is split into time windows of a single size supported by
+        the API ('week', 'day' or 'hour'), which are requested concurrently
+        and stitched into a single timeseries without duplicate timestamps.
+        The resolution of the points depends on the time window: by default,
+        the largest one that fits in the range, see :func:`series.window
+        <traceview.series.window>`; pass ``time_window`` for another one.
+        With a ``store``, only the time ranges missing from the store are
+        requested.
+
+        :param str path: The HTTP path to request.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :param int concurrency: (optional) Maximum number of requests in flight.
+        :param dict kwargs: (optional) Query parameters for the requests, and ``time_window``.
+
+        """
+        from .batch import run
+
+        kwargs = self._range_params(start, end, kwargs)
+        gaps, requests = self._plan_range(path, start, end, kwargs)
+        results = run([(self._get_unformatted, (path, params)) for _, params in requests],
+                      concurrency=concurrency)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return self._format(self._merge_range(path, start, end, kwargs, gaps, requests, results))
+
+    def follower(self, path, size=120, params=None):
+        """ Returns a :class:`Follower <traceview.follow.Follower>` of a timeseries.
+
+        :param str path: The HTTP path of the timeseries.
+        :param int size: (optional) Number of points kept by the follower.
+        :param dict params: (optional) Query parameters (filters) of the timeseries.
+
+        """
+        return Follower(self, path, size=size, params=params)
+
+    def _range_params(self, start, end, params):
+        """ Returns the query parameters of a time range with the time window
+        of its requests, which is the window of the whole range so that every
+        point has the same resolution. The window is part of the series key
+        in the store, so that points of different resolutions aren't mixed.
+
+        """
+        return dict(params, time_window=params.get('time_window') or series.window(start, end))
+
+    def _plan_range(self, path, start, end, params):
+        """ Returns the time ranges to fetch, and the ``(range index, query
+        parameters)`` of the requests fetching them.
+
+        """
+        gaps = [(start, end)] if self.store is None else self.store.missing(path, params, start, end)
+        requests = [(index, dict(params, time_end=time_end))
+                    for index, (gap_start, gap_end) in enumerate(gaps)
+                    for _, time_end in series.plan(gap_start, gap_end, params['time_window'])]
+        return gaps, requests
+
+    def _merge_range(self, path, start, end, params, gaps, requests, results):
+        """ Stitches the fetched results with the stored ones, storing the
+        fetched time ranges.
+
+        """
+        fetched = [series.stitch([result for (owner, _), result in zip(requests, results)
+                                  if owner == index], gap_start, gap_end)
+                   for index, (gap_start, gap_end) in enumerate(gaps)]
+        if self.store is None:
+            return series.stitch(fetched, start, end)
+
+        for (gap_start, gap_end), result in zip(gaps, fetched):
+            self.store.write(path, params, gap_start, gap_end, result)
+        stored = self.store.read(path, params, start, end).to_results()
+        return series.stitch([stored] + fetched, start, end)
+
     def _request(self, method, path, *args, **kwargs):
         """ Perform a HTTP request.
 
@@ -65,28 +218,285 @@ class Api(object):
         :param str path: The HTTP path to request.
         :param dict kwargs: (optional) Query parameters for the request.
 
+        """
+        stream = kwargs.pop('stream', False)
+        method, url, params = self._prepare(method, path, kwargs)
+        event = self._start_event(method, path)
+        try:
+            if method == 'get' and not stream:
+                results = self._get(path, url, params, event)
+            else:
+                results = self._send(method, url, params, stream, event)
+                if self.cache is not None and method != 'get':
+                    self.cache.invalidate(path)
+            results = self._timed_format(results, event)
+        except Exception as e:
+            self._finish_event(event, e)
+            raise
+        self._finish_event(event)
+        return results
+
+    def _get_unformatted(self, path, params):
+        method, url, params = self._prepare('get', path, params)
+        event = self._start_event(method, path)
+        try:
+            results = self._get(path, url, params, event)
+        except Exception as e:
+            self._finish_event(event, e)
+            raise
+        self._finish_event(event)
+        return results
+
+    def _get(self, path, url, params, event=None):
+        """ Get the unformatted API results of a GET request, from the cache
+        or a coalesced request when possible.
+
+        """
+        if self.cache is not None:
+            hit, results = self.cache.lookup(path, params)
+            if hit:
+                if event is not None:
+                    event.cached = True
+                return results
+            generation = self.cache.generation()
+
+        if self._flights is None:
+            results = self._send('get', url, params, event=event)
+        else:
+            results, shared = self._flights.do(request_key(path, params),
+                                               lambda: self._send('get', url, params, event=event))
+            if shared:
+                self._count('coalesced')
+                if event is not None:
+                    event.coalesced = True
+
+        if self.cache is not None:
+            self.cache.store(path, params, results, generation)
+        return results
+
+    def _send(self, method, url, params, stream=False, event=None):
+        """ Send a HTTP request and return the unformatted API results.
+
+        :param str method: The HTTP method to perform on the request.
+        :param str url: The URL to request.
+        :param dict params: Query parameters for the request.
+        :param bool stream: (optional) Return a :class:`TimeseriesStream <traceview.stream.TimeseriesStream>` of the results.
+        :param event: (optional) The :class:`RequestEvent <traceview.instrument.RequestEvent>` timing the request.
+
+        """
+        import requests
+
+        session = self._get_session()
+        attempt = 0
+        while True:
+            _sleep(self._throttle_delay())
+            if event is not None:
+                event.attempts += 1
+                started = clock()
+            try:
+                # Timed requests read the body themselves, to tell the
+                # transfer apart from the wait for the response headers.
+                response = session.request(method, url, params=params,
+                                           allow_redirects=False,
+                                           timeout=self._timeout,
+                                           stream=stream or event is not None)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self._retry.should_retry(method, attempt):
+                    raise
+                _sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if event is not None:
+                self._time_response(event, started, response.status_code,
+                                    None if stream else lambda: response.content)
+            if not stream:
+                decoded = len(response.content)
+                self._count_transfer(decoded, _wire_size(response, decoded), event)
+
+            if response.status_code == requests.codes.ok: # pylint: disable-msg=E1101
+                if stream:
+                    return self._stream(response)
+                if event is None:
+                    return self._decode(response.content)['data']
+                started = clock()
+                results = self._decode(response.content)['data']
+                event.timings['decode'] += clock() - started
+                return results
+
+            wait = self._retry_after(response.status_code, response.headers)
+            if not self._retry.should_retry(method, attempt, response.status_code):
+                text = response.text
+                response.close()
+                raise requests.HTTPError(response.status_code, url, text)
+            # Streamed responses hold their pooled connection until closed.
+            response.close()
+            _sleep(self._backoff_delay(attempt, wait))
+            attempt += 1
+
+    def _stream(self, response):
+        """ Returns a :class:`TimeseriesStream <traceview.stream.TimeseriesStream>`
+        decoding a response as its body is read and decompressed, counting
+        its bytes once it is closed.
+
+        """
+        decoded = [0]
+
+        def chunks():
+            for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                decoded[0] += len(chunk)
+                yield chunk
+
+        def close():
+            self._count_transfer(decoded[0], _wire_size(response, decoded[0]))
+            response.close()
+
+        return TimeseriesStream(chunks(), close=close)
+
+    def _count_transfer(self, decoded, wire, event=None):
+        """ Counts the bytes of a response body, as received and decompressed. """
+        self._count('decoded_bytes', decoded)
+        self._count('wire_bytes', wire)
+        if event is not None:
+            event.bytes += decoded
+            event.wire_bytes += wire
+
+    def _throttle_delay(self):
+        """ Returns how long to wait for the rate limit before sending a request. """
+        if self._limiter is None:
+            return 0.0
+        delay = self._limiter.reserve()
+        self._count('throttle_delay', delay)
+        return delay
+
+    def _retry_after(self, status, headers):
+        """ Returns the wait requested by the API for a failed request, holding
+        back the rate limit when the API is throttling the client.
+
+        """
+        wait = retry_after(headers)
+        if status == 429 and wait and self._limiter is not None:
+            self._limiter.pause(wait)
+        return wait
+
+    def _backoff_delay(self, attempt, wait=None):
+        """ Returns how long to wait before retrying a failed request. """
+        delay = self._retry.delay(attempt, wait)
+        self._count('retries')
+        self._count('backoff_delay', delay)
+        log.debug("Retrying request in %.2fs (attempt %d)" % (delay, attempt + 1,))
+        return delay
+
+    def _start_event(self, method, path):
+        """ Returns the :class:`RequestEvent <traceview.instrument.RequestEvent>`
+        of an API call, or ``None`` without instruments.
+
+        """
+        if not self.instruments:
+            return None
+        event = RequestEvent(method, path)
+        for instrument in self.instruments:
+            try:
+                instrument.request_started(event)
+            except Exception:
+                log.exception("Instrument %r failed" % (instrument,))
+        return event
+
+    def _finish_event(self, event, error=None):
+        if event is None:
+            return
+        event.finish(error)
+        for instrument in self.instruments:
+            try:
+                instrument.request_finished(event)
+            except Exception:
+                log.exception("Instrument %r failed" % (instrument,))
+
+    def _time_response(self, event, started, status, read=None):
+        """ Times the wait for the response headers and, with a ``read``
+        function returning the body, its transfer.
+
+        """
+        received = clock()
+        event.timings['connect'] += received - started
+        event.status = status
+        if read is not None:
+            read()
+            event.timings['transfer'] += clock() - received
+
+    def _timed_format(self, results, event):
+        if event is None:
+            return self._format(results)
+        started = clock()
+        results = self._format(results)
+        event.timings['format'] += clock() - started
+        return results
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def _prepare(self, method, path, params):
+        """ Validates the HTTP method and builds the URL and query parameters
+        for a request.
+
+        :param str method: The HTTP method to perform on the request.
+        :param str path: The HTTP path to request.
+        :param dict params: Query parameters for the request.
+
         """
         url = self._url(path)
-        params = self._build_query_params(kwargs)
+        params = self._build_query_params(params)
 
         method = method.lower()
         if method not in self.__methods:
+            import requests
             raise requests.HTTPError("HTTP method is unsupported: %s" % (method,))
 
         log.debug("%s %s %s" % (method.upper(), url, params,))
+        return method, url, params
 
-        request_method = getattr(requests, method)
-        response = request_method(url, params=params, allow_redirects=False)
-        if response.status_code != requests.codes.ok: # pylint: disable-msg=E1101
-            raise requests.HTTPError(response.status_code, url, response.text)
-
-        results = response.json()['data']
+    def _format(self, results):
         if self._after_request:
             return self._after_request(results)
         return results
 
     def _url(self, path):
-        return "{0}/{1}/{2}".format(self.AUTHORITY, self.VERSION, path)
+        return "{0}/{1}/{2}".format(self._authority, self.VERSION, path)
+
+    def _decode(self, body):
+        """ Decodes a JSON response body with the decoder backend, loaded on first use. """
+        if self._loads is None:
+            self._loads = get_decoder(self._decoder)
+        return self._loads(body)
+
+    def _get_session(self):
+        session = self._session
+        if session is None:
+            # Threads sharing a new Api must share one session and pool.
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session(self._pool_size)
+                session = self._session
+        return session
+
+    def _build_session(self, pool_size):
+        """ Builds a :class:`requests.Session` with a keep-alive connection pool.
+
+        :param int pool_size: Maximum number of connections kept alive in the pool.
+
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = accept_encoding() if self.compress else 'identity'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        if self.cassette is not None:
+            adapter = self.cassette.adapter(adapter)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
 
     def _build_query_params(self, params=None):
         """ Builds and returns a Dictionary of query parameters.
@@ -98,3 +508,39 @@ class Api(object):
             params = {}
         params.update({"key": self._api_key})
         return params
+
+
+def accept_encoding():
+    """ Returns the ``Accept-Encoding`` header of the content codings that
+    ``requests`` is able to decompress: gzip and deflate, and brotli or zstd
+    when the urllib3 used by ``requests`` supports them.
+
+    """
+    # Older requests bundle their own urllib3; a standalone urllib3 may
+    # advertise codings the bundled one can't decompress.
+    from requests.utils import default_headers
+
+    return default_headers()['Accept-Encoding']
+
+
+def _wire_size(response, decoded):
+    """ Returns the size of a response body as received, before it was
+    decompressed, falling back to its ``Content-Length`` and then to its
+    decoded size when the transport doesn't tell.
+
+    """
+    try:
+        wire = response.raw.tell()
+    except AttributeError:
+        wire = 0
+    if not wire:
+        try:
+            wire = int(response.headers.get('Content-Length', decoded))
+        except ValueError:
+            wire = decoded
+    return wire
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
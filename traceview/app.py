@@ -19,6 +19,12 @@ class Assign(Resource):
         kwargs['appname'] = app
         return self.api.post('assign_app', *args, **kwargs)
 
+    def update_many(self, assignments, concurrency=8, dry_run=False):
+        from .batch import bulk
+
+        assignments = [tuple(assignment) for assignment in assignments]
+        return bulk(self.update, assignments, concurrency=concurrency, dry_run=dry_run)
+
 
 class App(Resource):
 
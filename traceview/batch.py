@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.batch
+
+This module is responsible for running many TraceView API calls concurrently.
+
+"""
+
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+
+def run(calls, concurrency=8):
+    """ Run API calls on a bounded thread pool.
+
+    Each call is either a callable or a ``(func, args, kwargs)`` tuple, where
+    ``args`` and ``kwargs`` may be omitted. Results are returned in the same
+    order as the calls. A call that raises returns its exception as the result
+    instead of aborting the batch.
+
+    :param calls: The calls to run.
+    :param int concurrency: (optional) Maximum number of calls in flight.
+    :rtype: list
+
+    """
+    calls = [_normalize(call) for call in calls]
+    if not calls:
+        return []
+
+    pool = ThreadPool(max(1, min(concurrency, len(calls))))
+    try:
+        return pool.map(_invoke, calls, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+class Outcome(namedtuple('Outcome', 'item ok result error')):
+    """ The outcome of one item of a bulk operation: the item, whether it
+    succeeded, and the API result or the exception raised.
+
+    """
+
+    __slots__ = ()
+
+
+class BulkReport(object):
+    """ The :class:`BulkReport <BulkReport>` object.
+
+    The per item outcomes of a bulk operation, in the order of the items.
+
+    :param list outcomes: The :class:`Outcome` of every item.
+    :param bool dry_run: (optional) Whether the operation was only planned.
+
+    """
+
+    def __init__(self, outcomes, dry_run=False):
+        self.outcomes = outcomes
+        self.dry_run = dry_run
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __iter__(self):
+        return iter(self.outcomes)
+
+    def __repr__(self):
+        return '<BulkReport [{0} succeeded, {1} failed{2}]>'.format(
+            len(self.succeeded), len(self.failed), ', dry run' if self.dry_run else '')
+
+    @property
+    def ok(self):
+        """ Whether every item succeeded. """
+        return all(outcome.ok for outcome in self.outcomes)
+
+    @property
+    def succeeded(self):
+        """ The outcomes of the items that succeeded. """
+        return [outcome for outcome in self.outcomes if outcome.ok]
+
+    @property
+    def failed(self):
+        """ The outcomes of the items that failed. """
+        return [outcome for outcome in self.outcomes if not outcome.ok]
+
+
+def bulk(func, items, concurrency=8, dry_run=False):
+    """ Run an API call once per item on a bounded thread pool, and report
+    the outcome of every item. Items that are tuples are passed to ``func``
+    as positional arguments. An item fails if its call raises or returns
+    ``False``, as e.g. :meth:`TraceView.delete_host
+    <traceview.TraceView.delete_host>` does when nothing was deleted.
+
+    :param func: The API call, e.g. :meth:`Host.delete <traceview.host.Host.delete>`.
+    :param items: The items to call ``func`` with.
+    :param int concurrency: (optional) Maximum number of calls in flight.
+    :param bool dry_run: (optional) Report the items without calling ``func``.
+    :rtype: :class:`BulkReport`
+
+    """
+    items = list(items)
+    if dry_run:
+        return BulkReport([Outcome(item, True, None, None) for item in items], dry_run=True)
+    return _report(items, run(_bulk_calls(func, items), concurrency=concurrency))
+
+
+def _bulk_calls(func, items):
+    return [(func, item if isinstance(item, tuple) else (item,)) for item in items]
+
+
+def _report(items, results):
+    outcomes = []
+    for item, result in zip(items, results):
+        if isinstance(result, Exception):
+            outcomes.append(Outcome(item, False, None, result))
+        else:
+            outcomes.append(Outcome(item, result is not False, result, None))
+    return BulkReport(outcomes)
+
+
+def _normalize(call):
+    if callable(call):
+        return call, (), {}
+    func, args, kwargs = (tuple(call) + ((), {}))[:3]
+    return func, tuple(args or ()), dict(kwargs or {})
+
+
+def _invoke(call):
+    func, args, kwargs = call
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        return e
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.cache
+
+This module contains an in-memory cache for TraceView API responses.
+
+"""
+
+from collections import OrderedDict, deque
+import copy
+import re
+import threading
+import time
+
+
+class ResponseCache(object):
+    """ The :class:`ResponseCache <ResponseCache>` object.
+
+    A bounded LRU cache of API results with a time-to-live per path. Only
+    paths matching one of ``ttls`` (or every path, if ``default_ttl`` is set)
+    are cached. Results are cached as returned by the API, before they are
+    formatted. Each caller gets its own copy, so that changing a result
+    doesn't change the cached one.
+
+    A GET request racing a POST or DELETE that invalidates its path isn't
+    cached: take a :meth:`generation` before sending the request and pass
+    it to :meth:`store`.
+
+    :param int max_size: (optional) Maximum number of cached results.
+    :param ttls: (optional) Sequence of ``(path regex, seconds)`` pairs. The first matching pattern wins. Defaults to :attr:`DEFAULT_TTLS`.
+    :param float default_ttl: (optional) Time-to-live for paths that match no pattern. ``0`` disables caching them.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.cache import ResponseCache
+      >>> tv = traceview.TraceView('API KEY HERE', cache=ResponseCache(max_size=512))
+      >>> tv.apps()
+      [u'Default', u'flask_app']
+      >>> tv.apps()  # served from the cache
+      [u'Default', u'flask_app']
+
+    """
+
+    #: Time-to-live, in seconds, of the rarely changing discovery and organization paths.
+    DEFAULT_TTLS = (
+        (r'^(actions|apps|browsers|controllers|domains|metrics|regions)$', 300),
+        (r'^layers/[^/]+$', 300),
+        (r'^organization(/licenses)?$', 300),
+    )
+
+    #: Paths invalidated by a successful POST or DELETE of a path.
+    INVALIDATES = (
+        (r'^assign_app$', r'^(apps|hosts|app/[^/]+/hosts|layers/[^/]+|organization/licenses)$'),
+        (r'^hosts/[^/]+$', r'^(hosts(/.*)?|app/[^/]+/hosts|organization/licenses)$'),
+        (r'^app/[^/]+$', r'^(apps|hosts|app/.*|layers/[^/]+)$'),
+        (r'^log_message$', r'^(annotations|app/[^/]+/annotations)$'),
+    )
+
+    #: Number of recent invalidations checked by :meth:`store`. Results
+    #: requested before older invalidations aren't cached.
+    INVALIDATION_LOG_SIZE = 64
+
+    def __init__(self, max_size=256, ttls=None, default_ttl=0):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._ttls = [(re.compile(pattern), ttl)
+                      for pattern, ttl in (self.DEFAULT_TTLS if ttls is None else ttls)]
+        self._invalidates = [(re.compile(mutated), re.compile(dependent))
+                             for mutated, dependent in self.INVALIDATES]
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._invalidations = deque(maxlen=self.INVALIDATION_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl(self, path):
+        """ Returns the time-to-live of a path, in seconds. """
+        for pattern, ttl in self._ttls:
+            if pattern.match(path):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, path, params):
+        """ Looks up the cached result of a GET request.
+
+        :param str path: The HTTP path of the request.
+        :param dict params: Query parameters of the request.
+        :return: ``(hit, result)``
+        :rtype: tuple
+
+        """
+        if not self.ttl(path):
+            return False, None
+
+        key = request_key(path, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._move_to_end(key)
+                self.hits += 1
+                result = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+        return True, copy.deepcopy(result)
+
+    def generation(self):
+        """ Returns the current generation of the cache, to pass to
+        :meth:`store` for a request about to be sent.
+
+        """
+        return self._generation
+
+    def store(self, path, params, result, generation=None):
+        """ Caches the result of a GET request.
+
+        :param str path: The HTTP path of the request.
+        :param dict params: Query parameters of the request.
+        :param result: The API result.
+        :param int generation: (optional) The :meth:`generation` taken before the request was sent. The result isn't cached if its path was invalidated since.
+
+        """
+        ttl = self.ttl(path)
+        if not ttl:
+            return
+
+        key = request_key(path, params)
+        result = copy.deepcopy(result)
+        with self._lock:
+            if generation is not None and self._invalidated_since(generation, path):
+                return
+            self._entries[key] = (time.time() + ttl, result)
+            self._move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path):
+        """ Drops the cached results that depend on a mutated path.
+
+        :param str path: The HTTP path of a successful POST or DELETE request.
+
+        """
+        dependents = [dependent for mutated, dependent in self._invalidates
+                      if mutated.match(path)]
+        if not dependents:
+            return
+
+        with self._lock:
+            self._generation += 1
+            self._invalidations.append((self._generation, dependents))
+            for key in list(self._entries):
+                if any(dependent.match(key[0]) for dependent in dependents):
+                    del self._entries[key]
+
+    def clear(self):
+        """ Drops every cached result. """
+        with self._lock:
+            self._entries.clear()
+
+    def _invalidated_since(self, generation, path):
+        if generation == self._generation:
+            return False
+        if not self._invalidations or self._invalidations[0][0] > generation + 1:
+            # Invalidations since then were dropped from the log.
+            return True
+        return any(any(dependent.match(path) for dependent in dependents)
+                   for invalidated, dependents in self._invalidations if invalidated > generation)
+
+    def _move_to_end(self, key):
+        # OrderedDict.move_to_end is unavailable in Python 2.
+        self._entries[key] = self._entries.pop(key)
+
+
+def request_key(path, params):
+    """ Builds a key identifying a GET request from its path and query
+    parameters, excluding the API key and parameters that are not sent.
+
+    """
+    return path, tuple(sorted((name, str(value)) for name, value in params.items()
+                              if name != 'key' and value is not None))
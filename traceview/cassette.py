@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.cassette
+
+This module contains a record and replay transport for the TraceView API,
+for deterministic runs without network access.
+
+"""
+
+import hashlib
+import mmap
+import struct
+import threading
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+try:
+    from urllib.parse import parse_qsl, urlencode, urlsplit
+except ImportError:  # Python 2
+    from urllib import urlencode
+    from urlparse import parse_qsl, urlsplit
+
+
+MAGIC = b'TVC1'
+#: Recorded response: status, size of the key, size of the body.
+ENTRY = struct.Struct('<HII')
+#: Index entry: hash of the key, offset of the recorded response.
+INDEX = struct.Struct('<QQ')
+#: End of the cassette: offset of the index, number of index entries, magic.
+TRAILER = struct.Struct('<QQ4s')
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class CassetteMiss(LookupError):
+    """ Raised when replaying a request that wasn't recorded. """
+
+
+class Cassette(object):
+    """ The :class:`Cassette <Cassette>` object.
+
+    A file of recorded API responses. In ``'record'`` mode, the responses of
+    requests sent through :meth:`adapter` are appended to the file, and an
+    index sorted by request key is written by :meth:`close`. In ``'replay'``
+    mode, the file is memory-mapped and responses are looked up with a
+    binary search of the index, without reading the rest of the file or
+    touching the network.
+
+    Requests are keyed by method, path and query parameters; the API key
+    and the ``ignore`` parameters are left out, so that they are neither
+    stored nor matched. When a request is recorded more than once, the last
+    response is replayed.
+
+    :param str path: The cassette file.
+    :param str mode: (optional) ``'record'`` or ``'replay'``.
+    :param ignore: (optional) Names of query parameters not to match on, e.g. ``('time_end',)``.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.cassette import Cassette
+      >>> with Cassette('apps.tvc', mode='record') as cassette:
+      ...     tv = traceview.TraceView('API KEY HERE', cassette=cassette)
+      ...     tv.apps()
+      [u'Default', u'flask_app']
+      >>> tv = traceview.TraceView('API KEY HERE', cassette=Cassette('apps.tvc'))
+      >>> tv.apps()  # replayed
+      [u'Default', u'flask_app']
+
+    """
+
+    def __init__(self, path, mode=REPLAY, ignore=()):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.ignore = frozenset(ignore) | frozenset(['key'])
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._offsets = {}
+        self._index_offset = 0
+        self._count = 0
+
+        if mode == RECORD:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC)
+        else:
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._map) < len(MAGIC) + TRAILER.size or self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError("Not a cassette: {0}".format(path))
+            self._index_offset, self._count, magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+            if magic != MAGIC:
+                raise ValueError("Cassette was not closed after recording: {0}".format(path))
+
+    def __len__(self):
+        return len(self._offsets) if self.mode == RECORD else self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def key(self, method, url):
+        """ Returns the key of a request, as bytes.
+
+        :param str method: The HTTP method.
+        :param str url: The URL, with its query string.
+
+        """
+        parts = urlsplit(url)
+        query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                       if name not in self.ignore)
+        key = '{0} {1}?{2}'.format(method.upper(), parts.path, urlencode(query))
+        return key.encode('utf-8')
+
+    def add(self, key, status, body):
+        """ Records a response.
+
+        :param bytes key: The request key, see :meth:`key`.
+        :param int status: The HTTP status of the response.
+        :param bytes body: The body of the response.
+
+        """
+        if self.mode != RECORD:
+            raise ValueError("Cassette is not recording")
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(ENTRY.pack(status, len(key), len(body)))
+            self._file.write(key)
+            self._file.write(body)
+            self._offsets[key] = offset
+
+    def lookup(self, key):
+        """ Returns the ``(status, body)`` of the response recorded for a
+        key, or ``None``.
+
+        :param bytes key: The request key, see :meth:`key`.
+
+        """
+        if self.mode == RECORD:
+            raise ValueError("Cassette is recording")
+        mapped = self._map
+        digest = _hash(key)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if INDEX.unpack_from(mapped, self._index_offset + middle * INDEX.size)[0] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        # Keys with the same hash are adjacent; compare the keys themselves.
+        while low < self._count:
+            entry_hash, offset = INDEX.unpack_from(mapped, self._index_offset + low * INDEX.size)
+            if entry_hash != digest:
+                break
+            status, key_size, body_size = ENTRY.unpack_from(mapped, offset)
+            start = offset + ENTRY.size
+            if mapped[start:start + key_size] == key:
+                return status, mapped[start + key_size:start + key_size + body_size]
+            low += 1
+        return None
+
+    def adapter(self, adapter=None):
+        """ Returns the transport adapter recording or replaying responses.
+
+        :param adapter: (optional) The :class:`requests.adapters.HTTPAdapter` sending requests while recording.
+
+        """
+        if self.mode == RECORD:
+            return RecordingAdapter(self, adapter)
+        return ReplayAdapter(self)
+
+    def close(self):
+        """ Writes the index of a recording cassette, or unmaps a replaying one. """
+        with self._lock:
+            if self._file is not None:
+                index = sorted((_hash(key), offset) for key, offset in self._offsets.items())
+                index_offset = self._file.tell()
+                for entry in index:
+                    self._file.write(INDEX.pack(*entry))
+                self._file.write(TRAILER.pack(index_offset, len(index), MAGIC))
+                self._file.close()
+                self._file = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+def _hash(key):
+    return struct.unpack('<Q', hashlib.sha1(key).digest()[:8])[0]
+
+
+class RecordingAdapter(BaseAdapter):
+    """ Sends requests through another adapter and records their responses
+    in a :class:`Cassette`.
+
+    """
+
+    def __init__(self, cassette, adapter=None):
+        super(RecordingAdapter, self).__init__()
+        self.cassette = cassette
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        response = self.adapter.send(request, **kwargs)
+        # Reads the body, even of streamed responses, which then iterate over it.
+        self.cassette.add(self.cassette.key(request.method, request.url),
+                          response.status_code, response.content)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """ Answers requests with the responses recorded in a :class:`Cassette`,
+    raising :class:`CassetteMiss` for the others.
+
+    """
+
+    def __init__(self, cassette):
+        super(ReplayAdapter, self).__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        recorded = self.cassette.lookup(self.cassette.key(request.method, request.url))
+        if recorded is None:
+            raise CassetteMiss("No recorded response for {0} {1}".format(request.method, request.url))
+        status, body = recorded
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers['Content-Type'] = 'application/json'
+        response.headers['Content-Length'] = str(len(body))
+        response._content = body
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
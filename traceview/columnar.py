@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.columnar
+
+This module contains column oriented containers for TraceView API timeseries
+results.
+
+"""
+
+from array import array
+from itertools import compress, islice
+import math
+import operator
+
+
+NAN = float('nan')
+
+
+class Columns(object):
+    """ The :class:`Columns <Columns>` object.
+
+    Timeseries data stored as one contiguous array of doubles per field,
+    instead of one object per point. Missing (``None``) values are stored as
+    NaN and flagged in a per field validity mask.
+
+    :param fields: The field names.
+    :param columns: One sequence of doubles per field, e.g. :class:`array.array` or :class:`memoryview`.
+    :param masks: (optional) One :class:`bytearray` per field, ``1`` where the value is present. Defaults to all present.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.formatters import columnar
+      >>> tv = traceview.TraceView('API KEY HERE', columnar)
+      >>> series = tv.server.latency_series('Default', time_window='week')
+      >>> series.fields
+      ('timestamp', 'volume', 'avg_latency')
+      >>> series.mean('avg_latency', weights='volume')
+      213911.87181354698
+      >>> series[-120:].max('avg_latency')
+      1520391.0
+
+    """
+
+    def __init__(self, fields, columns, masks=None):
+        self.fields = tuple(fields)
+        self._columns = dict(zip(self.fields, columns))
+        if masks is None:
+            masks = [bytearray(b'\x01') * len(column) for column in columns]
+        self._masks = dict(zip(self.fields, masks))
+
+    @classmethod
+    def from_results(cls, results, chunk_size=4096):
+        """ Builds columns from timeseries API results.
+
+        :param results: Timeseries API results, either a ``{'fields': ..., 'items': ...}`` dict or a :class:`TimeseriesStream <traceview.stream.TimeseriesStream>`.
+        :param int chunk_size: (optional) Number of items converted at a time.
+
+        """
+        if isinstance(results, dict):
+            fields, items = results['fields'], results['items']
+        else:
+            items = iter(results)
+            fields = results.fields
+        builder = ColumnsBuilder(fields)
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                break
+            builder.extend(chunk)
+        return builder.build()
+
+    def __len__(self):
+        return len(self._columns[self.fields[0]]) if self.fields else 0
+
+    def __getitem__(self, key):
+        """ Returns the column of a field name, or the columns of a slice of
+        points.
+
+        """
+        if isinstance(key, slice):
+            return Columns(self.fields,
+                           [self._columns[field][key] for field in self.fields],
+                           [self._masks[field][key] for field in self.fields])
+        return self._columns[key]
+
+    def __iter__(self):
+        """ Iterates over the points as tuples, with ``None`` for missing values. """
+        columns = [self.values(field) for field in self.fields]
+        return zip(*columns) if columns else iter(())
+
+    def to_results(self):
+        """ Returns the points as a ``{'fields': ..., 'items': ...}`` dict, as
+        returned by the API.
+
+        """
+        return {'fields': ','.join(self.fields) or None,
+                'items': [list(point) for point in self]}
+
+    def mask(self, field):
+        """ Returns the validity mask of a field. """
+        return self._masks[field]
+
+    def values(self, field):
+        """ Iterates over the values of a field, with ``None`` for missing values. """
+        return (value if valid else None
+                for value, valid in zip(self._columns[field], self._masks[field]))
+
+    def present(self, field):
+        """ Iterates over the values of a field, skipping missing values. """
+        column, mask = self._columns[field], self._masks[field]
+        if mask.count(0):
+            return compress(column, mask)
+        return iter(column)
+
+    def count(self, field):
+        """ Returns the number of present values of a field. """
+        mask = self._masks[field]
+        return len(mask) - mask.count(0)
+
+    def sum(self, field):
+        """ Returns the sum of the present values of a field. """
+        return math.fsum(self.present(field))
+
+    def mean(self, field, weights=None):
+        """ Returns the mean of the present values of a field.
+
+        :param str field: The field name.
+        :param str weights: (optional) Name of a field to weight the values by, e.g. ``'volume'``.
+
+        """
+        if weights is None:
+            count = self.count(field)
+            return self.sum(field) / count if count else None
+
+        values, weight_values = self._columns[field], self._columns[weights]
+        masks = [mask for mask in (self._masks[field], self._masks[weights]) if mask.count(0)]
+        if masks:
+            mask = masks[0] if len(masks) == 1 else bytearray(map(operator.and_, *masks))
+            values = list(compress(values, mask))
+            weight_values = list(compress(weight_values, mask))
+        total = math.fsum(weight_values)
+        if not total:
+            return None
+        return math.fsum(map(operator.mul, values, weight_values)) / total
+
+    def min(self, field):
+        """ Returns the smallest present value of a field. """
+        return min(self.present(field)) if self.count(field) else None
+
+    def max(self, field):
+        """ Returns the largest present value of a field. """
+        return max(self.present(field)) if self.count(field) else None
+
+    def to_numpy(self, field, masked=False):
+        """ Returns the column of a field as a NumPy array, without copying it.
+        Requires NumPy.
+
+        :param str field: The field name.
+        :param bool masked: (optional) Return a :class:`numpy.ma.MaskedArray` hiding missing values.
+
+        """
+        import numpy
+
+        data = numpy.frombuffer(self._columns[field], dtype=numpy.float64)
+        if not masked:
+            return data
+        valid = numpy.frombuffer(self._masks[field], dtype=numpy.uint8)
+        return numpy.ma.masked_array(data, mask=valid == 0)
+
+
+class ColumnsBuilder(object):
+    """ The :class:`ColumnsBuilder <ColumnsBuilder>` object.
+
+    Appends timeseries items to growing columns, a chunk at a time.
+
+    :param fields: The field names, as a list or a comma separated string.
+
+    """
+
+    def __init__(self, fields):
+        if not isinstance(fields, (list, tuple)):
+            fields = fields.split(',')
+        self.fields = tuple(fields)
+        self._columns = [array('d') for _ in self.fields]
+        self._masks = [bytearray() for _ in self.fields]
+
+    def extend(self, items):
+        """ Appends a list of timeseries items.
+
+        :raises ValueError: If an item doesn't have one value per field; no item is appended then.
+
+        """
+        width = len(self.fields)
+        for item in items:
+            if len(item) != width:
+                raise ValueError("Timeseries item {0!r} doesn't match fields {1}".format(
+                    item, ','.join(self.fields)))
+        for values, column, mask in zip(zip(*items), self._columns, self._masks):
+            if None in values:
+                mask.extend(value is not None for value in values)
+                column.extend(NAN if value is None else value for value in values)
+            else:
+                mask.extend(b'\x01' * len(values))
+                column.extend(values)
+
+    def build(self):
+        return Columns(self.fields, self._columns, self._masks)
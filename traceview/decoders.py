@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.decoders
+
+This module contains the JSON decoder backends used to decode TraceView API
+responses.
+
+"""
+
+import json
+
+
+#: Decoder backends, fastest first. ``'auto'`` picks the first one installed.
+BACKENDS = ('orjson', 'ujson', 'simdjson', 'json')
+
+
+def get_decoder(backend=None):
+    """ Returns a function decoding a JSON document from bytes.
+
+    Documents rejected by a backend other than ``'json'``, e.g. integers
+    beyond 64 bits or floats out of range for orjson, are decoded again with
+    the standard library, so every backend accepts the same documents and
+    raises the same errors.
+
+    :param backend: (optional) A name in :data:`BACKENDS`, ``'auto'`` (or ``None``) for the fastest one installed, or a function.
+
+    Usage::
+
+      >>> from traceview.decoders import get_decoder
+      >>> get_decoder()(b'{"data": [1.5, null]}')
+      {'data': [1.5, None]}
+      >>> tv = traceview.TraceView('API KEY HERE', decoder='ujson')
+
+    """
+    if callable(backend):
+        return backend
+    if backend in (None, 'auto'):
+        for name in BACKENDS:
+            try:
+                return _load(name)
+            except ImportError:
+                continue
+    return _load(backend)
+
+
+def available():
+    """ Returns the names of the backends installed, fastest first. """
+    names = []
+    for name in BACKENDS:
+        try:
+            _load(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def _load(name):
+    if name == 'orjson':
+        import orjson
+        return _with_fallback(orjson.loads)
+    if name == 'ujson':
+        import ujson
+        return _with_fallback(ujson.loads)
+    if name == 'simdjson':
+        import simdjson
+        return _with_fallback(simdjson.loads)
+    if name == 'json':
+        return _json_loads
+    raise ValueError("Unknown JSON decoder: {0}".format(name))
+
+
+# Decoders of the fast backends, by the function they wrap.
+_fallbacks = {}
+
+
+def _with_fallback(loads):
+    decoder = _fallbacks.get(loads)
+    if decoder is None:
+        def decoder(body):
+            try:
+                return loads(body)
+            except (ValueError, OverflowError):
+                return _json_loads(body)
+        decoder = _fallbacks.setdefault(loads, decoder)
+    return decoder
+
+
+def _json_loads(body):
+    # json.loads only accepts bytes since Python 3.6.
+    if isinstance(body, bytes) and not isinstance(body, str):
+        body = body.decode('utf-8')
+    return json.loads(body)
@@ -16,4 +16,16 @@ class Rate(Resource):
 
     def get(self, app, *args, **kwargs):
         path = 'errors/{app}/rate'.format(app=app)
-        return self.api.get(path)
+        return self.api.get(path, *args, **kwargs)
+
+    def follower(self, app, size=120, **kwargs):
+        """ Follow the error rate timeseries of an application.
+
+        :param str app: The application name.
+        :param int size: (optional) Number of points kept by the follower.
+        :return: a follower of the error rate timeseries
+        :rtype: :class:`Follower <traceview.follow.Follower>`
+
+        """
+        path = 'errors/{app}/rate'.format(app=app)
+        return self.api.follower(path, size=size, params=kwargs)
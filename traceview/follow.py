@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.follow
+
+This module contains the objects used to follow live timeseries, fetching
+and formatting only the points that are new since the last poll.
+
+"""
+
+from collections import deque
+import time
+
+from . import series
+
+
+class Follower(object):
+    """ The :class:`Follower <Follower>` object.
+
+    Follows the timeseries of one path and set of filters. Each :meth:`poll`
+    requests the smallest time window that covers the time since the last
+    point seen, keeps the new points in a fixed-size ring buffer and returns
+    only those. Polls made before the next point is due don't reach the API.
+
+    Followers are created by the resources, e.g.
+    :meth:`Server.latency_follower <traceview.latency.Server.latency_follower>`,
+    through :meth:`Api.follower <traceview.api.Api.follower>`.
+
+    :param api: The :class:`Api <traceview.api.Api>` used to fetch the timeseries.
+    :param str path: The HTTP path of the timeseries.
+    :param int size: (optional) Number of points kept in the ring buffer, ``None`` to keep every point.
+    :param dict params: (optional) Query parameters (filters) of the timeseries.
+
+    Usage::
+
+      >>> import traceview
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> follower = tv.server.latency_follower('Default', size=120)
+      >>> follower.poll()
+      {u'fields': u'timestamp,volume,avg_latency', u'items': [[1399089120.0, 27.0, 226074.07407407407], ...]}
+      >>> follower.poll()
+      {u'fields': u'timestamp,volume,avg_latency', u'items': [[1399092750.0, 31.0, 204551.61290322580]]}
+
+    """
+
+    def __init__(self, api, path, size=120, params=None):
+        self.fields = None
+        self._api = api
+        self._path = path
+        self._params = dict(params or {})
+        self._points = deque(maxlen=size)
+        self._resolution = None
+
+    def __len__(self):
+        return len(self._points)
+
+    @property
+    def last_timestamp(self):
+        """ The timestamp of the newest point seen, or ``None``. """
+        return self._points[-1][0] if self._points else None
+
+    def poll(self):
+        """ Fetches the points that are new since the last poll.
+
+        :return: timeseries data of the new points, formatted by the configured formatter.
+
+        """
+        last = self.last_timestamp
+        params = self._params_due(last)
+        if params is None:
+            return self._format([])
+        return self._add(self._api._get_unformatted(self._path, params), last)
+
+    def snapshot(self):
+        """ Returns the points in the ring buffer, oldest first.
+
+        :return: timeseries data, formatted by the configured formatter.
+
+        """
+        return self._format(list(self._points))
+
+    def follow(self, interval=30, polls=None):
+        """ Polls every ``interval`` seconds and yields the new points.
+
+        :param float interval: (optional) Seconds between polls.
+        :param int polls: (optional) Number of polls before stopping. Runs forever by default.
+
+        """
+        count = 0
+        while polls is None or count < polls:
+            if count:
+                time.sleep(interval)
+            yield self.poll()
+            count += 1
+
+    def _params_due(self, last):
+        """ Returns the query parameters of the next request, or ``None`` if
+        no new point is due yet.
+
+        """
+        now = time.time()
+        if last is not None and self._resolution and now < last + self._resolution:
+            return None
+        return dict(self._params, time_window=self._window(now, last))
+
+    def _add(self, results, last):
+        """ Keeps the points of ``results`` newer than ``last``, and returns
+        them formatted.
+
+        """
+        self.fields = results.get('fields', self.fields)
+        items = sorted((item for item in results.get('items') or ()
+                        if last is None or item[0] > last), key=lambda item: item[0])
+        if len(items) > 1:
+            self._resolution = items[-1][0] - items[-2][0]
+        self._points.extend(items)
+        if self._points.maxlen is not None:
+            items = items[-self._points.maxlen:]
+        return self._format(items)
+
+    def _format(self, items):
+        if self.fields is None:
+            # Nothing was fetched yet, and formatters expect fields.
+            return {'fields': None, 'items': items}
+        return self._api._format({'fields': self.fields, 'items': items})
+
+    def _window(self, now, last):
+        if last is None:
+            return series.WINDOWS[-1][0]
+        elapsed = now - last
+        for name, size in reversed(series.WINDOWS):
+            if size >= elapsed:
+                return name
+        return series.WINDOWS[0][0]
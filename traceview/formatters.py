@@ -8,15 +8,107 @@ This module contains functions used to format TraceView API results.
 """
 
 from collections import namedtuple
+import threading
+
+from .columnar import Columns
+from .matrix import LayerMatrix
+from .stream import TimeseriesStream
+
+
+class RecordRegistry(object):
+    """ The :class:`RecordRegistry <RecordRegistry>` object.
+
+    Creates :class:`namedtuple` record types once per class name and fields,
+    and reuses them afterwards. Records formatted from different responses
+    with the same fields are therefore of the same type. Record types are
+    tuples with empty ``__slots__``, so records hold no per instance dict.
+
+    """
+
+    def __init__(self):
+        self._types = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._types)
+
+    def get(self, class_name, fields):
+        """ Returns the record type for a class name and fields.
+
+        :param str class_name: The name of the record type.
+        :param fields: The field names, as a list or a comma separated string.
+
+        """
+        if not isinstance(fields, (list, tuple)):
+            fields = fields.replace(',', ' ').split()
+        key = (class_name, tuple(fields))
+        record_type = self._types.get(key)
+        if record_type is None:
+            with self._lock:
+                record_type = self._types.get(key)
+                if record_type is None:
+                    record_type = self._types[key] = namedtuple(class_name, key[1])
+        return record_type
+
+
+#: Record types shared by :func:`tuplify`.
+record_types = RecordRegistry()
 
 
 def identity(results):
     return results
 
 
+def columnar(results):
+    """ Formats timeseries API results into :class:`Columns <traceview.columnar.Columns>`,
+    which hold one contiguous array per field instead of one object per
+    point. Results that aren't timeseries data are returned unchanged.
+
+    :param results: TraceView API results.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.formatters import columnar
+      >>> tv = traceview.TraceView('API KEY HERE', columnar)
+      >>> series = tv.server.latency_series('APP NAME HERE')
+      >>> len(series), series.mean('avg_latency', weights='volume')
+      (120, 226074.07407407407)
+
+    """
+    if isinstance(results, TimeseriesStream) or \
+            (hasattr(results, 'keys') and 'fields' in results and 'items' in results):
+        return Columns.from_results(results)
+    return results
+
+
+def layer_matrix(results):
+    """ Formats latency by layer API results into a :class:`LayerMatrix
+    <traceview.matrix.LayerMatrix>`, a dense layer by timestamp matrix per
+    field. Other results are returned unchanged.
+
+    :param results: TraceView API results.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.formatters import layer_matrix
+      >>> tv = traceview.TraceView('API KEY HERE', layer_matrix)
+      >>> matrix = tv.server.latency_by_layer('APP NAME HERE')
+      >>> matrix.shape
+      (3, 120)
+
+    """
+    if isinstance(results, list) and results and \
+            all(hasattr(layer, 'keys') and 'layer' in layer and 'timeseries' in layer for layer in results):
+        return LayerMatrix.from_results(results)
+    return results
+
+
 def tuplify(results, class_name='Result'):
     """ Formats API results into :class:`namedtuple` objects. Supports
     tuplifying results that are either timeseries data or objects (dicts).
+    Streamed timeseries results are tuplified lazily, as a generator.
 
     :param results: TraceView API results.
     :param str class_name: (optional) Prefix string for name of the namedtuple.
@@ -30,6 +122,9 @@ def tuplify(results, class_name='Result'):
       ResultTuple(reqs_per_time_period=u'19.53/sec', total_requests=70293.0)
 
     """
+    # is streamed timeseries data?
+    if isinstance(results, TimeseriesStream):
+        return _tuplify_stream(results, class_name)
     # is timeseries data?
     if 'fields' in results and 'items' in results:
         return _tuplify_timeseries(results, class_name)
@@ -41,11 +136,18 @@ def tuplify(results, class_name='Result'):
 
 def _tuplify_timeseries(results, class_name):
     tuple_name = '{name}Tuple'.format(name=class_name)
-    nt = namedtuple(tuple_name, results['fields'])
-    return [nt(*item) for item in results['items']]
+    nt = record_types.get(tuple_name, results['fields'])
+    return [nt._make(item) for item in results['items']]
+
+
+def _tuplify_stream(results, class_name):
+    tuple_name = '{name}Tuple'.format(name=class_name)
+    nt = record_types.get(tuple_name, results.fields)
+    return (nt._make(item) for item in results)
 
 
 def _tuplify_dict(results, class_name):
     tuple_name = '{name}Tuple'.format(name=class_name)
-    nt = namedtuple(tuple_name, results.keys())
+    # Sorted, so that the field order doesn't depend on the response.
+    nt = record_types.get(tuple_name, sorted(results.keys()))
     return nt(**results)
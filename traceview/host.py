@@ -25,6 +25,11 @@ class Host(Resource):
         path = 'hosts/{host_id}'.format(host_id=host_id)
         return self.api.delete(path)
 
+    def delete_many(self, host_ids, concurrency=8, dry_run=False):
+        from .batch import bulk
+
+        return bulk(self.delete, host_ids, concurrency=concurrency, dry_run=dry_run)
+
 
 class Instrumentation(Resource):
 
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.instrument
+
+This module contains per-request instrumentation hooks for :class:`Api
+<traceview.api.Api>`, and an in-memory aggregator of request metrics.
+
+"""
+
+from bisect import bisect_left
+import threading
+import time
+
+
+#: Clock used to time requests.
+clock = getattr(time, 'perf_counter', time.time)
+
+#: Phases of a request, in order.
+PHASES = ('connect', 'transfer', 'decode', 'format')
+
+#: Upper bounds, in seconds, of the latency histogram buckets. Requests
+#: slower than the last bound are counted in an extra bucket.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Paths whose second segment is a name or id, by first segment.
+_PARAMETERS = {
+    'app': '{app}',
+    'errors': '{app}',
+    'latency': '{app}',
+    'layers': '{app}',
+    'total_requests': '{app}',
+    'hosts': '{host_id}',
+}
+
+
+def path_template(path):
+    """ Returns the endpoint of a path, with app names and host ids
+    replaced by placeholders, e.g. ``'latency/{app}/server/series'``.
+
+    :param str path: The HTTP path of a request.
+
+    """
+    segments = path.split('/')
+    if len(segments) > 1 and segments[0] in _PARAMETERS:
+        segments[1] = _PARAMETERS[segments[0]]
+    return '/'.join(segments)
+
+
+class RequestEvent(object):
+    """ The :class:`RequestEvent <RequestEvent>` object.
+
+    Describes one API call, from :meth:`Instrument.request_started` to
+    :meth:`Instrument.request_finished`.
+
+    The ``timings`` dictionary holds the seconds spent in each phase:
+    ``connect`` until the response headers are received (which includes the
+    time taken by the API), ``transfer`` reading the response body, ``decode``
+    parsing its JSON and ``format`` in the result formatter. Retried requests
+    add up the time of every attempt. Streamed responses are transferred and
+    decoded after the call returns, so only ``connect`` is timed for them.
+
+    """
+
+    def __init__(self, method, path):
+        self.method = method.upper()
+        self.path = path
+        self.template = path_template(path)
+        #: HTTP status of the last response, ``None`` if no response was received.
+        self.status = None
+        #: Size, in bytes, of the response bodies, decompressed.
+        self.bytes = 0
+        #: Size, in bytes, of the response bodies as received.
+        self.wire_bytes = 0
+        #: Number of HTTP requests sent, including retries.
+        self.attempts = 0
+        #: Whether the results were served by the response cache.
+        self.cached = False
+        #: Whether the results were shared by an identical request in flight.
+        self.coalesced = False
+        #: Exception raised by the call, if it failed.
+        self.error = None
+        self.timings = dict((phase, 0.0) for phase in PHASES)
+        self.started = clock()
+        #: Total seconds taken by the call.
+        self.duration = None
+
+    def __repr__(self):
+        return '<RequestEvent %s %s %s %.1fms>' % (
+            self.method, self.path, self.status, (self.duration or 0.0) * 1000)
+
+    def finish(self, error=None):
+        self.error = error
+        self.duration = clock() - self.started
+
+
+class Instrument(object):
+    """ The :class:`Instrument <Instrument>` object.
+
+    Base class of the objects passed as ``instruments`` to :class:`Api
+    <traceview.api.Api>`, whose hooks are called around each API call.
+    Hooks are called on the thread making the call, so they should be quick
+    and thread safe.
+
+    """
+
+    def request_started(self, event):
+        """ Called before a request is sent.
+
+        :param event: The :class:`RequestEvent` of the call.
+
+        """
+
+    def request_finished(self, event):
+        """ Called once a call returned or failed, with its timings.
+
+        :param event: The :class:`RequestEvent` of the call.
+
+        """
+
+
+class EndpointMetrics(object):
+    """ The :class:`EndpointMetrics <EndpointMetrics>` object.
+
+    Request metrics of one endpoint, i.e. an HTTP method and path template.
+
+    """
+
+    def __init__(self, method, template):
+        self.method = method
+        self.template = template
+        self.count = 0
+        self.errors = 0
+        self.cached = 0
+        self.coalesced = 0
+        self.attempts = 0
+        self.bytes = 0
+        self.wire_bytes = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.statuses = {}
+        self.timings = dict((phase, 0.0) for phase in PHASES)
+        #: Number of calls per :data:`BUCKETS` latency bucket, plus one for slower calls.
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, event):
+        self.count += 1
+        self.errors += event.error is not None
+        self.cached += event.cached
+        self.coalesced += event.coalesced
+        self.attempts += event.attempts
+        self.bytes += event.bytes
+        self.wire_bytes += event.wire_bytes
+        self.total += event.duration
+        self.max = max(self.max, event.duration)
+        if event.status is not None:
+            self.statuses[event.status] = self.statuses.get(event.status, 0) + 1
+        for phase, seconds in event.timings.items():
+            self.timings[phase] += seconds
+        self.histogram[bisect_left(BUCKETS, event.duration)] += 1
+
+    def mean(self):
+        """ Returns the mean latency, in seconds. """
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """ Returns the upper bound of the histogram bucket of a latency
+        quantile, in seconds. Quantiles in the last bucket return the
+        maximum latency.
+
+        :param float q: The quantile, between 0 and 1, e.g. ``0.99``.
+
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """ Returns the metrics as a dict of JSON serializable values. """
+        return {
+            'method': self.method,
+            'template': self.template,
+            'count': self.count,
+            'errors': self.errors,
+            'cached': self.cached,
+            'coalesced': self.coalesced,
+            'attempts': self.attempts,
+            'bytes': self.bytes,
+            'wire_bytes': self.wire_bytes,
+            'total': self.total,
+            'mean': self.mean(),
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'statuses': dict((str(status), count) for status, count in self.statuses.items()),
+            'timings': dict(self.timings),
+            'histogram': list(zip(BUCKETS + (None,), self.histogram)),
+        }
+
+
+class MetricsAggregator(Instrument):
+    """ The :class:`MetricsAggregator <MetricsAggregator>` object.
+
+    An :class:`Instrument` that keeps :class:`EndpointMetrics` per endpoint
+    in memory: call counts, errors, statuses, bytes, time per phase and a
+    latency histogram.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.instrument import MetricsAggregator
+      >>> metrics = MetricsAggregator()
+      >>> tv = traceview.TraceView('API KEY HERE', instruments=[metrics])
+      >>> for app in tv.apps():
+      ...     tv.server.latency_series(app)
+      >>> metrics.endpoint('get', 'latency/{app}/server/series').quantile(0.9)
+      0.25
+      >>> print(metrics.report())
+      GET latency/{app}/server/series    12 calls  0 errors  mean 183.2ms  p50 250.0ms  p99 412.7ms  ...
+
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._endpoints)
+
+    def request_finished(self, event):
+        key = (event.method, event.template)
+        with self._lock:
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = EndpointMetrics(*key)
+            metrics.add(event)
+
+    def endpoint(self, method, template):
+        """ Returns the metrics of an endpoint, or ``None`` if it wasn't called.
+
+        :param str method: The HTTP method, e.g. ``'get'``.
+        :param str template: The path template, see :func:`path_template`.
+
+        """
+        return self._endpoints.get((method.upper(), template))
+
+    def endpoints(self):
+        """ Returns the metrics of every endpoint, slowest in total first. """
+        with self._lock:
+            return sorted(self._endpoints.values(), key=lambda metrics: -metrics.total)
+
+    def snapshot(self):
+        """ Returns the metrics of every endpoint as JSON serializable dicts,
+        keyed by ``'METHOD template'``.
+
+        """
+        with self._lock:
+            return dict(('%s %s' % key, metrics.to_dict()) for key, metrics in self._endpoints.items())
+
+    def reset(self):
+        """ Discards all the metrics. """
+        with self._lock:
+            self._endpoints = {}
+
+    def report(self):
+        """ Returns a one line summary per endpoint, slowest in total first. """
+        lines = []
+        for metrics in self.endpoints():
+            phases = '  '.join('%s %.1fms' % (phase, metrics.timings[phase] / metrics.count * 1000)
+                               for phase in PHASES)
+            lines.append('%s %s  %d calls  %d errors  mean %.1fms  p50 %.1fms  p99 %.1fms  %d/%d bytes  %s' % (
+                metrics.method, metrics.template, metrics.count, metrics.errors,
+                metrics.mean() * 1000, metrics.quantile(0.5) * 1000, metrics.quantile(0.99) * 1000,
+                metrics.wire_bytes, metrics.bytes, phases))
+        return '\n'.join(lines)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.inventory
+
+This module contains an indexed, refreshable inventory of TraceView hosts.
+
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+import logging
+import threading
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class HostDiff(namedtuple('HostDiff', 'added removed changed')):
+    """ The hosts added, removed and changed by a refresh, as lists of host
+    dicts. Removed hosts are given as they were before the refresh.
+
+    """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    __nonzero__ = __bool__
+
+
+class HostInventory(object):
+    """ The :class:`HostInventory <HostInventory>` object.
+
+    Keeps the hosts of an organization indexed by id, name and app, with
+    sorted indexes on ``last_heartbeat`` and ``last_trace`` for range
+    queries. :meth:`refresh` applies only the differences with the previous
+    host list to the indexes, and :meth:`start` refreshes in the background.
+    Hosts are the dicts returned by the API.
+
+    :param api: The :class:`Api <traceview.api.Api>` used to fetch the hosts.
+    :param bool apps: (optional) Index hosts by app, which takes one request per app on every refresh.
+    :param int concurrency: (optional) Maximum number of app requests in flight.
+
+    Usage::
+
+      >>> import traceview
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> inventory = tv.host_inventory()
+      >>> inventory.by_name('ip-127-0-0-1')
+      {u'last_trace': None, u'last_heartbeat': 1429033545, u'first_heartbeat': 1428060977, u'name': u'ip-127-0-0-1', u'id': 12345}
+      >>> [host['id'] for host in inventory.stale(15 * 60)]
+      [12345, 12346]
+      >>> inventory.start(interval=60, on_change=print)
+
+    """
+
+    def __init__(self, api, apps=True, concurrency=8):
+        self.apps = apps
+        self.concurrency = concurrency
+        #: Time of the last successful refresh.
+        self.refreshed = None
+        #: Exception raised by the last background refresh, if it failed.
+        self.last_error = None
+
+        self._api = api
+        self._hosts = {}
+        self._apps_of = {}
+        self._by_name = {}
+        self._by_app = {}
+        self._heartbeats = []
+        self._traces = []
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._hosts.values()))
+
+    def __contains__(self, host_id):
+        return host_id in self._hosts
+
+    def get(self, host_id, default=None):
+        """ Returns the host with an id. """
+        return self._hosts.get(host_id, default)
+
+    def by_name(self, name, default=None):
+        """ Returns the host with a name. """
+        with self._lock:
+            host_id = self._by_name.get(name)
+            return default if host_id is None else self._hosts[host_id]
+
+    def by_app(self, app):
+        """ Returns the hosts of an app. Requires ``apps`` indexing. """
+        with self._lock:
+            return [self._hosts[host_id] for host_id in sorted(self._by_app.get(app, ()))]
+
+    def apps_of(self, host_id):
+        """ Returns the names of the apps of a host. Requires ``apps`` indexing. """
+        return sorted(self._apps_of.get(host_id, ()))
+
+    def heartbeat_between(self, start=None, end=None):
+        """ Returns the hosts whose last heartbeat is in a time range,
+        oldest first. Hosts that never sent a heartbeat are left out.
+
+        :param float start: (optional) The start of the range, in seconds since the epoch.
+        :param float end: (optional) The end of the range, in seconds since the epoch.
+
+        """
+        return self._between(self._heartbeats, start, end)
+
+    def traced_between(self, start=None, end=None):
+        """ Returns the hosts whose last trace is in a time range, oldest
+        first. Hosts that were never traced are left out.
+
+        :param float start: (optional) The start of the range, in seconds since the epoch.
+        :param float end: (optional) The end of the range, in seconds since the epoch.
+
+        """
+        return self._between(self._traces, start, end)
+
+    def stale(self, seconds, now=None):
+        """ Returns the hosts without a heartbeat for ``seconds``, including
+        hosts that never sent one.
+
+        :param float seconds: Maximum age of the last heartbeat.
+        :param float now: (optional) The current time, in seconds since the epoch.
+
+        """
+        cutoff = (time.time() if now is None else now) - seconds
+        with self._lock:
+            never = [host for host in self._hosts.values() if host.get('last_heartbeat') is None]
+            index = bisect_left(self._heartbeats, (cutoff,))
+            return never + [self._hosts[host_id] for _, host_id in self._heartbeats[:index]]
+
+    def refresh(self):
+        """ Fetches the hosts and updates the indexes with the differences.
+
+        :return: the hosts added, removed and changed since the last refresh
+        :rtype: :class:`HostDiff`
+
+        """
+        hosts = dict((host['id'], host) for host in self._api._get_unformatted('hosts', {}))
+        apps_of = self._fetch_apps() if self.apps else {}
+
+        added, removed, changed = [], [], []
+        with self._lock:
+            for host_id, host in list(self._hosts.items()):
+                if host_id not in hosts:
+                    removed.append(host)
+                    self._unindex(host)
+            for host_id, host in hosts.items():
+                old = self._hosts.get(host_id)
+                apps = apps_of.get(host_id, set())
+                if old is None:
+                    added.append(host)
+                elif old != host or self._apps_of.get(host_id, set()) != apps:
+                    changed.append(host)
+                    self._unindex(old)
+                else:
+                    continue
+                self._index(host, apps)
+            self.refreshed = time.time()
+        return HostDiff(added, removed, changed)
+
+    def start(self, interval=60, on_change=None):
+        """ Refreshes the inventory every ``interval`` seconds in a
+        background thread.
+
+        :param float interval: (optional) Seconds between refreshes.
+        :param on_change: (optional) Function called with the :class:`HostDiff` of refreshes that changed the hosts.
+
+        """
+        if self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._run, args=(interval, on_change),
+                                        name='traceview-inventory')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def stop(self):
+        """ Stops the background refreshes. """
+        self._stopped.set()
+        worker, self._worker = self._worker, None
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+
+    def _run(self, interval, on_change):
+        while not self._stopped.wait(interval):
+            try:
+                diff = self.refresh()
+            except Exception as e:
+                log.warning("Host inventory refresh failed: %s" % (e,))
+                self.last_error = e
+                continue
+            self.last_error = None
+            if diff and on_change is not None:
+                on_change(diff)
+
+    def _fetch_apps(self):
+        from .batch import run
+
+        apps = self._api._get_unformatted('apps', {})
+        results = run([(self._api._get_unformatted, ('app/{app}/hosts'.format(app=app), {}))
+                       for app in apps], concurrency=self.concurrency)
+        apps_of = {}
+        for app, hosts in zip(apps, results):
+            if isinstance(hosts, Exception):
+                raise hosts
+            for host in hosts:
+                apps_of.setdefault(host['id'], set()).add(app)
+        return apps_of
+
+    def _between(self, index, start, end):
+        with self._lock:
+            low = 0 if start is None else bisect_left(index, (start,))
+            high = len(index) if end is None else bisect_right(index, (end, _MAX))
+            return [self._hosts[host_id] for _, host_id in index[low:high]]
+
+    def _index(self, host, apps):
+        host_id = host['id']
+        self._hosts[host_id] = host
+        self._by_name[host.get('name')] = host_id
+        self._apps_of[host_id] = apps
+        for app in apps:
+            self._by_app.setdefault(app, set()).add(host_id)
+        for field, index in (('last_heartbeat', self._heartbeats), ('last_trace', self._traces)):
+            if host.get(field) is not None:
+                insort(index, (host[field], host_id))
+
+    def _unindex(self, host):
+        host_id = host['id']
+        del self._hosts[host_id]
+        if self._by_name.get(host.get('name')) == host_id:
+            del self._by_name[host.get('name')]
+        for app in self._apps_of.pop(host_id, ()):
+            self._by_app[app].discard(host_id)
+            if not self._by_app[app]:
+                del self._by_app[app]
+        for field, index in (('last_heartbeat', self._heartbeats), ('last_trace', self._traces)):
+            if host.get(field) is not None:
+                position = bisect_left(index, (host[field], host_id))
+                del index[position]
+
+
+class _Max(object):
+    """ Compares greater than any host id, to include every host of the
+    last timestamp of a range.
+
+    """
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, _Max)
+
+    __hash__ = object.__hash__
+
+
+_MAX = _Max()
@@ -32,6 +32,7 @@ class Server(Resource):
         :param str layer: (optional) The application layer to filter on.
         :param str controller: (optional) The controller to filter on.
         :param str action: (optional) The action to filter on.
+        :param bool stream: (optional) Decode the timeseries while it is read. See :class:`TimeseriesStream <traceview.stream.TimeseriesStream>`.
         :return: timeseries data of the application latency and volume
         :rtype: dict
 
@@ -46,6 +47,58 @@ class Server(Resource):
         path = 'latency/{app}/server/series'.format(app=app)
         return self.api.get(path, *args, **kwargs)
 
+    def latency_series_range(self, app, start, end, *args, **kwargs):
+        """ Get a timeseries line of the applications latency and volume over
+        an arbitrary time range.
+
+        The range is fetched concurrently as time windows of a single size,
+        which are stitched into a single timeseries, see :meth:`Api.get_range
+        <traceview.api.Api.get_range>`. Takes the same
+        filters as :meth:`latency_series`.
+
+        :param str app: The app name.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :param int concurrency: (optional) Maximum number of requests in flight.
+        :return: timeseries data of the application latency and volume
+        :rtype: dict
+
+        Usage::
+
+          >>> import time
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> now = time.time()
+          >>> tv.server.latency_series_range('Default', now - 90 * 86400, now)
+          {u'fields': u'timestamp,volume,avg_latency', u'items': [[1391313120.0, 27.0, 226074.07407407407], ...]}
+
+        """
+        path = 'latency/{app}/server/series'.format(app=app)
+        return self.api.get_range(path, start, end, *args, **kwargs)
+
+    def latency_follower(self, app, size=120, **kwargs):
+        """ Follow a timeseries line of the applications latency and volume.
+
+        Each poll of the follower only returns the points that are new since
+        the previous one. Takes the same filters as :meth:`latency_series`.
+
+        :param str app: The app name.
+        :param int size: (optional) Number of points kept by the follower.
+        :return: a follower of the latency and volume timeseries
+        :rtype: :class:`Follower <traceview.follow.Follower>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> follower = tv.server.latency_follower('Default')
+          >>> for series in follower.follow(interval=30):
+          ...     print(series['items'])
+
+        """
+        path = 'latency/{app}/server/series'.format(app=app)
+        return self.api.follower(path, size=size, params=kwargs)
+
     def latency_summary(self, app, *args, **kwargs):
         """ Get a summary of the latency and volume traced.
 
@@ -125,6 +178,7 @@ class Client(Resource):
         :param str action: (optional) The action to filter on.
         :param str browser: (optional) The browser to filter on.
         :param str region: (optional) The region to filter on.
+        :param bool stream: (optional) Decode the timeseries while it is read. See :class:`TimeseriesStream <traceview.stream.TimeseriesStream>`.
         :return: timeseries data of the application latency and volume
         :rtype: dict
 
@@ -139,6 +193,58 @@ class Client(Resource):
         path = 'latency/{app}/client/series'.format(app=app)
         return self.api.get(path, *args, **kwargs)
 
+    def latency_series_range(self, app, start, end, *args, **kwargs):
+        """ Get a timeseries line of the applications latency and volume over
+        an arbitrary time range.
+
+        The range is fetched concurrently as time windows of a single size,
+        which are stitched into a single timeseries, see :meth:`Api.get_range
+        <traceview.api.Api.get_range>`. Takes the same
+        filters as :meth:`latency_series`.
+
+        :param str app: The app name.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :param int concurrency: (optional) Maximum number of requests in flight.
+        :return: timeseries data of the application latency and volume
+        :rtype: dict
+
+        Usage::
+
+          >>> import time
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> now = time.time()
+          >>> tv.client.latency_series_range('Default', now - 90 * 86400, now)
+          {u'fields': u'timestamp,volume,avg_latency', u'items': [[1391313120.0, 27.0, 226074.07407407407], ...]}
+
+        """
+        path = 'latency/{app}/client/series'.format(app=app)
+        return self.api.get_range(path, start, end, *args, **kwargs)
+
+    def latency_follower(self, app, size=120, **kwargs):
+        """ Follow a timeseries line of the applications latency and volume.
+
+        Each poll of the follower only returns the points that are new since
+        the previous one. Takes the same filters as :meth:`latency_series`.
+
+        :param str app: The app name.
+        :param int size: (optional) Number of points kept by the follower.
+        :return: a follower of the latency and volume timeseries
+        :rtype: :class:`Follower <traceview.follow.Follower>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> follower = tv.client.latency_follower('Default')
+          >>> for series in follower.follow(interval=30):
+          ...     print(series['items'])
+
+        """
+        path = 'latency/{app}/client/series'.format(app=app)
+        return self.api.follower(path, size=size, params=kwargs)
+
     def latency_summary(self, app, *args, **kwargs):
         """ Get a summary of the latency and volume traced.
 
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.matrix
+
+This module contains a dense layer by time matrix for the results of
+:meth:`Server.latency_by_layer <traceview.latency.Server.latency_by_layer>`.
+
+"""
+
+from array import array
+from bisect import bisect_left
+import math
+
+from .columnar import NAN
+
+
+class LayerMatrix(object):
+    """ The :class:`LayerMatrix <LayerMatrix>` object.
+
+    Latency by layer results pivoted into one dense, row-major matrix of
+    doubles per field, with a row per layer and a column per timestamp.
+    Timestamps are aligned across layers; a layer without a point at a
+    timestamp, or with a ``None`` value, holds NaN.
+
+    :param layers: The layer names, in row order.
+    :param timestamps: The sorted timestamps, in column order.
+    :param dict data: One :class:`array.array` of ``len(layers) * len(timestamps)`` doubles per field.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.formatters import layer_matrix
+      >>> tv = traceview.TraceView('API KEY HERE', layer_matrix)
+      >>> matrix = tv.server.latency_by_layer('Default', time_window='day')
+      >>> matrix.layers
+      ('PHP', 'mysql', 'memcache')
+      >>> matrix.share()
+      {'PHP': 0.61, 'mysql': 0.33, 'memcache': 0.06}
+      >>> matrix.row('mysql', 'avg_latency')[:3]
+      array('d', [4513.0, nan, 3920.5])
+
+    """
+
+    def __init__(self, layers, timestamps, data):
+        self.layers = tuple(layers)
+        self.timestamps = timestamps
+        self.fields = tuple(data)
+        self.index = dict((layer, row) for row, layer in enumerate(self.layers))
+        self._data = data
+
+    @classmethod
+    def from_results(cls, results):
+        """ Builds the matrix from latency by layer results.
+
+        :param list results: ``{'layer': ..., 'timeseries': {'fields': ..., 'items': ...}}`` dicts.
+
+        """
+        layers = [layer['layer'] for layer in results]
+        series = [layer['timeseries'] for layer in results]
+        fields = None
+        for timeseries in series:
+            if timeseries.get('fields'):
+                fields = timeseries['fields']
+                fields = fields.split(',') if not isinstance(fields, (list, tuple)) else list(fields)
+                break
+        if fields is None:
+            return cls(layers, array('d'), {})
+
+        timestamps = set()
+        for timeseries in series:
+            timestamps.update(item[0] for item in timeseries.get('items') or ())
+        timestamps = array('d', sorted(timestamps))
+        columns = dict((timestamp, column) for column, timestamp in enumerate(timestamps))
+
+        width = len(timestamps)
+        data = dict((field, array('d', [NAN]) * (len(layers) * width)) for field in fields[1:])
+        targets = [data[field] for field in fields[1:]]
+        for row, timeseries in enumerate(series):
+            offset = row * width
+            for item in timeseries.get('items') or ():
+                position = offset + columns[item[0]]
+                for target, value in zip(targets, item[1:]):
+                    if value is not None:
+                        target[position] = value
+        return cls(layers, timestamps, data)
+
+    def __len__(self):
+        return len(self.layers)
+
+    @property
+    def shape(self):
+        """ The ``(layers, timestamps)`` dimensions of the matrix. """
+        return len(self.layers), len(self.timestamps)
+
+    def row(self, layer, field):
+        """ Returns the values of a layer over time.
+
+        :param str layer: The layer name.
+        :param str field: The field name, e.g. ``'avg_latency'``.
+
+        """
+        width = len(self.timestamps)
+        start = self.index[layer] * width
+        return self._data[field][start:start + width]
+
+    def column(self, timestamp, field):
+        """ Returns the values of every layer at a timestamp, in layer order.
+
+        :param float timestamp: The timestamp.
+        :param str field: The field name, e.g. ``'volume'``.
+
+        """
+        width = len(self.timestamps)
+        column = self._column(timestamp)
+        return self._data[field][column::width]
+
+    def time_spent(self, latency='avg_latency', volume='volume'):
+        """ Returns the total time spent in each layer, i.e. the sum of its
+        latency times volume. Points missing either value are left out.
+
+        :rtype: dict
+
+        """
+        width = len(self.timestamps)
+        latencies, volumes = self._data[latency], self._data[volume]
+        spent = {}
+        for layer, row in self.index.items():
+            start = row * width
+            spent[layer] = math.fsum(
+                value * weight
+                for value, weight in zip(latencies[start:start + width], volumes[start:start + width])
+                if value == value and weight == weight)
+        return spent
+
+    def share(self, latency='avg_latency', volume='volume'):
+        """ Returns the share of the total time spent in each layer.
+
+        :rtype: dict
+
+        """
+        spent = self.time_spent(latency, volume)
+        total = math.fsum(spent.values())
+        return dict((layer, value / total if total else 0.0) for layer, value in spent.items())
+
+    def shares(self, latency='avg_latency', volume='volume'):
+        """ Returns the share of the time spent in each layer at each
+        timestamp, as a matrix with a single ``'share'`` field.
+
+        :rtype: :class:`LayerMatrix`
+
+        """
+        spent = array('d', (value * weight if value == value and weight == weight else 0.0
+                            for value, weight in zip(self._data[latency], self._data[volume])))
+        width = len(self.timestamps)
+        totals = [math.fsum(spent[column::width]) for column in range(width)]
+        share = array('d', (value / totals[position % width] if totals[position % width] else NAN
+                            for position, value in enumerate(spent)))
+        return LayerMatrix(self.layers, self.timestamps, {'share': share})
+
+    def to_numpy(self, field):
+        """ Returns the matrix of a field as a ``(layers, timestamps)`` NumPy
+        array, without copying it. Requires NumPy.
+
+        :param str field: The field name.
+
+        """
+        import numpy
+
+        return numpy.frombuffer(self._data[field], dtype=numpy.float64).reshape(self.shape)
+
+    def _column(self, timestamp):
+        column = bisect_left(self.timestamps, timestamp)
+        if column == len(self.timestamps) or self.timestamps[column] != timestamp:
+            raise KeyError(timestamp)
+        return column
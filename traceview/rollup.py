@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.rollup
+
+This module downsamples TraceView API timeseries results into larger,
+aligned time buckets.
+
+"""
+
+from itertools import islice
+import math
+
+from .columnar import Columns, ColumnsBuilder
+
+
+SUM = 'sum'
+COUNT = 'count'
+MEAN = 'mean'
+MIN = 'min'
+MAX = 'max'
+
+#: Aggregations of the fields returned by the series endpoints. Other fields are averaged.
+DEFAULT_AGGREGATIONS = {
+    'volume': SUM,
+    'total_requests': SUM,
+    'avg_latency': (MEAN, 'volume'),
+}
+
+# Per bucket and field: present values, sum of (weighted) values, sum of weights, min, max.
+_COUNT, _TOTAL, _WEIGHT, _MIN, _MAX = range(5)
+
+
+class Rollup(object):
+    """ The :class:`Rollup <Rollup>` object.
+
+    Aggregates timeseries points into buckets of ``interval`` seconds, a
+    chunk of points at a time, so ranges of any length are rolled up in
+    bounded memory. Chunks are aggregated as array operations with NumPy when
+    it is installed, and in pure Python otherwise. Missing (``None``) values
+    are left out of every aggregation.
+
+    :param fields: The field names, as a list or a comma separated string. The first field is the timestamp.
+    :param float interval: Size of the buckets, in seconds.
+    :param dict aggregations: (optional) Aggregation per field: ``'sum'``, ``'count'``, ``'mean'``, ``'min'``, ``'max'``, or ``('mean', weights field)`` for a weighted mean. Defaults to :data:`DEFAULT_AGGREGATIONS`.
+    :param float offset: (optional) Alignment of the buckets, in seconds after the epoch.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.rollup import Rollup
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> rollup = Rollup('timestamp,volume,avg_latency', 300)
+      >>> for window in ('hour', 'day'):
+      ...     rollup.add(tv.server.latency_series('Default', time_window=window)['items'])
+      >>> rollup.results()
+      {'fields': 'timestamp,volume,avg_latency', 'items': [[1399089000.0, 212.0, 231866.5], ...]}
+
+    """
+
+    def __init__(self, fields, interval, aggregations=None, offset=0):
+        if not isinstance(fields, (list, tuple)):
+            fields = fields.split(',')
+        self.fields = tuple(fields)
+        self.interval = float(interval)
+        self.offset = float(offset)
+
+        aggregations = dict(DEFAULT_AGGREGATIONS, **(aggregations or {}))
+        self._specs = []
+        for field in self.fields[1:]:
+            aggregation = aggregations.get(field, MEAN)
+            weights = None
+            if isinstance(aggregation, tuple):
+                aggregation, weights = aggregation
+                if weights not in self.fields:
+                    weights = None
+            if aggregation not in (SUM, COUNT, MEAN, MIN, MAX):
+                raise ValueError("Unknown aggregation {0!r} for {1}".format(aggregation, field))
+            self._specs.append((field, aggregation, weights))
+        self._buckets = {}
+
+    def bucket(self, timestamp):
+        """ Returns the start of the bucket of a timestamp. """
+        return math.floor((timestamp - self.offset) / self.interval) * self.interval + self.offset
+
+    def add(self, items):
+        """ Aggregates a chunk of points.
+
+        :param items: Timeseries items, or :class:`Columns <traceview.columnar.Columns>` with the same fields.
+
+        """
+        if not isinstance(items, Columns):
+            builder = ColumnsBuilder(self.fields)
+            builder.extend(items)
+            items = builder.build()
+        if not len(items):
+            return
+        numpy = _numpy()
+        if numpy is not None:
+            self._add_arrays(numpy, items)
+        else:
+            self._add_points(items)
+
+    def results(self):
+        """ Returns the buckets as timeseries results, sorted by timestamp.
+
+        :rtype: dict
+
+        """
+        items = []
+        for bucket in sorted(self._buckets):
+            states = self._buckets[bucket]
+            items.append([bucket] + [_finish(aggregation, weights, state)
+                                     for (_, aggregation, weights), state in zip(self._specs, states)])
+        return {'fields': ','.join(self.fields), 'items': items}
+
+    def _states(self, bucket):
+        states = self._buckets.get(bucket)
+        if states is None:
+            states = self._buckets[bucket] = [[0, 0.0, 0.0, None, None] for _ in self._specs]
+        return states
+
+    def _add_points(self, columns):
+        buckets = [self.bucket(timestamp) for timestamp in columns[self.fields[0]]]
+        states = dict((bucket, self._states(bucket)) for bucket in set(buckets))
+        for index, (field, aggregation, weights) in enumerate(self._specs):
+            points = zip(buckets, columns[field], columns.mask(field))
+            if weights is not None:
+                points = zip(buckets, columns[field], columns.mask(field),
+                             columns[weights], columns.mask(weights))
+                for bucket, value, valid, weight, weight_valid in points:
+                    if valid:
+                        state = states[bucket][index]
+                        state[_COUNT] += 1
+                        if weight_valid:
+                            state[_TOTAL] += value * weight
+                            state[_WEIGHT] += weight
+            elif aggregation in (MIN, MAX):
+                for bucket, value, valid in points:
+                    if valid:
+                        state = states[bucket][index]
+                        state[_COUNT] += 1
+                        state[_MIN] = value if state[_MIN] is None else min(state[_MIN], value)
+                        state[_MAX] = value if state[_MAX] is None else max(state[_MAX], value)
+            else:
+                for bucket, value, valid in points:
+                    if valid:
+                        state = states[bucket][index]
+                        state[_COUNT] += 1
+                        state[_TOTAL] += value
+
+    def _add_arrays(self, numpy, columns):
+        timestamps = columns.to_numpy(self.fields[0])
+        keys = numpy.floor((timestamps - self.offset) / self.interval) * self.interval + self.offset
+        # Points are sorted by bucket, so every aggregation is a reduceat
+        # over contiguous runs. The sort is nearly free on sorted timestamps.
+        order = numpy.argsort(keys, kind='mergesort')
+        keys = keys[order]
+        starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+        states = [self._states(bucket) for bucket in keys[starts].tolist()]
+
+        for index, (field, _, weights) in enumerate(self._specs):
+            values = columns.to_numpy(field)[order]
+            valid = _valid(numpy, columns, field)[order]
+            counts = numpy.add.reduceat(valid.astype(numpy.int64), starts)
+            present = numpy.where(valid, values, 0.0)
+            if weights is None:
+                totals = numpy.add.reduceat(present, starts)
+                weight_totals = numpy.zeros(len(starts))
+            else:
+                weighted = valid & _valid(numpy, columns, weights)[order]
+                weight_values = numpy.where(weighted, columns.to_numpy(weights)[order], 0.0)
+                totals = numpy.add.reduceat(present * weight_values, starts)
+                weight_totals = numpy.add.reduceat(weight_values, starts)
+            minimums = numpy.minimum.reduceat(numpy.where(valid, values, numpy.inf), starts)
+            maximums = numpy.maximum.reduceat(numpy.where(valid, values, -numpy.inf), starts)
+
+            for bucket_states, count, total, weight, minimum, maximum in zip(
+                    states, counts.tolist(), totals.tolist(), weight_totals.tolist(),
+                    minimums.tolist(), maximums.tolist()):
+                if not count:
+                    continue
+                state = bucket_states[index]
+                state[_COUNT] += count
+                state[_TOTAL] += total
+                state[_WEIGHT] += weight
+                state[_MIN] = minimum if state[_MIN] is None else min(state[_MIN], minimum)
+                state[_MAX] = maximum if state[_MAX] is None else max(state[_MAX], maximum)
+
+
+def rollup(results, interval, aggregations=None, offset=0, chunk_size=4096):
+    """ Downsamples timeseries results into buckets of ``interval`` seconds.
+
+    :param results: Timeseries results: a ``{'fields': ..., 'items': ...}`` dict, a :class:`TimeseriesStream <traceview.stream.TimeseriesStream>` or :class:`Columns <traceview.columnar.Columns>`.
+    :param float interval: Size of the buckets, in seconds.
+    :param dict aggregations: (optional) Aggregation per field. See :class:`Rollup`.
+    :param float offset: (optional) Alignment of the buckets, in seconds after the epoch.
+    :param int chunk_size: (optional) Number of points aggregated at a time.
+    :return: timeseries results, one point per bucket
+    :rtype: dict
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.rollup import rollup
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> rollup(tv.server.latency_series('Default', time_window='day'), 3600)
+      {'fields': 'timestamp,volume,avg_latency', 'items': [[1399003200.0, 2388.0, 241877.2], ...]}
+
+    """
+    if isinstance(results, Columns):
+        summary = Rollup(results.fields, interval, aggregations, offset)
+        for start in range(0, len(results), chunk_size):
+            summary.add(results[start:start + chunk_size])
+        return summary.results()
+
+    if isinstance(results, dict):
+        fields, items = results['fields'], iter(results['items'])
+    else:
+        items = iter(results)
+        fields = results.fields
+    summary = Rollup(fields, interval, aggregations, offset)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            break
+        summary.add(chunk)
+    return summary.results()
+
+
+def _finish(aggregation, weights, state):
+    count = state[_COUNT]
+    if aggregation == COUNT:
+        return count
+    if not count:
+        return None
+    if aggregation == SUM:
+        return state[_TOTAL]
+    if aggregation == MIN:
+        return state[_MIN]
+    if aggregation == MAX:
+        return state[_MAX]
+    if weights is not None:
+        return state[_TOTAL] / state[_WEIGHT] if state[_WEIGHT] else None
+    return state[_TOTAL] / count
+
+
+def _valid(numpy, columns, field):
+    return numpy.frombuffer(columns.mask(field), dtype=numpy.uint8).astype(bool)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.series
+
+This module is responsible for fetching timeseries over arbitrary time ranges,
+by splitting them into the time windows supported by the TraceView API and
+stitching the results back together.
+
+"""
+
+
+#: Time windows supported by the series endpoints, from largest to smallest, in seconds.
+WINDOWS = (
+    ('week', 7 * 24 * 60 * 60),
+    ('day', 24 * 60 * 60),
+    ('hour', 60 * 60),
+)
+
+
+def window(start, end):
+    """ Returns the largest supported time window that fits in a time range,
+    or the smallest one if none fits.
+
+    :param float start: The start of the range, in seconds since the epoch.
+    :param float end: The end of the range, in seconds since the epoch.
+    :rtype: str
+
+    """
+    return next((name for name, size in WINDOWS if size <= end - start), WINDOWS[-1][0])
+
+
+def plan(start, end, time_window=None):
+    """ Splits a time range into consecutive time windows of a single size,
+    so that every point of the range has the same resolution, working
+    backwards from ``end``. The earliest window may start before ``start``.
+
+    :param float start: The start of the range, in seconds since the epoch.
+    :param float end: The end of the range, in seconds since the epoch.
+    :param str time_window: (optional) The time window. Defaults to :func:`window` of the range.
+    :return: ``(time_window, time_end)`` pairs
+    :rtype: list
+
+    """
+    if time_window is None:
+        time_window = window(start, end)
+    size = dict(WINDOWS).get(time_window)
+    if size is None:
+        raise ValueError("Unsupported time window: {0}".format(time_window))
+    windows = []
+    while end > start:
+        windows.append((time_window, end))
+        end -= size
+    return windows
+
+
+def stitch(results, start, end):
+    """ Merges timeseries results into a single timeseries, sorted by
+    timestamp, without duplicate timestamps and limited to a time range.
+
+    :param list results: Timeseries results, as ``{'fields': ..., 'items': ...}`` dicts.
+    :param float start: The start of the range, in seconds since the epoch.
+    :param float end: The end of the range, in seconds since the epoch.
+    :rtype: dict
+
+    """
+    items = {}
+    fields = None
+    for result in results:
+        fields = fields or result.get('fields')
+        for item in result.get('items') or ():
+            if start <= item[0] <= end:
+                items[item[0]] = item
+    return {'fields': fields, 'items': [items[timestamp] for timestamp in sorted(items)]}
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.singleflight
+
+This module is responsible for coalescing identical concurrent requests, so
+that only one of them reaches the TraceView API.
+
+"""
+
+import threading
+
+
+class SingleFlight(object):
+    """ The :class:`SingleFlight <SingleFlight>` object.
+
+    Runs at most one call per key at a time. Threads calling :meth:`do` with
+    a key that is already in flight wait for that call, and share its result
+    or exception. If the call is interrupted, e.g. by ``KeyboardInterrupt``
+    or ``SystemExit`` in its thread, waiting threads make the call again.
+
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """ Calls ``func``, unless a call for ``key`` is already in flight.
+
+        :param key: Hashable key identifying the call.
+        :param func func: The call to make.
+        :return: ``(result, shared)``, where ``shared`` is ``True`` if the result of another thread's call was returned.
+        :rtype: tuple
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if not call.finished:
+                return self.do(key, func)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            call.finished = True
+        except Exception as e:
+            call.error = e
+            call.finished = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        #: Whether the call returned or raised an Exception, rather than
+        #: being interrupted by a BaseException.
+        self.finished = False
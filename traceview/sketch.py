@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.sketch
+
+This module contains mergeable quantile sketches of TraceView API latencies.
+
+"""
+
+import math
+
+
+class QuantileSketch(object):
+    """ The :class:`QuantileSketch <QuantileSketch>` object.
+
+    A DDSketch style quantile sketch: values are counted in logarithmic bins,
+    so every quantile is estimated within ``relative_accuracy`` of the exact
+    value, in memory that only depends on the range of the values. Sketches
+    with the same accuracy are merged by adding up their bins, so partial
+    sketches of apps, layers, hosts or time windows can be computed
+    separately, e.g. by parallel workers, and combined.
+
+    The series endpoints return an average latency per point, so sketches fed
+    by :meth:`add_series` estimate quantiles of those averages, weighted by
+    the volume of each point.
+
+    :param float relative_accuracy: (optional) Maximum relative error of the quantiles.
+    :param int max_bins: (optional) Maximum number of bins. The lowest bins are collapsed beyond it.
+
+    Usage::
+
+      >>> import traceview
+      >>> from traceview.sketch import QuantileSketch
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> sketch = QuantileSketch()
+      >>> for app in tv.apps():
+      ...     sketch.add_series(tv.server.latency_series(app, time_window='week'))
+      >>> sketch.quantile(0.99)
+      1830524.2210405183
+
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.count = 0.0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        # Values below this are counted in the zero bin.
+        self._min_value = 1e-9
+        self._bins = {}
+        self._zero = 0.0
+
+    def __len__(self):
+        return len(self._bins) + (1 if self._zero else 0)
+
+    def __eq__(self, other):
+        return isinstance(other, QuantileSketch) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def add(self, value, weight=1.0):
+        """ Adds a value.
+
+        :param float value: The value, e.g. a latency.
+        :param float weight: (optional) Number of times the value was seen, e.g. the volume.
+
+        """
+        if weight <= 0:
+            return
+        if value > self._min_value:
+            index = int(math.ceil(math.log(value) / self._log_gamma))
+            self._bins[index] = self._bins.get(index, 0.0) + weight
+            if len(self._bins) > self.max_bins:
+                self._collapse()
+        else:
+            self._zero += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def add_series(self, results, field='avg_latency', weights='volume'):
+        """ Adds the points of a timeseries, skipping missing values.
+
+        :param results: Timeseries results: a ``{'fields': ..., 'items': ...}`` dict, a :class:`TimeseriesStream <traceview.stream.TimeseriesStream>` or :class:`Columns <traceview.columnar.Columns>`.
+        :param str field: (optional) Name of the field of the values.
+        :param str weights: (optional) Name of the field to weight the values by. Values are unweighted if ``None`` or missing.
+
+        """
+        if isinstance(results, dict):
+            fields, items = results['fields'], iter(results['items'])
+        else:
+            items = iter(results)
+            fields = results.fields
+        if not isinstance(fields, (list, tuple)):
+            fields = fields.split(',')
+        fields = list(fields)
+
+        position = fields.index(field)
+        if weights in fields:
+            weight_position = fields.index(weights)
+            for item in items:
+                value, weight = item[position], item[weight_position]
+                if value is not None and weight:
+                    self.add(value, weight)
+        else:
+            for item in items:
+                if item[position] is not None:
+                    self.add(item[position])
+
+    @classmethod
+    def by_layer(cls, results, **kwargs):
+        """ Builds one sketch per layer from :meth:`Server.latency_by_layer
+        <traceview.latency.Server.latency_by_layer>` results.
+
+        :param list results: The latency by layer results.
+        :param kwargs: (optional) Arguments of the sketches.
+        :return: sketches by layer name
+        :rtype: dict
+
+        """
+        sketches = {}
+        for layer in results:
+            sketch = sketches.get(layer['layer'])
+            if sketch is None:
+                sketch = sketches[layer['layer']] = cls(**kwargs)
+            sketch.add_series(layer['timeseries'])
+        return sketches
+
+    def merge(self, other):
+        """ Adds the values of another sketch with the same accuracy to this one.
+
+        :param other: A :class:`QuantileSketch`.
+        :return: this sketch
+
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches of different relative accuracies")
+        for index, weight in other._bins.items():
+            self._bins[index] = self._bins.get(index, 0.0) + weight
+        if len(self._bins) > self.max_bins:
+            self._collapse()
+        self._zero += other._zero
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def quantile(self, q):
+        """ Returns the estimated value at a quantile, or ``None`` when the
+        sketch is empty.
+
+        :param float q: The quantile, between 0 and 1, e.g. ``0.99``.
+
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if not self.count:
+            return None
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+
+        rank = q * self.count
+        seen = self._zero
+        if seen >= rank and self._zero:
+            return max(self.min, 0.0)
+        for index in sorted(self._bins):
+            seen += self._bins[index]
+            if seen >= rank:
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        """ Returns the mean of the values, or ``None`` when the sketch is empty. """
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self):
+        """ Returns the sketch as a dict of JSON serializable values. """
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'zero': self._zero,
+            'bins': sorted(self._bins.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Builds a sketch from the output of :meth:`to_dict`. """
+        sketch = cls(data['relative_accuracy'], data['max_bins'])
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch._zero = data['zero']
+        sketch._bins = dict((int(index), weight) for index, weight in data['bins'])
+        return sketch
+
+    def _collapse(self):
+        # Merge the lowest bins, trading accuracy of the low quantiles for the
+        # high ones that latency reports care about.
+        indexes = sorted(self._bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self._bins[target] += self._bins.pop(index)
+
+
+def merge(sketches):
+    """ Merges sketches into a new one.
+
+    :param sketches: :class:`QuantileSketch` objects with the same accuracy, or their :meth:`to_dict <QuantileSketch.to_dict>` output.
+    :rtype: :class:`QuantileSketch`
+
+    Usage::
+
+      >>> from traceview.sketch import merge
+      >>> merge(sketch.to_dict() for sketch in worker_sketches).quantile(0.95)
+      912374.1129813734
+
+    """
+    merged = None
+    for sketch in sketches:
+        if isinstance(sketch, dict):
+            sketch = QuantileSketch.from_dict(sketch)
+        if merged is None:
+            merged = QuantileSketch(sketch.relative_accuracy, sketch.max_bins)
+        merged.merge(sketch)
+    return merged
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.store
+
+This module contains a local, persistent store for TraceView API timeseries.
+
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import errno
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .cache import request_key
+from .columnar import Columns, ColumnsBuilder
+
+
+#: Segment header: magic, number of fields, number of points, size of the field names.
+HEADER = struct.Struct('<4sIII')
+MAGIC = b'TVS1'
+
+
+class SeriesStore(object):
+    """ The :class:`SeriesStore <SeriesStore>` object.
+
+    Persists timeseries results on disk, one directory per series (path and
+    filters) and one immutable segment file per stored time range. A segment
+    holds one column of doubles per field, in native byte order, followed by
+    one validity mask per field. Segments are memory-mapped when read, so
+    :meth:`read` returns columns that point into the files instead of copies.
+
+    Writing a time range that overlaps or touches stored ones merges it with
+    the smallest of their segments, up to ``max_segment_points`` points per
+    segment, so a series fetched piece by piece keeps few files while a write
+    never rewrites more than one segment's worth of points. At most
+    ``max_maps`` segments are kept mapped, least recently read first out.
+
+    Series are keyed by path and query parameters, including the
+    ``time_window`` that sets the resolution of the points.
+
+    When given to :class:`TraceView <traceview.TraceView>`, the ``*_range``
+    series methods serve what the store covers and only fetch the missing
+    time ranges from the API.
+
+    :param str directory: Directory of the store, created if needed.
+    :param float settle: (optional) Seconds before data is considered final. More recent points are fetched but not stored.
+    :param int max_maps: (optional) Maximum number of segments kept memory-mapped.
+    :param int max_segment_points: (optional) Number of points beyond which segments aren't merged.
+
+    Usage::
+
+      >>> import time
+      >>> import traceview
+      >>> from traceview.store import SeriesStore
+      >>> tv = traceview.TraceView('API KEY HERE', store=SeriesStore('/var/cache/traceview'))
+      >>> now = time.time()
+      >>> tv.total_requests.series_range('APP NAME HERE', now - 7 * 86400, now)  # fetched
+      {u'fields': u'timestamp,total_requests', u'items': [[1444046040.0, 583.0], ...]}
+      >>> tv.total_requests.series_range('APP NAME HERE', now - 7 * 86400, now)  # stored
+      {u'fields': u'timestamp,total_requests', u'items': [[1444046040.0, 583.0], ...]}
+
+    """
+
+    SUFFIX = '.seg'
+
+    def __init__(self, directory, settle=600, max_maps=64, max_segment_points=65536):
+        self.directory = directory
+        self.settle = settle
+        self.max_maps = max_maps
+        self.max_segment_points = max_segment_points
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Unmaps the segments. Columns returned by :meth:`read` keep their
+        segment mapped until they are released.
+
+        """
+        with self._lock:
+            maps, self._maps = self._maps, OrderedDict()
+        for mapped in maps.values():
+            _unmap(mapped)
+
+    def coverage(self, path, params):
+        """ Returns the time ranges stored for a series.
+
+        :param str path: The HTTP path of the series.
+        :param dict params: Query parameters (filters) of the series.
+        :return: sorted ``(start, end)`` pairs
+        :rtype: list
+
+        """
+        return [(start, end) for start, end, _ in self._segments(path, params)]
+
+    def missing(self, path, params, start, end):
+        """ Returns the parts of a time range that are not stored.
+
+        :param str path: The HTTP path of the series.
+        :param dict params: Query parameters (filters) of the series.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :return: sorted ``(start, end)`` pairs
+        :rtype: list
+
+        """
+        gaps = []
+        cursor = start
+        for stored_start, stored_end in self.coverage(path, params):
+            if stored_end < cursor:
+                continue
+            if stored_start > end:
+                break
+            if stored_start > cursor:
+                gaps.append((cursor, stored_start))
+            cursor = max(cursor, stored_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def write(self, path, params, start, end, results):
+        """ Stores the timeseries results of a time range. The part of the
+        range more recent than ``settle`` seconds is left out.
+
+        :param str path: The HTTP path of the series.
+        :param dict params: Query parameters (filters) of the series.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :param dict results: Timeseries results of the range, sorted by timestamp.
+        :return: whether a segment was written
+        :rtype: bool
+
+        """
+        end = min(end, time.time() - self.settle)
+        if end <= start:
+            return False
+
+        builder = ColumnsBuilder(results.get('fields') or 'timestamp')
+        items = [item for item in results.get('items') or () if start <= item[0] <= end]
+        if items:
+            builder.extend(items)
+        columns = builder.build()
+
+        directory = self._directory(path, params)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self._lock:
+            replaced = []
+            neighbours = self._mergeable([segment for segment in self._segments(path, params)
+                                          if segment[1] >= start and segment[0] <= end], len(columns))
+            if neighbours:
+                merged = self._merge(neighbours, columns)
+                if merged is not None:
+                    columns, replaced = merged
+                    start = min([start] + [segment[0] for segment in replaced])
+                    end = max([end] + [segment[1] for segment in replaced])
+
+            name = os.path.join(directory, '%.3f_%.3f%s' % (start, end, self.SUFFIX))
+            self._evict(name)
+            for _, _, old in replaced:
+                self._evict(old)
+            self._write_segment(name, columns)
+            for _, _, old in replaced:
+                if old != name:
+                    try:
+                        os.remove(old)
+                    except OSError:
+                        # Still mapped on Windows; reads skip the overlap.
+                        pass
+        return True
+
+    def read(self, path, params, start, end):
+        """ Reads the stored points of a time range.
+
+        When the range lies in a single segment, the columns are views of the
+        memory-mapped segment; otherwise the segments are concatenated.
+
+        :param str path: The HTTP path of the series.
+        :param dict params: Query parameters (filters) of the series.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :rtype: :class:`Columns <traceview.columnar.Columns>`
+
+        """
+        try:
+            return self._read(path, params, start, end)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            # A segment was merged away while reading; list them again.
+            return self._read(path, params, start, end)
+
+    def _read(self, path, params, start, end):
+        parts = []
+        last = None
+        for stored_start, stored_end, name in self._segments(path, params):
+            if stored_end < start or stored_start > end:
+                continue
+            columns = self._load(name)
+            if not len(columns):
+                continue
+            timestamps = columns[columns.fields[0]]
+            low = bisect_left(timestamps, start) if last is None else bisect_right(timestamps, last)
+            high = bisect_right(timestamps, end)
+            if low < high:
+                parts.append(columns[low:high])
+                last = timestamps[high - 1]
+
+        if not parts:
+            return Columns((), [])
+        if len(parts) == 1:
+            return parts[0]
+        fields = parts[0].fields
+        return Columns(fields,
+                       [_concat(array('d'), [part[field] for part in parts]) for field in fields],
+                       [_concat(bytearray(), [part.mask(field) for part in parts]) for field in fields])
+
+    def _mergeable(self, segments, count):
+        """ Returns the smallest of the segments whose points fit in one
+        segment with ``count`` new points.
+
+        """
+        sizes = []
+        for segment in segments:
+            try:
+                with open(segment[2], 'rb') as f:
+                    sizes.append((HEADER.unpack(f.read(HEADER.size))[2], segment))
+            except (IOError, OSError) as e:
+                if e.errno != errno.ENOENT:
+                    raise
+        mergeable = []
+        for size, segment in sorted(sizes):
+            count += size
+            if count > self.max_segment_points:
+                break
+            mergeable.append(segment)
+        return mergeable
+
+    def _merge(self, segments, columns):
+        """ Merges stored segments with new columns, the new points taking
+        precedence. Returns the merged columns and the segments they
+        replace, or ``None`` if the fields don't match.
+
+        """
+        parts = []
+        for segment in segments:
+            try:
+                with open(segment[2], 'rb') as f:
+                    parts.append((segment, _parse(f.read(), segment[2])))
+            except (IOError, OSError) as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+        fields = columns.fields
+        if not len(columns):
+            fields = next((part.fields for _, part in reversed(parts) if len(part)), fields)
+        rows = {}
+        for _, part in parts:
+            if len(part) and part.fields != fields:
+                return None
+            for row in part:
+                rows[row[0]] = row
+        for row in columns:
+            rows[row[0]] = row
+
+        builder = ColumnsBuilder(fields)
+        builder.extend([rows[timestamp] for timestamp in sorted(rows)])
+        return builder.build(), [segment for segment, _ in parts]
+
+    def _write_segment(self, name, columns):
+        names = json.dumps(columns.fields).encode('utf-8')
+        names += b' ' * (-len(names) % 8)
+        temp = '%s.%d.%d.tmp' % (name, os.getpid(), threading.current_thread().ident)
+        with open(temp, 'wb') as segment:
+            segment.write(HEADER.pack(MAGIC, len(columns.fields), len(columns), len(names)))
+            segment.write(names)
+            for field in columns.fields:
+                segment.write(_to_bytes(columns[field]))
+            for field in columns.fields:
+                segment.write(bytes(columns.mask(field)))
+        _replace(temp, name)
+
+    def _evict(self, name):
+        mapped = self._maps.pop(name, None)
+        if mapped is not None:
+            _unmap(mapped)
+
+    def _directory(self, path, params):
+        key = repr(request_key(path, params)).encode('utf-8')
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest())
+
+    def _segments(self, path, params):
+        directory = self._directory(path, params)
+        if not os.path.isdir(directory):
+            return []
+        segments = []
+        for name in os.listdir(directory):
+            if name.endswith(self.SUFFIX):
+                start, end = name[:-len(self.SUFFIX)].split('_')
+                segments.append((float(start), float(end), os.path.join(directory, name)))
+        return sorted(segments)
+
+    def _load(self, name):
+        with self._lock:
+            mapped = self._maps.pop(name, None)
+            if mapped is None:
+                with open(name, 'rb') as segment:
+                    mapped = mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[name] = mapped
+            while len(self._maps) > self.max_maps:
+                _unmap(self._maps.popitem(last=False)[1])
+        return _parse(mapped, name)
+
+
+def _parse(buffer, name):
+    """ Returns the columns of a segment, as views of ``buffer``. """
+    magic, field_count, count, names_size = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("Not a timeseries segment: {0}".format(name))
+    offset = HEADER.size
+    fields = json.loads(buffer[offset:offset + names_size].decode('utf-8'))
+    offset += names_size
+
+    view = memoryview(buffer)
+    columns = []
+    for _ in fields:
+        columns.append(_doubles(view[offset:offset + count * 8]))
+        offset += count * 8
+    masks = []
+    for _ in fields:
+        # Masks are copied: Columns counts missing values with bytearray.count.
+        masks.append(bytearray(view[offset:offset + count]))
+        offset += count
+    return Columns(fields, columns, masks)
+
+
+def _unmap(mapped):
+    try:
+        mapped.close()
+    except BufferError:
+        # Columns still point into the segment; it is unmapped once they
+        # are released.
+        pass
+
+
+def _replace(source, target):
+    try:
+        os.replace(source, target)
+    except AttributeError:
+        # os.replace is unavailable in Python 2, where rename replaces on POSIX.
+        os.rename(source, target)
+
+
+def _doubles(view):
+    try:
+        return view.cast('d')
+    except AttributeError:
+        # memoryview.cast is unavailable in Python 2.
+        column = array('d')
+        column.fromstring(view.tobytes())
+        return column
+
+
+def _to_bytes(column):
+    try:
+        return column.tobytes()
+    except AttributeError:
+        return column.tostring()
+
+
+def _concat(target, parts):
+    for part in parts:
+        target.extend(part)
+    return target
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.stream
+
+This module is responsible for incrementally decoding timeseries API
+responses, so that items are available as soon as they arrive and a response
+is never held in memory as a whole.
+
+"""
+
+from collections import deque
+import codecs
+import json
+import re
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Parser states.
+_TOP, _TOP_KEY, _TOP_VALUE, _DATA, _DATA_KEY, _DATA_VALUE, _ITEMS_START, _ITEMS, _DONE = range(9)
+
+
+class TimeseriesStream(object):
+    """ The :class:`TimeseriesStream <TimeseriesStream>` object.
+
+    A timeseries API result that is decoded while it is read. Iterating over
+    the stream yields the timeseries items one by one; the other members of
+    the result, such as ``fields``, are available through :meth:`get`.
+
+    The response is released as soon as the result is fully decoded, or when
+    decoding fails. Use the stream as a context manager to also release it
+    when iteration stops early.
+
+    :param chunks: Iterable of ``bytes`` chunks of the response body.
+    :param func close: (optional) Called once the response body is exhausted or the stream is closed.
+
+    Usage::
+
+      >>> import traceview
+      >>> tv = traceview.TraceView('API KEY HERE')
+      >>> with tv.server.latency_series('Default', time_window='week', stream=True) as series:
+      ...     series.fields
+      ...     for timestamp, volume, avg_latency in series:
+      ...         pass
+      u'timestamp,volume,avg_latency'
+
+    """
+
+    def __init__(self, chunks, close=None):
+        self._close = close
+        self._chunks = iter(chunks)
+        self._parser = _Parser()
+        self._members = {}
+        self._pending = deque()
+        self._exhausted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if not self._advance():
+                return
+
+    @property
+    def fields(self):
+        """ The fields of each timeseries item. """
+        return self.get('fields')
+
+    def get(self, name, default=None):
+        """ Returns a member of the result other than ``items``, reading ahead
+        in the response body if needed. Items read meanwhile are kept for
+        iteration.
+
+        :param str name: The member name.
+        :param default: (optional) Returned if the result has no such member.
+
+        """
+        while name not in self._members and self._advance():
+            pass
+        return self._members.get(name, default)
+
+    def close(self):
+        """ Release the underlying response. """
+        self._exhausted = True
+        close, self._close = self._close, None
+        if close is not None:
+            close()
+
+    def _advance(self):
+        """ Reads and decodes the next chunk of the response body. Returns
+        ``False`` once the body is exhausted.
+
+        """
+        if self._exhausted:
+            return False
+        try:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._dispatch(self._parser.close())
+                self.close()
+                return False
+            self._dispatch(self._parser.feed(chunk))
+        except Exception:
+            self.close()
+            raise
+        # Nothing but whitespace may follow the result; don't wait for it.
+        if self._parser.done:
+            self.close()
+        return True
+
+    def _dispatch(self, events):
+        for name, value in events:
+            if name == 'items':
+                self._pending.append(value)
+            else:
+                self._members[name] = value
+
+
+class _Parser(object):
+    """ Push parser for ``{"data": {"fields": ..., "items": [...]}, ...}``
+    documents. :meth:`feed` returns ``(name, value)`` events for members of
+    ``data``, and one ``('items', item)`` event per timeseries item.
+
+    """
+
+    # Drop consumed text from the buffer once this many characters are consumed.
+    COMPACT_SIZE = 65536
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._state = _TOP
+        self._key = None
+        self._eof = False
+
+    @property
+    def done(self):
+        """ Whether the whole document was parsed. """
+        return self._state == _DONE
+
+    def feed(self, chunk):
+        self._buffer += self._text.decode(chunk)
+        return self._parse()
+
+    def close(self):
+        self._buffer += self._text.decode(b'', final=True)
+        self._eof = True
+        events = self._parse()
+        if self._state != _DONE:
+            raise ValueError("Truncated timeseries response")
+        return events
+
+    def _parse(self):
+        events = []
+        while self._state != _DONE and self._step(events):
+            pass
+        if self._pos > self.COMPACT_SIZE:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return events
+
+    def _step(self, events):
+        """ Advances the parser by one token or value. Returns ``False`` when
+        more input is needed.
+
+        """
+        state = self._state
+        pos = self._skip(self._pos)
+        if pos is None:
+            return False
+
+        if state in (_TOP_KEY, _DATA_KEY, _ITEMS) and self._buffer[pos] == ',':
+            self._pos = pos + 1
+            return True
+
+        if state == _TOP:
+            self._expect(pos, '{')
+            return self._advance(pos + 1, _TOP_KEY)
+
+        if state in (_TOP_KEY, _DATA_KEY):
+            if self._buffer[pos] == '}':
+                return self._advance(pos + 1, _DONE if state == _TOP_KEY else _TOP_KEY)
+            decoded = self._decode(pos)
+            if decoded is None:
+                return False
+            key, pos = decoded
+            pos = self._skip(pos)
+            if pos is None:
+                return False
+            self._expect(pos, ':')
+            self._key = key
+            if state == _TOP_KEY:
+                return self._advance(pos + 1, _DATA if key == 'data' else _TOP_VALUE)
+            return self._advance(pos + 1, _ITEMS_START if key == 'items' else _DATA_VALUE)
+
+        if state == _DATA:
+            if self._buffer[pos] != '{':
+                raise ValueError("Response data is not a timeseries")
+            return self._advance(pos + 1, _DATA_KEY)
+
+        if state == _ITEMS_START:
+            self._expect(pos, '[')
+            return self._advance(pos + 1, _ITEMS)
+
+        if state == _ITEMS and self._buffer[pos] == ']':
+            return self._advance(pos + 1, _DATA_KEY)
+
+        # _TOP_VALUE, _DATA_VALUE and _ITEMS hold a complete JSON value.
+        decoded = self._decode(pos)
+        if decoded is None:
+            return False
+        value, pos = decoded
+        if state == _ITEMS:
+            events.append(('items', value))
+            return self._advance(pos, _ITEMS)
+        if state == _DATA_VALUE:
+            events.append((self._key, value))
+            return self._advance(pos, _DATA_KEY)
+        return self._advance(pos, _TOP_KEY)
+
+    def _advance(self, pos, state):
+        self._pos = pos
+        self._state = state
+        return True
+
+    def _skip(self, pos):
+        pos = _WHITESPACE.match(self._buffer, pos).end()
+        return pos if pos < len(self._buffer) else None
+
+    def _expect(self, pos, char):
+        if self._buffer[pos] != char:
+            raise ValueError("Expected %r at position %d" % (char, pos,))
+
+    def _decode(self, pos):
+        """ Decodes the JSON value at ``pos``. Returns ``None`` when the value
+        may continue in input that hasn't arrived yet.
+
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except ValueError:
+            if self._eof:
+                raise
+            return None
+        # A number at the end of the buffer may be cut short.
+        if end == len(self._buffer) and not self._eof:
+            return None
+        return value, end
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+traceview.throttle
+
+This module contains the objects used to pace and retry requests to the
+TraceView API.
+
+"""
+
+import random
+import threading
+import time
+
+
+#: Clock used to pace requests, unaffected by changes of the system time.
+clock = getattr(time, 'monotonic', time.time)
+
+
+class TokenBucket(object):
+    """ The :class:`TokenBucket <TokenBucket>` object.
+
+    Client side rate limiter. Tokens are refilled at ``rate`` per second, up
+    to ``burst``, and each request takes one. A bucket may be shared by
+    several :class:`Api <traceview.api.Api>` objects to keep their combined
+    request rate under a single budget.
+
+    While paused, tokens aren't refilled, and requests held back by the
+    pause are sent one by one at ``rate`` once it ends, rather than all at
+    once.
+
+    :param float rate: Requests per second.
+    :param int burst: (optional) Maximum number of requests sent back to back. Defaults to ``rate``.
+
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst if burst is not None else rate))
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """ Takes a token and returns how long, in seconds, the caller must
+        wait before sending its request.
+
+        """
+        with self._lock:
+            now = clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return self._updated - now + wait
+
+    def pause(self, seconds):
+        """ Holds back every request for ``seconds``, i.e. when the API
+        responds with ``Retry-After``.
+
+        """
+        with self._lock:
+            now = clock()
+            self._refill(now)
+            # The first request after the pause is sent as soon as it ends.
+            self._tokens = min(self._tokens, 1.0)
+            self._updated = max(self._updated, now + seconds)
+
+    def _refill(self, now):
+        # During a pause, _updated is the end of the pause, and tokens are
+        # only refilled from then on.
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+
+class RetryPolicy(object):
+    """ The :class:`RetryPolicy <RetryPolicy>` object.
+
+    Decides whether a failed GET request is retried, and how long to wait
+    before doing so. Waits grow exponentially with "full jitter", and honor
+    the ``Retry-After`` header when the API sends one.
+
+    :param int retries: (optional) Maximum number of retries per request.
+    :param float backoff: (optional) Base wait, in seconds, before the first retry.
+    :param float max_backoff: (optional) Maximum wait, in seconds, between retries.
+
+    """
+
+    #: Methods that are safe to retry.
+    METHODS = frozenset(['get'])
+    #: Response status codes that are retried.
+    STATUSES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(self, method, attempt, status=None):
+        """ Returns whether a request is retried.
+
+        :param str method: The HTTP method of the request.
+        :param int attempt: Number of retries already made.
+        :param int status: (optional) Response status code, ``None`` on connection errors.
+
+        """
+        if method not in self.METHODS or attempt >= self.retries:
+            return False
+        return status is None or status in self.STATUSES
+
+    def delay(self, attempt, retry_after=None):
+        """ Returns how long, in seconds, to wait before the next retry.
+
+        :param int attempt: Number of retries already made.
+        :param float retry_after: (optional) Seconds requested by the API.
+
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def retry_after(headers):
+    """ Parses the ``Retry-After`` header of a response into seconds.
+
+    :param headers: The response headers.
+    :rtype: float
+
+    """
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form; email.utils is slow to import and rarely needed.
+        import email.utils
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(parsed) - time.time())
@@ -52,6 +52,7 @@ class TotalRequests(Resource):
         :param str app: The application name.
         :param str time_window: (optional) The time window ('hour', 'day', or 'week') to filter on.
         :param str time_end: (optional) The end time for the time window.
+        :param bool stream: (optional) Decode the timeseries while it is read. See :class:`TimeseriesStream <traceview.stream.TimeseriesStream>`.
         :return: timeseries data of the application's total requests
         :rtype: dict
 
@@ -66,6 +67,57 @@ class TotalRequests(Resource):
         path = 'total_requests/{app}/series'.format(app=app)
         return self.api.get(path, *args, **kwargs)
 
+    def series_range(self, app, start, end, *args, **kwargs):
+        """ Get the total requests for an application over an arbitrary time
+        range.
+
+        The range is fetched concurrently as time windows of a single size,
+        which are stitched into a single timeseries, see :meth:`Api.get_range
+        <traceview.api.Api.get_range>`.
+
+        :param str app: The application name.
+        :param float start: The start of the range, in seconds since the epoch.
+        :param float end: The end of the range, in seconds since the epoch.
+        :param int concurrency: (optional) Maximum number of requests in flight.
+        :return: timeseries data of the application's total requests
+        :rtype: dict
+
+        Usage::
+
+          >>> import time
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> now = time.time()
+          >>> tv.total_requests.series_range('APP NAME HERE', now - 90 * 86400, now)
+          {u'fields': u'timestamp,total_requests', u'items': [[1436874840.0, 583.0], [1436874870.0, 591.0], ...]}
+
+        """
+        path = 'total_requests/{app}/series'.format(app=app)
+        return self.api.get_range(path, start, end, *args, **kwargs)
+
+    def follower(self, app, size=120, **kwargs):
+        """ Follow a timeseries line of the applications total requests.
+
+        Each poll of the follower only returns the points that are new since
+        the previous one. Takes the same filters as :meth:`series`.
+
+        :param str app: The application name.
+        :param int size: (optional) Number of points kept by the follower.
+        :return: a follower of the total requests timeseries
+        :rtype: :class:`Follower <traceview.follow.Follower>`
+
+        Usage::
+
+          >>> import traceview
+          >>> tv = traceview.TraceView('API KEY HERE')
+          >>> follower = tv.total_requests.follower('Default')
+          >>> for series in follower.follow(interval=30):
+          ...     print(series['items'])
+
+        """
+        path = 'total_requests/{app}/series'.format(app=app)
+        return self.api.follower(path, size=size, params=kwargs)
+
     def summary(self, app, *args, **kwargs):
         """ Get a summary of the applications total requests.
 